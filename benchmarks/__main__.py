@@ -0,0 +1,98 @@
+import argparse
+import json
+import sys
+
+from benchmarks.compare import DEFAULT_METRIC, DEFAULT_THRESHOLD, compare, format_rows, is_failed
+from benchmarks.soak import DEFAULT_INTERVAL, DEFAULT_MAX_SLOPES, DEFAULT_TOP_ALLOCATORS, format_sample, run_soak
+from benchmarks.suite import BENCHMARKS, DEFAULT_REPEAT, DEFAULT_SEED, run_suite
+
+
+def _parse_thresholds(values: list[str]) -> dict[str, float]:
+    thresholds = {}
+    for value in values:
+        name, _, threshold = value.partition("=")
+        thresholds[name] = float(threshold)
+    return thresholds
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks of the robolot hot paths")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks and save the results as JSON")
+    run_parser.add_argument("names", nargs="*", help=f"benchmarks to run among {', '.join(BENCHMARKS)}, all by default")
+    run_parser.add_argument("--output", "-o", help="file where the results are written, printed if not set")
+    run_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    run_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+
+    compare_parser = subparsers.add_parser("compare", help="fail if some benchmarks regressed from a baseline")
+    compare_parser.add_argument("baseline", help="JSON results of the reference run")
+    compare_parser.add_argument("current", help="JSON results of the new run")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="relative slowdown allowed, 0.2 means 20%% slower")
+    compare_parser.add_argument("--benchmark-threshold", action="append", default=[], metavar="NAME=THRESHOLD",
+                                help="threshold of a single benchmark, can be repeated")
+    compare_parser.add_argument("--metric", choices=["min", "median", "mean"], default=DEFAULT_METRIC)
+
+    soak_parser = subparsers.add_parser("soak", help="play rounds for hours and fail if the memory or latency grows")
+    soak_parser.add_argument("--duration", type=float, required=True, help="duration of the soak in seconds")
+    soak_parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="seconds between two samples")
+    soak_parser.add_argument("--config", help="JSON file of the settings of the robots, random robots if not set")
+    soak_parser.add_argument("--output", "-o", help="file where the report is written")
+    soak_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    soak_parser.add_argument("--top-allocators", type=int, default=DEFAULT_TOP_ALLOCATORS)
+    soak_parser.add_argument("--max-slope", action="append", default=[], metavar="NAME=SLOPE",
+                             help=f"growth allowed by hour among {', '.join(DEFAULT_MAX_SLOPES)}, can be repeated")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "soak":
+        config = {}
+        if args.config:
+            with open(args.config) as fp:
+                config = json.load(fp)
+        report = run_soak(
+            args.duration,
+            config,
+            seed=args.seed,
+            interval=args.interval,
+            top_allocators=args.top_allocators,
+            max_slopes={**DEFAULT_MAX_SLOPES, **_parse_thresholds(args.max_slope)},
+            on_sample=lambda sample: print(format_sample(sample), flush=True)
+        )
+        if args.output:
+            with open(args.output, "w") as fp:
+                fp.write(json.dumps(report, indent=2) + "\n")
+        for failure in report["failures"]:
+            print(f"FAILED: {failure}")
+        return 1 if report["failures"] else 0
+
+    if args.command == "run":
+        unknown_names = [name for name in args.names if name not in BENCHMARKS]
+        if unknown_names:
+            parser.error(f"unknown benchmarks: {', '.join(unknown_names)}")
+        results = json.dumps(run_suite(args.names, seed=args.seed, repeat=args.repeat), indent=2)
+        if args.output:
+            with open(args.output, "w") as fp:
+                fp.write(results + "\n")
+        else:
+            print(results)
+        return 0
+
+    with open(args.baseline) as fp:
+        baseline = json.load(fp)
+    with open(args.current) as fp:
+        current = json.load(fp)
+    rows = compare(
+        baseline,
+        current,
+        threshold=args.threshold,
+        thresholds=_parse_thresholds(args.benchmark_threshold),
+        metric=args.metric
+    )
+    print(format_rows(rows))
+    return 1 if is_failed(rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_METRIC = "median"
+
+
+def compare(
+    baseline: dict,
+    current: dict,
+    threshold: float = DEFAULT_THRESHOLD,
+    thresholds: dict[str, float] | None = None,
+    metric: str = DEFAULT_METRIC
+) -> list[dict]:
+    """
+    Compare the results of a run with a baseline
+    :param baseline: the results of the reference run
+    :param current: the results of the new run
+    :param threshold: the relative slowdown above which a benchmark has regressed, 0.2 means 20% slower
+    :param thresholds: thresholds overriding the default one for some benchmarks
+    :param metric: the duration compared, among min, median and mean
+    :return: one row per benchmark of either run, the ones missing from a run being flagged with the run
+    """
+    thresholds = thresholds or {}
+    rows = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            rows.append(_missing_row(name, "baseline", current=result[metric]))
+            continue
+        reference = baseline["results"][name][metric]
+        ratio = result[metric] / reference if reference else float("inf")
+        max_ratio = 1 + thresholds.get(name, threshold)
+        rows.append({
+            "name": name,
+            "baseline": reference,
+            "current": result[metric],
+            "ratio": ratio,
+            "regressed": ratio > max_ratio,
+            "missing": None,
+        })
+    # A benchmark renamed or removed is not silently left out of the gate
+    for name, result in baseline["results"].items():
+        if name not in current["results"]:
+            rows.append(_missing_row(name, "current", baseline=result[metric]))
+    return rows
+
+
+def _missing_row(name: str, missing: str, baseline: float | None = None, current: float | None = None) -> dict:
+    return {
+        "name": name,
+        "baseline": baseline,
+        "current": current,
+        "ratio": None,
+        "regressed": False,
+        "missing": missing,
+    }
+
+
+def is_failed(rows: list[dict]) -> bool:
+    """
+    Check whether a comparison fails: a benchmark regressed, or a benchmark of the baseline is missing from the run
+    """
+    return any(row["regressed"] or row["missing"] == "current" for row in rows)
+
+
+def format_rows(rows: list[dict]) -> str:
+    """
+    Format the comparison as a text table
+    """
+    lines = [f"{'benchmark':<22}{'baseline (s)':>14}{'current (s)':>14}{'ratio':>9}"]
+    for row in rows:
+        baseline = f"{'-':>14}" if row["baseline"] is None else f"{row['baseline']:>14.3e}"
+        current = f"{'-':>14}" if row["current"] is None else f"{row['current']:>14.3e}"
+        ratio = f"{'-':>9}" if row["ratio"] is None else f"{row['ratio']:>9.2f}"
+        flag = "  REGRESSED" if row["regressed"] else f"  MISSING IN {row['missing'].upper()}" if row["missing"] else ""
+        lines.append(f"{row['name']:<22}{baseline}{current}{ratio}{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,227 @@
+import gc
+import os
+import resource
+import statistics
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from time import perf_counter
+
+from robolot.engine import CoincheEngine
+from robolot.simulation import play_round
+
+
+DEFAULT_INTERVAL = 60.0
+DEFAULT_TOP_ALLOCATORS = 10
+# The samples taken before the caches of the engine and the robots are filled are not used for the slopes
+DEFAULT_WARMUP_SAMPLES = 1
+# Growth allowed by hour of soak: megabytes of RSS and of traced memory, and ratio of the first p99 latency
+DEFAULT_MAX_SLOPES = {"rss_mb": 50.0, "traced_mb": 20.0, "p99_ratio": 0.5}
+
+
+def get_rss() -> int | None:
+    """
+    Get the resident memory of the process in bytes, or None when it is not available, like on macOS
+    """
+    try:
+        with open("/proc/self/statm") as fp:
+            return int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def get_peak_rss() -> int:
+    """
+    Get the peak of the resident memory of the process in bytes
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # The peak is given in kilobytes on Linux and in bytes on macOS
+    return peak_rss * 1024 if sys.platform.startswith("linux") else peak_rss
+
+
+def make_engine(config: dict, seed: int) -> CoincheEngine:
+    """
+    Create an engine with four robots playing an endless game
+    :param config: the settings of the robots like the self-play policies, with the arguments of the "ismcts"
+    and the "endgame_solver" if any, and the "memory_dir" where the rounds are exported if any
+    """
+    ismcts = None
+    if config.get("ismcts") is not None:
+        from robolot.ismcts import ISMCTS
+        ismcts = ISMCTS(**config["ismcts"], seed=seed)
+    endgame_solver = None
+    if config.get("endgame_solver") is not None:
+        from robolot.endgame import EndgameSolver
+        endgame_solver = EndgameSolver(**config["endgame_solver"], seed=seed)
+    return CoincheEngine(
+        nb_robots=4,
+        target_score=float("inf"),
+        memory_dir=config.get("memory_dir"),
+        seed=seed,
+        endgame_solver=endgame_solver,
+        ismcts=ismcts
+    )
+
+
+def fit_slope(times: list[float], values: list[float]) -> float | None:
+    """
+    Get the slope of the least squares line through points, or None if there are less than two times
+    """
+    if len(set(times)) < 2:
+        return None
+    mean_time = statistics.fmean(times)
+    mean_value = statistics.fmean(values)
+    covariance = sum((time - mean_time) * (value - mean_value) for time, value in zip(times, values))
+    return covariance / sum((time - mean_time) ** 2 for time in times)
+
+
+def get_slopes(samples: list[dict], warmup_samples: int = DEFAULT_WARMUP_SAMPLES) -> dict[str, float | None]:
+    """
+    Get the growth by hour of the memory and the latency over the samples of a soak
+    The peak of the memory never decreases, so the RSS slope is only fitted on the samples of the current RSS
+    """
+    samples = [sample for sample in samples[warmup_samples:] if sample["rounds"]]
+    hours = [sample["elapsed"] / 3600 for sample in samples]
+    rss_samples = [sample for sample in samples if sample["rss"] is not None]
+    slopes = {
+        "rss_mb": fit_slope(
+            [sample["elapsed"] / 3600 for sample in rss_samples],
+            [sample["rss"] / 2 ** 20 for sample in rss_samples]
+        ),
+        "traced_mb": fit_slope(hours, [sample["traced"] / 2 ** 20 for sample in samples]),
+        "p99_ratio": None
+    }
+    if samples and samples[0]["p99"]:
+        slopes["p99_ratio"] = fit_slope(hours, [sample["p99"] / samples[0]["p99"] for sample in samples])
+    return slopes
+
+
+def check_slopes(slopes: dict[str, float | None], max_slopes: dict[str, float]) -> list[str]:
+    """
+    Get the slopes above their maximum
+    """
+    return [
+        f"{name} grows by {slopes[name]:.3g} per hour, more than {max_slope:.3g}"
+        for name, max_slope in max_slopes.items()
+        if slopes.get(name) is not None and slopes[name] > max_slope
+    ]
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__)
+    ])
+
+
+def _take_sample(
+    start: float,
+    nb_rounds: int,
+    latencies: list[float],
+    first_snapshot: tracemalloc.Snapshot,
+    top_allocators: int
+) -> dict:
+    latencies = sorted(latencies)
+    traced, traced_peak = tracemalloc.get_traced_memory()
+    # The allocators are the lines whose memory grew the most since the start of the soak, the soak excluded
+    statistics_diff = _take_snapshot().compare_to(first_snapshot, "lineno")
+    return {
+        "elapsed": perf_counter() - start,
+        "rounds": len(latencies),
+        "total_rounds": nb_rounds,
+        "rss": get_rss(),
+        "peak_rss": get_peak_rss(),
+        "traced": traced,
+        "traced_peak": traced_peak,
+        "gc_counts": list(gc.get_count()),
+        "gc_collections": [generation["collections"] for generation in gc.get_stats()],
+        "p50": latencies[len(latencies) // 2] if latencies else None,
+        "p99": latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] if latencies else None,
+        "top_allocators": [
+            {"line": str(statistic.traceback[0]), "size_diff": statistic.size_diff, "count_diff": statistic.count_diff}
+            for statistic in statistics_diff[:top_allocators]
+        ]
+    }
+
+
+def run_soak(
+    duration: float,
+    config: dict | None = None,
+    seed: int = 0,
+    interval: float = DEFAULT_INTERVAL,
+    top_allocators: int = DEFAULT_TOP_ALLOCATORS,
+    warmup_samples: int = DEFAULT_WARMUP_SAMPLES,
+    max_slopes: dict[str, float] | None = None,
+    on_sample=None
+) -> dict:
+    """
+    Play rounds on a single engine for a duration, and sample its memory and the latency of its rounds
+    :param duration: the duration of the soak in seconds
+    :param config: the settings of the engine, see make_engine
+    :param seed: the seed of the engine and the robots
+    :param interval: the duration between two samples in seconds
+    :param top_allocators: the number of lines of code whose allocations are reported in each sample
+    :param warmup_samples: the number of first samples left out of the slopes
+    :param max_slopes: the growth allowed by hour for each slope, DEFAULT_MAX_SLOPES if None
+    :param on_sample: function called with each sample as soon as it is taken
+    :return: the report, with the samples, the slopes and the failures
+    """
+    config = config or {}
+    max_slopes = DEFAULT_MAX_SLOPES if max_slopes is None else max_slopes
+    engine = make_engine(config, seed)
+    is_tracing = tracemalloc.is_tracing()
+    if not is_tracing:
+        tracemalloc.start()
+    samples = []
+    try:
+        first_snapshot = _take_snapshot()
+        start = perf_counter()
+        next_sample = start + interval
+        nb_rounds = 0
+        latencies = []
+        while True:
+            round_start = perf_counter()
+            play_round(engine)
+            now = perf_counter()
+            latencies.append(now - round_start)
+            nb_rounds += 1
+            if now >= next_sample or now - start >= duration:
+                sample = _take_sample(start, nb_rounds, latencies, first_snapshot, top_allocators)
+                samples.append(sample)
+                if on_sample is not None:
+                    on_sample(sample)
+                latencies = []
+                # The time spent sampling is not counted in the latency of the next round
+                next_sample = perf_counter() + interval
+                if now - start >= duration:
+                    break
+    finally:
+        engine.close()
+        if not is_tracing:
+            tracemalloc.stop()
+    slopes = get_slopes(samples, warmup_samples)
+    return {
+        "metadata": {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "duration": duration,
+            "interval": interval,
+            "seed": seed,
+            "config": config
+        },
+        "samples": samples,
+        "slopes": slopes,
+        "max_slopes": max_slopes,
+        "failures": check_slopes(slopes, max_slopes)
+    }
+
+
+def format_sample(sample: dict) -> str:
+    """
+    Format a sample as a line of text
+    """
+    p50 = f"{sample['p50'] * 1000:.1f}" if sample["p50"] is not None else "-"
+    p99 = f"{sample['p99'] * 1000:.1f}" if sample["p99"] is not None else "-"
+    return (
+        f"{sample['elapsed']:>9.0f}s {sample['total_rounds']:>9} rounds  rss {sample['rss'] / 2 ** 20:>7.1f}MB  "
+        f"traced {sample['traced'] / 2 ** 20:>7.1f}MB  p50 {p50}ms  p99 {p99}ms  gc {sample['gc_collections']}"
+    )
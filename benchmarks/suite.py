@@ -0,0 +1,256 @@
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from time import perf_counter
+
+from robolot.dealing import sampled_deal_ids
+from robolot.engine import CoincheEngine, GameState
+from robolot.memory import BID_MEMORY_COLUMNS, Memory
+from robolot.simulation import play_round
+
+
+# Seed used by every scenario, so that two runs measure the same games
+DEFAULT_SEED = 1234
+DEFAULT_REPEAT = 5
+
+
+def _make_engine(seed: int, memory_dir: str | None = None) -> CoincheEngine:
+    """
+    Create an engine with four robots whose cards only depend on the seed
+    """
+    return CoincheEngine(nb_robots=4, target_score=10 ** 9, memory_dir=memory_dir, seed=seed)
+
+
+def _start_pli(engine: CoincheEngine, nb_cards: int) -> None:
+    """
+    Put the first cards of the players in the pli, as if they had been played
+    """
+    engine.bid_color = "hearts"
+    engine._select_contract_tables()
+    engine.current_player_index = 0
+    engine.pli.pop_all()
+    for player in engine.players[:nb_cards]:
+        card_index = next(i for i, card in enumerate(player.hand) if card is not None)
+        engine.pli.add([player.play_card(card_index)])
+
+
+@contextmanager
+def full_round(seed: int):
+    """
+    Simulate a whole round between four robots, bidding included
+    """
+    engine = _make_engine(seed)
+
+    def run():
+        play_round(engine)
+
+    yield run
+
+
+@contextmanager
+def get_pli_info(seed: int):
+    """
+    Determine the winner and the points of a complete pli
+    """
+    engine = _make_engine(seed)
+    _start_pli(engine, 4)
+    yield engine._get_pli_info
+
+
+@contextmanager
+def check_card_validity(seed: int):
+    """
+    Check every card of the hand of the third player of a pli
+    """
+    engine = _make_engine(seed)
+    _start_pli(engine, 2)
+    engine.current_player_index = 2
+    hand = engine.players[2].hand
+    cards = [card for card in hand if card is not None]
+
+    def run():
+        for card in cards:
+            engine._check_card_validity(hand, card)
+
+    yield run
+
+
+@contextmanager
+def deal_cut_gather(seed: int):
+    """
+    Gather the cards of the players, cut the deck and deal it again
+    """
+    engine = _make_engine(seed)
+
+    def run():
+        for player in engine.players:
+            engine.piles[0].add(player.hand)
+            player.hand = [None] * 8
+            player.top_hand_index = 7
+        engine.between_rounds()
+
+    yield run
+
+
+@contextmanager
+def deal_from_id(seed: int):
+    """
+    Gather the cards of the players and deal them again from a deal identifier
+    """
+    engine = _make_engine(seed)
+    deal_ids = sampled_deal_ids(seed)
+
+    def run():
+        for player in engine.players:
+            engine.deck.add(player.hand)
+            player.hand = [None] * 8
+            player.top_hand_index = 7
+        engine.deal_from_id(next(deal_ids))
+
+    yield run
+
+
+@contextmanager
+def bid_validation(seed: int):
+    """
+    Validate a bid, a coinche and a surcoinche on a typical bidding memory
+    """
+    memory = Memory(BID_MEMORY_COLUMNS, [
+        (0, 0, 80, "spades", 0, 0),
+        (1, 1, None, None, 0, 0),
+        (2, 0, 100, "hearts", 0, 0),
+        (3, 1, None, None, 1, 0),
+    ])
+
+    def run():
+        CoincheEngine._check_bid_validity(memory, 110, "clubs", 0, 0)
+        CoincheEngine._check_bid_validity(memory, None, None, 1, 0)
+        CoincheEngine._check_bid_validity(memory, None, None, 0, 1)
+
+    yield run
+
+
+@contextmanager
+def memory_export(seed: int):
+    """
+    Export the memory of a played round in parquet files
+    """
+    with tempfile.TemporaryDirectory() as memory_dir:
+        engine = _make_engine(seed, memory_dir)
+        # We play until a round is not cancelled, so that the memory is complete
+        play_round(engine)
+        while engine.state != GameState.BETWEEN_ROUNDS or engine.play_memory.shape[0] == 0:
+            play_round(engine)
+
+        def run():
+            engine._export_memory(engine.play_memory, [engine.bid_value, -engine.bid_value])
+
+        yield run
+
+
+@contextmanager
+def core_import(seed: int):
+    """
+    Start an interpreter and import the rules of the game, as a simulation worker does
+    """
+    command = [sys.executable, "-c", "import robolot.engine, robolot.simulation"]
+
+    def run():
+        subprocess.run(command, check=True)
+
+    yield run
+
+
+@contextmanager
+def gui_frame(seed: int):
+    """
+    Render a frame of the pygame client in the middle of a pli, without any screen
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from robolot.main import renderGame
+
+    pygame.init()
+    window = pygame.display.set_mode((1024, 768))
+    engine = _make_engine(seed)
+    _start_pli(engine, 3)
+    engine.state = GameState.PLAYING
+    message = [f"{engine.players[3].name} has to play"]
+
+    def run():
+        renderGame(window, engine, message)
+        pygame.display.update()
+
+    try:
+        yield run
+    finally:
+        pygame.quit()
+
+
+# Each benchmark with the number of operations timed in a single measure
+BENCHMARKS = {
+    "full_round": (full_round, 10),
+    "get_pli_info": (get_pli_info, 2000),
+    "check_card_validity": (check_card_validity, 200),
+    "deal_cut_gather": (deal_cut_gather, 500),
+    "deal_from_id": (deal_from_id, 500),
+    "bid_validation": (bid_validation, 100),
+    "memory_export": (memory_export, 10),
+    "core_import": (core_import, 5),
+    "gui_frame": (gui_frame, 20),
+}
+
+
+def run_benchmark(name: str, seed: int = DEFAULT_SEED, repeat: int = DEFAULT_REPEAT, number: int | None = None) -> dict:
+    """
+    Time a benchmark of the suite
+    :param name: the name of the benchmark
+    :param seed: the seed of the scenario
+    :param repeat: the number of measures
+    :param number: the number of operations in each measure, defaults to the one of the benchmark
+    :return: the durations of a single operation, in seconds
+    """
+    scenario, default_number = BENCHMARKS[name]
+    if number is None:
+        number = default_number
+    timings = []
+    with scenario(seed) as operation:
+        for _ in range(repeat):
+            start = perf_counter()
+            for _ in range(number):
+                operation()
+            timings.append((perf_counter() - start) / number)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+    }
+
+
+def run_suite(names: list[str] | None = None, seed: int = DEFAULT_SEED, repeat: int = DEFAULT_REPEAT) -> dict:
+    """
+    Time several benchmarks of the suite
+    :param names: the benchmarks to run, all of them if None
+    :param seed: the seed of the scenarios
+    :param repeat: the number of measures of each benchmark
+    :return: the results, ready to be saved as a JSON baseline
+    """
+    return {
+        "metadata": {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seed": seed,
+        },
+        "results": {
+            name: run_benchmark(name, seed=seed, repeat=repeat)
+            for name in (names or BENCHMARKS)
+        },
+    }
@@ -0,0 +1,310 @@
+import argparse
+import glob
+import json
+import os
+from multiprocessing import Pool
+
+from robolot.endgame import EndgameSolver
+from robolot.memory import BID_MEMORY_COLUMNS, column_max, is_missing
+from robolot.models import CARD_IDS
+from robolot.rng import CounterRng, mix64
+from robolot.rules import get_legal_cards, get_trick_points, get_trick_winner, get_trump_index, iter_cards
+
+
+DEFAULT_MAX_EXACT_TRICKS = 4
+DEFAULT_NB_ROLLOUTS = 32
+DEFAULT_CACHE_SIZE = 200_000
+# A decision losing at least these points is counted as a blunder in the summary
+BLUNDER_POINTS = 10
+DECISION_COLUMNS = [
+    "policy_version",
+    "round_id",
+    "trick_index",
+    "trick_position",
+    "player_index",
+    "team_index",
+    "is_bidder_team",
+    "played_card",
+    "best_card",
+    "nb_legal_cards",
+    "played_value",
+    "best_value",
+    "point_loss",
+    "method"
+]
+
+# Search state of a worker process, set by _init_worker
+_solver = None
+_nb_rollouts = DEFAULT_NB_ROLLOUTS
+_max_exact_tricks = DEFAULT_MAX_EXACT_TRICKS
+_decision_cache = {}
+
+
+def load_rounds(memory_dir: str, policy_version: str | None = None) -> list[dict]:
+    """
+    Load the rounds exported by the engine in a folder, the ones without cards played being skipped
+    :param memory_dir: the folder of the bid, play and result files of each round
+    :param policy_version: the version of the robots which played the rounds, the name of the folder if None
+    :return: the rounds, with the contract and the cards played in order
+    """
+    import pandas as pd
+
+    if policy_version is None:
+        policy_version = os.path.basename(os.path.normpath(memory_dir))
+    rounds = []
+    for play_path in sorted(glob.glob(os.path.join(memory_dir, "play_*.parquet"))):
+        round_id = os.path.basename(play_path)[len("play_"):-len(".parquet")]
+        plays = pd.read_parquet(play_path)
+        if len(plays) != 32:
+            continue
+        bids = pd.read_parquet(os.path.join(memory_dir, f"bid_{round_id}.parquet"))
+        bid_rows = bids[[not is_missing(value) for value in bids["bid_value"]]]
+        contract = bid_rows.iloc[-1]
+        rounds.append({
+            "policy_version": policy_version,
+            "round_id": round_id,
+            "bid_value": int(column_max(bids["bid_value"])),
+            "bidder_index": int(contract["player_index"]),
+            "bidder_team_index": int(contract["team_index"]),
+            "bid_color": contract["bid_color"],
+            # The contract is doubled by a coinche and doubled again by a surcoinche
+            "multiplier": (
+                4 if column_max(bids["has_surcoinched"]) == 1 else 2 if column_max(bids["has_coinched"]) == 1 else 1
+            ),
+            # Every row of the auction, the missing values being None
+            "bids": [
+                tuple(None if is_missing(value) else value for value in row)
+                for row in bids[BID_MEMORY_COLUMNS].itertuples(index=False, name=None)
+            ],
+            "plays": [
+                (int(player_index), CARD_IDS[(card_color, card_value)])
+                for player_index, card_value, card_color in zip(
+                    plays["player_index"], plays["card_value"], plays["card_color"]
+                )
+            ]
+        })
+    return rounds
+
+
+def _rollout(
+    hands: list[int],
+    leader: int,
+    trick: list[int],
+    trump_index: int | None,
+    rng: CounterRng
+) -> list[int]:
+    """
+    Play the rest of a round with random legal cards
+    :return: the points won by each team from the current trick
+    """
+    hands = list(hands)
+    trick = list(trick)
+    points = [0, 0]
+    while hands[leader] or trick:
+        player = (leader + len(trick)) % 4
+        cards = list(iter_cards(get_legal_cards(hands[player], trick, trump_index)))
+        card = cards[rng.randbelow(len(cards))]
+        hands[player] &= ~(1 << card)
+        trick.append(card)
+        if len(trick) == 4:
+            leader = (leader + get_trick_winner(trick, trump_index)) % 4
+            points[leader % 2] += get_trick_points(trick, trump_index)
+            trick = []
+    return points
+
+
+def get_rollout_seed(hands: list[int], leader: int, trick: list[int], trump_index: int | None) -> int:
+    """
+    Get the seed of the rollouts of a position, so that its evaluation does not depend on the ones done before
+    """
+    # The trick takes 6 bits by card, so that an empty place differs from every card
+    trick_code = 0
+    for card in trick:
+        trick_code = trick_code << 6 | 32 | card
+    seed = mix64(mix64(hands[0] | hands[1] << 32) ^ (hands[2] | hands[3] << 32))
+    return mix64(seed ^ (trick_code << 5 | leader << 3 | (7 if trump_index is None else trump_index)))
+
+
+def evaluate_decision(
+    hands: list[int],
+    leader: int,
+    trick: list[int],
+    trump_index: int | None
+) -> tuple[dict[int, float], str]:
+    """
+    Evaluate each legal card of the player to move, with every hand known
+    The last tricks are solved exactly, the earlier ones are estimated with random rollouts,
+    drawn from the position so that a cached evaluation is the same as a new one
+    :return: the points won by the team of the player from the current trick by card, and the method used
+    """
+    player = (leader + len(trick)) % 4
+    nb_remaining_tricks = bin(hands[player]).count("1")
+    # The positions repeated across the rounds, like the deals played again, are evaluated once by each worker
+    key = (tuple(hands), leader, tuple(trick), trump_index)
+    cached = _decision_cache.get(key)
+    if cached is not None:
+        return cached
+    if nb_remaining_tricks <= _max_exact_tricks:
+        result = dict(_solver.evaluate(hands, leader, trick, trump_index)), "exact"
+    else:
+        rng = CounterRng(get_rollout_seed(hands, leader, trick, trump_index))
+        values = {}
+        for card in iter_cards(get_legal_cards(hands[player], trick, trump_index)):
+            new_hands = list(hands)
+            new_hands[player] &= ~(1 << card)
+            new_trick = trick + [card]
+            new_leader = leader
+            points = [0, 0]
+            if len(new_trick) == 4:
+                new_leader = (leader + get_trick_winner(new_trick, trump_index)) % 4
+                points[new_leader % 2] += get_trick_points(new_trick, trump_index)
+                new_trick = []
+            total = 0
+            for _ in range(_nb_rollouts):
+                total += _rollout(new_hands, new_leader, new_trick, trump_index, rng)[player % 2]
+            values[card] = points[player % 2] + total / _nb_rollouts
+        result = values, "sampled"
+    if len(_decision_cache) >= _solver.cache_size:
+        _decision_cache.clear()
+    _decision_cache[key] = result
+    return result
+
+
+def analyze_round(round_: dict) -> list[tuple]:
+    """
+    Replay the cards played during a round and evaluate every legal alternative at each decision
+    :param round_: a round loaded by load_rounds
+    :return: the decisions, with the columns of DECISION_COLUMNS
+    """
+    trump_index = get_trump_index(round_["bid_color"])
+    hands = [0, 0, 0, 0]
+    for player_index, card in round_["plays"]:
+        hands[player_index] |= 1 << card
+    decisions = []
+    leader = round_["plays"][0][0]
+    trick = []
+    for play_index, (player_index, card) in enumerate(round_["plays"]):
+        legal_cards = get_legal_cards(hands[player_index], trick, trump_index)
+        nb_legal_cards = bin(legal_cards).count("1")
+        if nb_legal_cards > 1:
+            values, method = evaluate_decision(hands, leader, trick, trump_index)
+            best_card = max(values, key=values.get)
+            decisions.append((
+                round_["policy_version"],
+                round_["round_id"],
+                play_index // 4,
+                len(trick),
+                player_index,
+                player_index % 2,
+                player_index % 2 == round_["bidder_team_index"],
+                card,
+                best_card,
+                nb_legal_cards,
+                float(values[card]),
+                float(values[best_card]),
+                float(values[best_card] - values[card]),
+                method
+            ))
+        hands[player_index] &= ~(1 << card)
+        trick.append(card)
+        if len(trick) == 4:
+            leader = (leader + get_trick_winner(trick, trump_index)) % 4
+            trick = []
+    return decisions
+
+
+def _init_worker(max_exact_tricks: int, nb_rollouts: int, cache_size: int) -> None:
+    global _solver, _nb_rollouts, _max_exact_tricks
+    _solver = EndgameSolver(max_tricks=max_exact_tricks, cache_size=cache_size)
+    _nb_rollouts = nb_rollouts
+    _max_exact_tricks = max_exact_tricks
+    _decision_cache.clear()
+
+
+def analyze_rounds(
+    rounds: list[dict],
+    nb_workers: int | None = None,
+    max_exact_tricks: int = DEFAULT_MAX_EXACT_TRICKS,
+    nb_rollouts: int = DEFAULT_NB_ROLLOUTS,
+    cache_size: int = DEFAULT_CACHE_SIZE
+):
+    """
+    Evaluate the decisions of rounds in parallel
+    :param rounds: the rounds loaded by load_rounds
+    :param nb_workers: the number of processes, the number of CPUs if None, the current process if 1
+    :param max_exact_tricks: the number of remaining tricks from which the decisions are solved exactly
+    :param nb_rollouts: the number of random rollouts evaluating a card in the earlier tricks
+    :param cache_size: the maximum number of positions kept by each worker
+    :return: a DataFrame of the decisions, with the columns of DECISION_COLUMNS
+    """
+    import pandas as pd
+
+    settings = (max_exact_tricks, nb_rollouts, cache_size)
+    if nb_workers == 1:
+        _init_worker(*settings)
+        results = [analyze_round(round_) for round_ in rounds]
+    else:
+        with Pool(nb_workers, initializer=_init_worker, initargs=settings) as pool:
+            chunksize = max(1, len(rounds) // (4 * (nb_workers or os.cpu_count())))
+            results = pool.map(analyze_round, rounds, chunksize=chunksize)
+    return pd.DataFrame([decision for decisions in results for decision in decisions], columns=DECISION_COLUMNS)
+
+
+def summarize(decisions) -> dict:
+    """
+    Sum up the point losses of the decisions by policy version, by player and by trick
+    """
+    def _group(keys: list[str]) -> list[dict]:
+        grouped = decisions.groupby(keys).agg(
+            decisions=("point_loss", "size"),
+            total_loss=("point_loss", "sum"),
+            mean_loss=("point_loss", "mean"),
+            blunders=("point_loss", lambda losses: (losses >= BLUNDER_POINTS).sum())
+        )
+        return grouped.reset_index().to_dict("records")
+
+    if decisions.empty:
+        return {"decisions": 0, "by_policy": [], "by_player": [], "by_trick": []}
+    return {
+        "decisions": int(len(decisions)),
+        "rounds": int(decisions["round_id"].nunique()),
+        "by_policy": _group(["policy_version"]),
+        "by_player": _group(["policy_version", "player_index"]),
+        "by_trick": _group(["policy_version", "trick_index"])
+    }
+
+
+def write_report(decisions, output_dir: str) -> dict:
+    """
+    Write the decisions in a Parquet file and their summary in a JSON file
+    :return: the summary
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    decisions.to_parquet(os.path.join(output_dir, "decisions.parquet"))
+    summary = summarize(decisions)
+    with open(os.path.join(output_dir, "summary.json"), "w") as fp:
+        # The values computed by pandas are numpy scalars
+        json.dump(summary, fp, indent=2, default=lambda value: value.item())
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the cards played by the robots in recorded rounds")
+    parser.add_argument("memory_dirs", nargs="+", help="folders of exported rounds, one per policy version")
+    parser.add_argument("-o", "--output", required=True, help="folder of the report")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-exact-tricks", type=int, default=DEFAULT_MAX_EXACT_TRICKS)
+    parser.add_argument("--rollouts", type=int, default=DEFAULT_NB_ROLLOUTS)
+    args = parser.parse_args()
+    rounds = [round_ for memory_dir in args.memory_dirs for round_ in load_rounds(memory_dir)]
+    decisions = analyze_rounds(rounds, args.workers, args.max_exact_tricks, args.rollouts)
+    summary = write_report(decisions, args.output)
+    for row in summary["by_player"]:
+        print(
+            f"{row['policy_version']} player {row['player_index']}: {row['decisions']} decisions, "
+            f"{row['total_loss']:.0f} points lost, {row['blunders']} blunders"
+        )
+
+
+if __name__ == "__main__":
+    main()
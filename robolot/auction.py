@@ -0,0 +1,195 @@
+import argparse
+from bisect import bisect_right
+from itertools import accumulate
+
+import numpy as np
+
+from robolot.models import BID_COLORS, BID_VALUES, COLORS
+from robolot.rules import NO_TRUMP_INDEX, get_trump_index
+
+
+# A holding is described for a contract by the number of trump cards with the jack and the nine of trump,
+# by the number of aces and tens without trump, and by the number of jacks and nines when all colors are trump
+NB_HOLDING_CLASSES = 9 * 4
+# The actions of the auction are passing, then the bid values
+PASS_ACTION = 0
+NB_ACTIONS = 1 + len(BID_VALUES)
+# The position of a bid in its turn of the auction, from the player who started it
+NB_POSITIONS = 4
+DEFAULT_PSEUDO_COUNT = 20
+DEFAULT_POOL_SIZE = 256
+
+
+def get_holding_class(hand: int, trump_index: int) -> int:
+    """
+    Get the class of the holding of a hand for a contract
+    :param hand: the mask of the cards of the hand
+    :param trump_index: the index of the contract
+    """
+    # The values are ordered 7, 8, 9, J, Q, K, 10, A in each color
+    if trump_index < NO_TRUMP_INDEX:
+        trump_cards = hand >> 8 * trump_index & 0xFF
+        return bin(trump_cards).count("1") * 4 + (trump_cards >> 3 & 1) * 2 + (trump_cards >> 2 & 1)
+    if trump_index == NO_TRUMP_INDEX:
+        return bin(hand & 0x80808080).count("1") * 5 + bin(hand & 0x40404040).count("1")
+    return bin(hand & 0x08080808).count("1") * 5 + bin(hand & 0x04040404).count("1")
+
+
+def get_bid_keys(bids: list[tuple], player: int) -> list[tuple[int, int, int]]:
+    """
+    Get the keys of the tables of the bids made by a player during an auction
+    A pass tells about the holding in every color, the coinches and surcoinches are ignored
+    :param bids: the rows of the bid memory
+    :param player: the index of the player
+    :return: the action, the position and the contract of each key
+    """
+    keys = []
+    for row_index, (player_index, _, bid_value, bid_color, has_coinched, has_surcoinched) in enumerate(bids):
+        if player_index != player:
+            continue
+        position = row_index % NB_POSITIONS
+        if bid_value is not None:
+            keys.append((1 + BID_VALUES.index(int(bid_value)), position, get_trump_index(bid_color)))
+        elif not has_coinched and not has_surcoinched:
+            keys += [(PASS_ACTION, position, trump_index) for trump_index in range(len(COLORS))]
+    return keys
+
+
+class AuctionModel:
+    def __init__(self, bid_counts: np.ndarray, hand_counts: np.ndarray, pseudo_count: float = DEFAULT_PSEUDO_COUNT):
+        """
+        Likelihood of the holdings of a player given his bids, learned from played rounds
+        The holdings seen after each bid are compared to the ones of all the hands,
+        the rare keys of the tables staying close to no information
+        :param bid_counts: the number of holdings of each class by action, position and contract of the bids
+        :param hand_counts: the number of holdings of each class by contract over all the hands
+        :param pseudo_count: the weight of the holdings of all the hands in the holdings after a bid
+        """
+        self.bid_counts = bid_counts
+        self.hand_counts = hand_counts
+        self.pseudo_count = pseudo_count
+        # The ratios of each key, computed on first use
+        self.ratios = {}
+
+    @classmethod
+    def from_rounds(cls, rounds: list[dict], pseudo_count: float = DEFAULT_PSEUDO_COUNT) -> "AuctionModel":
+        """
+        Learn the tables from rounds loaded by robolot.analysis.load_rounds
+        """
+        bid_counts = np.zeros((NB_ACTIONS, NB_POSITIONS, len(BID_COLORS), NB_HOLDING_CLASSES), dtype=np.int64)
+        hand_counts = np.zeros((len(BID_COLORS), NB_HOLDING_CLASSES), dtype=np.int64)
+        for round_ in rounds:
+            hands = [0] * 4
+            for player_index, card in round_["plays"]:
+                hands[player_index] |= 1 << card
+            for hand in hands:
+                for trump_index in range(len(BID_COLORS)):
+                    hand_counts[trump_index, get_holding_class(hand, trump_index)] += 1
+            for player in range(4):
+                for action, position, trump_index in get_bid_keys(round_["bids"], player):
+                    bid_counts[action, position, trump_index, get_holding_class(hands[player], trump_index)] += 1
+        return cls(bid_counts, hand_counts, pseudo_count)
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, bid_counts=self.bid_counts, hand_counts=self.hand_counts)
+
+    @classmethod
+    def load(cls, path: str, pseudo_count: float = DEFAULT_PSEUDO_COUNT) -> "AuctionModel":
+        with np.load(path) as data:
+            return cls(data["bid_counts"], data["hand_counts"], pseudo_count)
+
+    def get_ratios(self, key: tuple[int, int, int]) -> list[float]:
+        """
+        Get the likelihood of each holding class after a bid, relative to its frequency over all the hands
+        :param key: the action, the position and the contract of the bid
+        """
+        ratios = self.ratios.get(key)
+        if ratios is None:
+            hand_counts = self.hand_counts[key[2]]
+            prior = (hand_counts + 1) / (hand_counts.sum() + NB_HOLDING_CLASSES)
+            bid_counts = self.bid_counts[key]
+            posterior = (bid_counts + self.pseudo_count * prior) / (bid_counts.sum() + self.pseudo_count)
+            ratios = (posterior / prior).tolist()
+            self.ratios[key] = ratios
+        return ratios
+
+    def get_weight(self, hand: int, keys: list[tuple[int, int, int]]) -> float:
+        """
+        Get the likelihood of the bids of a player holding a hand, up to a constant
+        :param hand: the mask of the cards dealt to the player
+        :param keys: the keys of the bids of the player, given by get_bid_keys
+        """
+        weight = 1.0
+        for key in keys:
+            weight *= self.get_ratios(key)[get_holding_class(hand, key[2])]
+        return weight
+
+
+class AuctionSampler:
+    def __init__(self, model: AuctionModel, information_set, pool_size: int = DEFAULT_POOL_SIZE):
+        """
+        Sampler of the hidden cards of an information set, weighted by the likelihood of the bids of the other players
+        A pool of distributions is drawn uniformly and weighted once, and the samples are picked in it
+        in proportion to their weight, the pool being drawn again once as many samples have been picked
+        :param model: the likelihoods of the holdings
+        :param information_set: what the player knows, with the bids of the round
+        :param pool_size: the number of distributions of a pool
+        """
+        self.model = model
+        self.information_set = information_set
+        self.pool_size = pool_size
+        self.keys = {}
+        for player in range(4):
+            keys = get_bid_keys(information_set.bids, player) if player != information_set.seat else []
+            if keys:
+                self.keys[player] = keys
+        self.pool = []
+        self.cumulated_weights = []
+        self.nb_picks = 0
+
+    def get_weight(self, hands: list[int]) -> float:
+        """
+        Get the likelihood of the bids of the round for a distribution of the cards, up to a constant
+        """
+        played_cards = self.information_set.played_cards
+        weight = 1.0
+        for player, keys in self.keys.items():
+            weight *= self.model.get_weight(hands[player] | played_cards[player], keys)
+        return weight
+
+    def _draw_pool(self, rng) -> None:
+        self.pool = [self.information_set.sample(rng) for _ in range(self.pool_size)]
+        self.cumulated_weights = list(accumulate(self.get_weight(hands) for hands in self.pool))
+        self.nb_picks = 0
+
+    def sample(self, rng) -> list[int]:
+        """
+        Draw a distribution of the hidden cards
+        :param rng: the random generator, with the randbelow and random methods of CounterRng
+        :return: the mask of the cards of each player
+        """
+        if not self.keys:
+            return self.information_set.sample(rng)
+        if self.nb_picks == len(self.pool):
+            self._draw_pool(rng)
+        self.nb_picks += 1
+        index = bisect_right(self.cumulated_weights, rng.random() * self.cumulated_weights[-1])
+        # The distributions of the pool are picked several times, the copies are played by the search
+        return list(self.pool[min(index, len(self.pool) - 1)])
+
+
+def main():
+    from robolot.analysis import load_rounds
+
+    parser = argparse.ArgumentParser(description="Learn the holdings of the players from the bids of exported rounds")
+    parser.add_argument("memory_dirs", nargs="+", help="folders of exported rounds")
+    parser.add_argument("-o", "--output", required=True, help="file of the tables")
+    args = parser.parse_args()
+    rounds = [round_ for memory_dir in args.memory_dirs for round_ in load_rounds(memory_dir)]
+    model = AuctionModel.from_rounds(rounds)
+    model.save(args.output)
+    print(f"{len(rounds)} rounds, {int(model.bid_counts.sum())} holdings after a bid")
+
+
+if __name__ == "__main__":
+    main()
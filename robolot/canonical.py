@@ -0,0 +1,110 @@
+from robolot.models import Color
+from robolot.rules import get_trump_color_index
+
+
+# A permutation gives the canonical color index of each original color index
+IDENTITY_PERMUTATION = (0, 1, 2, 3)
+COLOR_ENUMS = list(Color)
+# The first color of four hands put side by side in blocks of 32 bits
+COLOR_SIGNATURE_MASK = 0xFF | 0xFF << 32 | 0xFF << 64 | 0xFF << 96
+
+
+def invert_permutation(permutation: tuple[int, ...]) -> tuple[int, ...]:
+    inverse = [0] * len(permutation)
+    for color_index, canonical_index in enumerate(permutation):
+        inverse[canonical_index] = color_index
+    return tuple(inverse)
+
+
+def permute_mask(mask: int, permutation: tuple[int, ...]) -> int:
+    """
+    Move each color block of 8 cards of a mask to its new color
+    """
+    return (
+        (mask & 0xFF) << 8 * permutation[0]
+        | (mask >> 8 & 0xFF) << 8 * permutation[1]
+        | (mask >> 16 & 0xFF) << 8 * permutation[2]
+        | (mask >> 24 & 0xFF) << 8 * permutation[3]
+    )
+
+
+def permute_card(card: int, permutation: tuple[int, ...]) -> int:
+    return permutation[card >> 3] << 3 | card & 7
+
+
+def permute_color(color: Color | str, permutation: tuple[int, ...]) -> Color:
+    """
+    Get the color a Color, or its value, is mapped to by a permutation
+    """
+    return COLOR_ENUMS[permutation[COLOR_ENUMS.index(Color(color))]]
+
+
+def canonicalize_position(
+    hands: tuple[int, ...],
+    trick: tuple[int, ...] = (),
+    trump_index: int | None = None
+) -> tuple[tuple[int, ...], tuple[int, ...], int | None, tuple[int, ...]]:
+    """
+    Map a position to the same form as every position equal up to a change of colors
+    The trump color becomes the first one, and the other colors are sorted by their cards in the
+    hands then in the trick, the colors with the same cards being interchangeable
+    :param hands: the masks of the cards of each player
+    :param trick: the cards already played in the trick, in order
+    :param trump_index: the index of the contract, all the colors are interchangeable without a trump color
+    :return: the canonical hands, trick and contract index, and the permutation of the colors,
+    to be inverted to map a canonical card back to the original one
+    """
+    trump_color_index = get_trump_color_index(trump_index)
+    keys = []
+    for color_index in range(4):
+        shift = 8 * color_index
+        keys.append((
+            color_index != trump_color_index,
+            tuple(-(hand >> shift & 0xFF) for hand in hands),
+            tuple(card & 7 if card >> 3 == color_index else 8 for card in trick)
+        ))
+    order = sorted(range(4), key=keys.__getitem__)
+    permutation = [0] * 4
+    for canonical_index, color_index in enumerate(order):
+        permutation[color_index] = canonical_index
+    permutation = tuple(permutation)
+    return (
+        tuple(permute_mask(hand, permutation) for hand in hands),
+        tuple(permute_card(card, permutation) for card in trick),
+        0 if trump_color_index is not None else trump_index,
+        permutation
+    )
+
+
+def canonicalize_hand(hand: int, trump_index: int | None = None) -> tuple[int, tuple[int, ...]]:
+    """
+    Map a hand to the same form as every hand equal up to a change of colors
+    :param hand: the mask of the cards of the hand
+    :param trump_index: the index of the trump color, the first color once canonical
+    :return: the canonical hand and the permutation of the colors
+    """
+    canonical_hands, _, _, permutation = canonicalize_position((hand,), (), trump_index)
+    return canonical_hands[0], permutation
+
+
+def get_position_key(hands: tuple[int, int, int, int], trump_index: int | None = None) -> tuple[int, ...]:
+    """
+    Get a key shared by the hands equal up to a change of colors, faster than canonicalizing them
+    Each color is summarized by its cards in every hand, the trump color first then the other ones sorted
+    """
+    # The hands side by side, so that a color of every hand is extracted with one mask
+    hands = hands[0] | hands[1] << 32 | hands[2] << 64 | hands[3] << 96
+    signatures = [
+        hands & COLOR_SIGNATURE_MASK,
+        hands >> 8 & COLOR_SIGNATURE_MASK,
+        hands >> 16 & COLOR_SIGNATURE_MASK,
+        hands >> 24 & COLOR_SIGNATURE_MASK
+    ]
+    trump_color_index = get_trump_color_index(trump_index)
+    if trump_color_index is None:
+        signatures.sort()
+        # The contracts without a trump color give different values to the same hands
+        return tuple(signatures) if trump_index is None else (trump_index, *signatures)
+    trump_signature = signatures.pop(trump_color_index)
+    signatures.sort()
+    return trump_signature, *signatures
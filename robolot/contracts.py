@@ -0,0 +1,213 @@
+import argparse
+import mmap
+import os
+import struct
+from multiprocessing import Pool
+
+from robolot.dealing import sampled_deal_ids
+from robolot.engine import GameState
+from robolot.models import BID_VALUES, COLORS
+from robolot.rules import get_trump_color_index
+from robolot.simulation import make_range_engine
+
+
+# Features of a hand for a trump color: the jack, nine, ace and ten of trump held, the number of
+# trump cards, the belote, and the number of aces and tens in the other colors
+NB_TRUMP_HIGH_CARDS = 16
+NB_TRUMP_COUNTS = 9
+NB_SIDE_COUNTS = 4
+NB_HAND_CLASSES = NB_TRUMP_HIGH_CARDS * NB_TRUMP_COUNTS * 2 * NB_SIDE_COUNTS * NB_SIDE_COUNTS
+
+# Header of the table file: magic, version, number of classes, number of bid values,
+# seed of the simulated deals, size of a chunk of deals and number of chunks already simulated
+TABLE_MAGIC = b"RBCT"
+TABLE_VERSION = 1
+HEADER_FORMAT = "<4sIIIQIQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# Each class holds the number of simulated rounds then the number of fulfilled contracts by bid value
+ROW_SIZE = 1 + len(BID_VALUES)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def get_hand_class(hand: int, trump_index: int) -> int:
+    """
+    Get the class of a hand for a trump color, the same for the hands equal up to a change of colors
+    :param hand: the mask of the cards of the hand
+    :param trump_index: the index of the trump color
+    """
+    trump_cards = hand >> 8 * trump_index & 0xFF
+    # The values are ordered 7, 8, 9, J, Q, K, 10, A in each color
+    trump_high_cards = (
+        (trump_cards >> 3 & 1)
+        | (trump_cards >> 2 & 1) << 1
+        | (trump_cards >> 7 & 1) << 2
+        | (trump_cards >> 6 & 1) << 3
+    )
+    has_belote = trump_cards >> 4 & 0b11 == 0b11
+    side_cards = hand & ~(0xFF << 8 * trump_index)
+    nb_side_aces = bin(side_cards & 0x80808080).count("1")
+    nb_side_tens = bin(side_cards & 0x40404040).count("1")
+    return (
+        (((trump_high_cards * NB_TRUMP_COUNTS + bin(trump_cards).count("1")) * 2 + has_belote)
+        * NB_SIDE_COUNTS + nb_side_aces) * NB_SIDE_COUNTS + nb_side_tens
+    )
+
+
+def simulate_deals(seed: int, start: int, stop: int) -> list[int]:
+    """
+    Play the deals of a range between robots, once for each trump color,
+    and count the contracts the bidder would have fulfilled
+    :param seed: the seed of the campaign of deals
+    :param start: the index of the first deal
+    :param stop: the index after the last deal
+    :return: the counts of each class, flattened
+    """
+    counts = [0] * (NB_HAND_CLASSES * ROW_SIZE)
+    # Each deal is played once for each trump color, the bidder being the starting player of the round
+    deal_ids = (deal_id for deal_id in sampled_deal_ids(seed, start, stop) for _ in COLORS)
+    engine = make_range_engine(seed, start, stop, deal_ids=deal_ids)
+    for index in range((stop - start) * len(COLORS)):
+        if index:
+            engine.between_rounds()
+        engine.start_bidding()
+        trump_index = index % len(COLORS)
+        hand_class = get_hand_class(engine.players[engine.starting_player_index].get_hand_mask(), trump_index)
+        engine.bid(BID_VALUES[0], COLORS[trump_index], 0, 0)
+        for _ in range(3):
+            engine.bid(None, None, 0, 0)
+        engine.start_playing()
+        while engine.state == GameState.PLAYING:
+            engine.play(engine.players[engine.current_player_index].try_card(
+                engine.pli,
+                engine.play_memory,
+                engine.bid_color
+            ))
+        # The scoring of the engine is applied to every contract value on the same round
+        row = hand_class * ROW_SIZE
+        counts[row] += 1
+        for value_index, bid_value in enumerate(BID_VALUES):
+            if engine._is_contract_fulfilled(bid_value):
+                counts[row + 1 + value_index] += 1
+    return counts
+
+
+def _simulate_chunk(arguments: tuple[int, int, int]) -> list[int]:
+    return simulate_deals(*arguments)
+
+
+def _read_table(path: str) -> tuple[tuple, list[int]]:
+    with open(path, "rb") as fp:
+        data = fp.read()
+    header = struct.unpack_from(HEADER_FORMAT, data)
+    if header[0] != TABLE_MAGIC or header[1] != TABLE_VERSION:
+        raise ValueError(f"{path} is not a contract table")
+    counts = list(struct.unpack_from(f"<{NB_HAND_CLASSES * ROW_SIZE}I", data, HEADER_SIZE))
+    return header, counts
+
+
+def _write_table(path: str, seed: int, chunk_size: int, nb_chunks: int, counts: list[int]) -> None:
+    # The table is replaced at once, so that an interrupted build keeps the last complete chunk
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fp:
+        fp.write(struct.pack(
+            HEADER_FORMAT, TABLE_MAGIC, TABLE_VERSION, NB_HAND_CLASSES, len(BID_VALUES), seed, chunk_size, nb_chunks
+        ))
+        fp.write(struct.pack(f"<{len(counts)}I", *counts))
+    os.replace(tmp_path, path)
+
+
+def build_contract_table(
+    path: str,
+    nb_deals: int,
+    seed: int = 0,
+    nb_workers: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> None:
+    """
+    Simulate deals in parallel and store the contracts fulfilled by class of hand
+    The build is resumed from the last saved chunk when the table already exists
+    :param path: the file of the table
+    :param nb_deals: the total number of deals to simulate, rounded up to a whole chunk
+    :param seed: the seed of the campaign of deals
+    :param nb_workers: the number of processes, the number of CPUs if None
+    :param chunk_size: the number of deals simulated between two saves
+    """
+    nb_chunks = 0
+    counts = [0] * (NB_HAND_CLASSES * ROW_SIZE)
+    if os.path.exists(path):
+        header, counts = _read_table(path)
+        if (header[4], header[5]) != (seed, chunk_size):
+            raise ValueError("The table has been built with another seed or chunk size")
+        nb_chunks = header[6]
+    total_chunks = -(-nb_deals // chunk_size)
+    chunks = [(seed, index * chunk_size, (index + 1) * chunk_size) for index in range(nb_chunks, total_chunks)]
+    with Pool(nb_workers) as pool:
+        # The chunks are received in order, so the saved ones are always the first ones
+        for chunk_counts in pool.imap(_simulate_chunk, chunks):
+            counts = [count + chunk_count for count, chunk_count in zip(counts, chunk_counts)]
+            nb_chunks += 1
+            _write_table(path, seed, chunk_size, nb_chunks, counts)
+    if not os.path.exists(path):
+        _write_table(path, seed, chunk_size, nb_chunks, counts)
+
+
+class ContractTable:
+    def __init__(self, path: str, min_rounds: int = 1):
+        """
+        Read-only access to a contract table, mapped in memory
+        The pages of the file are shared by every process reading the same table
+        :param path: the file of the table
+        :param min_rounds: the number of simulated rounds under which a class is considered unknown
+        """
+        self.path = path
+        self.min_rounds = min_rounds
+        with open(path, "rb") as fp:
+            self.buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        header = struct.unpack_from(HEADER_FORMAT, self.buffer)
+        if header[0] != TABLE_MAGIC or header[1] != TABLE_VERSION:
+            raise ValueError(f"{path} is not a contract table")
+        self.nb_deals = header[5] * header[6]
+
+    def __getstate__(self):
+        # The mapping is opened again by each process instead of being copied
+        return {"path": self.path, "min_rounds": self.min_rounds}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def close(self) -> None:
+        self.buffer.close()
+
+    def get_success_probability(self, hand: int, trump_index: int, bid_value: int) -> float | None:
+        """
+        Get the probability that a contract is fulfilled by the bidder holding a hand
+        :param hand: the mask of the cards of the bidder
+        :param trump_index: the index of the contract
+        :param bid_value: the value of the contract
+        :return: the probability, or None if the class of the hand has not been simulated enough
+        or if the contract has no trump color
+        """
+        if get_trump_color_index(trump_index) is None:
+            return None
+        offset = HEADER_SIZE + 4 * ROW_SIZE * get_hand_class(hand, trump_index)
+        nb_rounds, = struct.unpack_from("<I", self.buffer, offset)
+        if nb_rounds < self.min_rounds:
+            return None
+        nb_fulfilled, = struct.unpack_from("<I", self.buffer, offset + 4 * (1 + BID_VALUES.index(bid_value)))
+        return nb_fulfilled / nb_rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the table of the contracts fulfilled by class of hand")
+    parser.add_argument("path", help="file of the table, resumed if it exists")
+    parser.add_argument("--nb-deals", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+    build_contract_table(args.path, args.nb_deals, args.seed, args.workers, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
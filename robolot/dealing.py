@@ -0,0 +1,111 @@
+from math import comb, gcd
+
+from robolot.rng import CounterRng
+
+
+NB_CARDS = 32
+NB_PLAYERS = 4
+HAND_SIZE = 8
+# Number of ways to distribute the 32 cards into four hands of 8 cards
+NB_DEALS = comb(32, 8) * comb(24, 8) * comb(16, 8)
+
+# Binomial coefficients used by the ranking, COMBINATIONS[n][k] = comb(n, k)
+COMBINATIONS = [[comb(n, k) for k in range(HAND_SIZE + 1)] for n in range(NB_CARDS + 1)]
+
+
+def rank_combination(positions: list[int]) -> int:
+    """
+    Get the rank of a combination in the colexicographic order
+    :param positions: the distinct positions of the chosen elements
+    """
+    return sum(COMBINATIONS[position][i + 1] for i, position in enumerate(sorted(positions)))
+
+
+def unrank_combination(rank: int, n: int, k: int) -> list[int]:
+    """
+    Get the combination of k positions among n with the given colexicographic rank
+    :return: the positions, in increasing order
+    """
+    positions = [0] * k
+    for i in range(k, 0, -1):
+        # We look for the highest position whose binomial coefficient fits in the rank
+        n -= 1
+        while COMBINATIONS[n][i] > rank:
+            n -= 1
+        rank -= COMBINATIONS[n][i]
+        positions[i - 1] = n
+    return positions
+
+
+def rank_deal(hands: list[list[int]]) -> int:
+    """
+    Get the identifier of a deal
+    :param hands: the identifiers of the cards of each player
+    :return: an integer in [0, NB_DEALS)
+    """
+    remaining = list(range(NB_CARDS))
+    deal_id = 0
+    for hand in hands[:-1]:
+        hand_cards = set(hand)
+        positions = [position for position, card_id in enumerate(remaining) if card_id in hand_cards]
+        deal_id = deal_id * COMBINATIONS[len(remaining)][HAND_SIZE] + rank_combination(positions)
+        remaining = [card_id for card_id in remaining if card_id not in hand_cards]
+    return deal_id
+
+
+def unrank_deal(deal_id: int) -> list[list[int]]:
+    """
+    Get the deal corresponding to an identifier
+    :param deal_id: an integer in [0, NB_DEALS)
+    :return: the identifiers of the cards of each player, in increasing order
+    """
+    if not 0 <= deal_id < NB_DEALS:
+        raise ValueError(f"The deal identifier must be in [0, {NB_DEALS})")
+    # We split the identifier in the ranks of the first three hands
+    ranks = []
+    for nb_remaining in (16, 24, 32):
+        deal_id, rank = divmod(deal_id, COMBINATIONS[nb_remaining][HAND_SIZE])
+        ranks.append(rank)
+    ranks.reverse()
+
+    remaining = list(range(NB_CARDS))
+    hands = []
+    for rank in ranks:
+        positions = unrank_combination(rank, len(remaining), HAND_SIZE)
+        hands.append([remaining[position] for position in positions])
+        hand_cards = set(hands[-1])
+        remaining = [card_id for card_id in remaining if card_id not in hand_cards]
+    hands.append(remaining)
+    return hands
+
+
+def sampled_deal_ids(seed: int, start: int = 0, stop: int | None = None):
+    """
+    Iterate over the deals of a campaign in a pseudo-random order
+    The n-th deal is obtained with an affine bijection of [0, NB_DEALS), so two disjoint
+    ranges of indexes, for example given to two workers, never share a deal
+    :param seed: the seed of the campaign
+    :param start: the index of the first deal
+    :param stop: the index after the last deal, the iteration is endless if None
+    """
+    rng = CounterRng(seed)
+    multiplier = rng.randrange(1, NB_DEALS)
+    while gcd(multiplier, NB_DEALS) != 1:
+        multiplier = rng.randrange(1, NB_DEALS)
+    offset = rng.randrange(NB_DEALS)
+    index = start
+    while stop is None or index < stop:
+        yield (multiplier * index + offset) % NB_DEALS
+        index += 1
+
+
+def partition(nb_items: int, nb_workers: int, worker_index: int) -> range:
+    """
+    Get the contiguous share of a worker in a range of items
+    :param nb_items: the total number of items
+    :param nb_workers: the number of workers sharing the items
+    :param worker_index: the index of the worker
+    """
+    size, remainder = divmod(nb_items, nb_workers)
+    start = worker_index * size + min(worker_index, remainder)
+    return range(start, start + size + (worker_index < remainder))
@@ -0,0 +1,234 @@
+import pickle
+from collections import OrderedDict
+
+from robolot.canonical import get_position_key
+from robolot.information import InformationSet
+from robolot.models import CARD_IDS
+from robolot.rng import CounterRng
+from robolot.rules import (
+    CARD_POINTS_BY_TRUMP,
+    CARD_STRENGTHS,
+    get_legal_cards,
+    get_trick_points,
+    get_trick_winner,
+    get_trump_index,
+    iter_cards
+)
+
+
+DEFAULT_MAX_TRICKS = 4
+DEFAULT_MAX_WORLDS = 24
+DEFAULT_CACHE_SIZE = 500_000
+
+
+class EndgameSolver:
+    def __init__(
+        self,
+        max_tricks: int = DEFAULT_MAX_TRICKS,
+        max_worlds: int = DEFAULT_MAX_WORLDS,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        cache_path: str | None = None,
+        seed: int | None = None
+    ):
+        """
+        Exact solver of the last tricks of a round
+        The hidden cards are distributed in every way consistent with the round so far,
+        or in a sample of them when there are too many, and each distribution is solved exactly
+        :param max_tricks: the number of remaining tricks from which the solver is used
+        :param max_worlds: the maximum number of distributions solved for a decision
+        :param cache_size: the maximum number of positions kept in the cache
+        :param cache_path: the file where the cache is persisted, loaded if it exists
+        :param seed: the seed of the generator sampling the distributions
+        """
+        self.max_tricks = max_tricks
+        self.max_worlds = max_worlds
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self.rng = CounterRng(seed)
+        # Points won by the team of the leader in the remaining tricks, by position
+        self.cache = OrderedDict()
+        if cache_path is not None:
+            self.load_cache(cache_path)
+
+    def load_cache(self, path: str) -> None:
+        try:
+            with open(path, "rb") as fp:
+                self.cache = pickle.load(fp)
+        except FileNotFoundError:
+            pass
+
+    def save_cache(self, path: str | None = None) -> None:
+        path = path or self.cache_path
+        if path is None:
+            raise ValueError("No file has been given to save the cache")
+        with open(path, "wb") as fp:
+            pickle.dump(self.cache, fp, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def close(self) -> None:
+        # The solved positions are kept for the next games
+        if self.cache_path is not None:
+            self.save_cache()
+
+    def _solve_tricks(
+        self,
+        hands: tuple[int, int, int, int],
+        leader: int,
+        trump_index: int | None,
+        total_points: int
+    ) -> int:
+        """
+        Get the points won by the team of the leader in the remaining tricks, with perfect play
+        :param total_points: the points of the cards remaining in the hands
+        """
+        if not hands[leader]:
+            return 0
+        # The hands are rotated so that the leader is first, the position does not depend on the seats,
+        # and the colors are canonical so that the positions equal up to a change of colors are shared
+        key = get_position_key(hands[leader:] + hands[:leader], trump_index)
+        value = self.cache.get(key)
+        if value is not None:
+            self.cache.move_to_end(key)
+            return value
+        value = self._search(hands, leader, (), trump_index, total_points, -1, total_points + 1)
+        self.cache[key] = value
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return value
+
+    def _play(
+        self,
+        hands: tuple[int, int, int, int],
+        leader: int,
+        trick: tuple[int, ...],
+        card: int,
+        trump_index: int | None,
+        total_points: int,
+        alpha: int,
+        beta: int
+    ) -> int:
+        """
+        Get the points won by the team of the leader from the current trick, once a card is played
+        :param total_points: the points of the cards of the trick and of the hands, before the card is played
+        """
+        player = (leader + len(trick)) % 4
+        new_hands = hands[:player] + (hands[player] & ~(1 << card),) + hands[player + 1:]
+        new_trick = trick + (card,)
+        if len(new_trick) < 4:
+            return self._search(new_hands, leader, new_trick, trump_index, total_points, alpha, beta)
+        winner = (leader + get_trick_winner(new_trick, trump_index)) % 4
+        trick_points = get_trick_points(new_trick, trump_index)
+        remaining_points = self._solve_tricks(new_hands, winner, trump_index, total_points - trick_points)
+        # The value of the next tricks is given for the team of their leader
+        if winner % 2 == leader % 2:
+            return trick_points + remaining_points
+        return total_points - trick_points - remaining_points
+
+    def _search(
+        self,
+        hands: tuple[int, int, int, int],
+        leader: int,
+        trick: tuple[int, ...],
+        trump_index: int | None,
+        total_points: int,
+        alpha: int,
+        beta: int
+    ) -> int:
+        """
+        Alpha-beta search inside a trick, the value being the points won by the team of the leader
+        """
+        player = (leader + len(trick)) % 4
+        is_leader_team = len(trick) % 2 == 0
+        strengths = CARD_STRENGTHS[trump_index if trump_index is not None else -1]
+        # We try the strongest cards first, which gives more cutoffs
+        cards = sorted(iter_cards(get_legal_cards(hands[player], trick, trump_index)), key=lambda c: -strengths[c])
+        best = -1 if is_leader_team else total_points + 1
+        for card in cards:
+            value = self._play(hands, leader, trick, card, trump_index, total_points, alpha, beta)
+            if is_leader_team:
+                best = max(best, value)
+                alpha = max(alpha, value)
+            else:
+                best = min(best, value)
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+        return best
+
+    def evaluate(
+        self,
+        hands: list[int],
+        leader: int,
+        trick: list[int],
+        trump_index: int | None
+    ) -> dict[int, int]:
+        """
+        Evaluate each playable card of the player to move, with every hand known
+        :param hands: the masks of the cards of each player
+        :param leader: the index of the player who started the trick
+        :param trick: the cards already played in the trick, in order
+        :param trump_index: the index of the trump color
+        :return: the points won by the team of the player to move from the current trick, by card
+        """
+        hands = tuple(hands)
+        trick = tuple(trick)
+        player = (leader + len(trick)) % 4
+        point_table = CARD_POINTS_BY_TRUMP[trump_index if trump_index is not None else -1]
+        total_points = sum(point_table[card] for hand in hands for card in iter_cards(hand)) + get_trick_points(trick, trump_index)
+        values = {}
+        for card in iter_cards(get_legal_cards(hands[player], trick, trump_index)):
+            leader_team_points = self._play(hands, leader, trick, card, trump_index, total_points, -1, total_points + 1)
+            values[card] = leader_team_points if player % 2 == leader % 2 else total_points - leader_team_points
+        return values
+
+    def _get_worlds(self, information_set: InformationSet) -> list[list[int]]:
+        """
+        Get the distributions of the hidden cards consistent with what is known,
+        all of them or a uniform sample when there are too many
+        """
+        nb_worlds = information_set.count_distributions()
+        if nb_worlds <= self.max_worlds:
+            return list(information_set.iter_distributions())
+        return [information_set.sample(self.rng) for _ in range(self.max_worlds)]
+
+    def choose_card(
+        self,
+        player_index: int,
+        hand: list,
+        play_memory,
+        pli_cards: list,
+        bid_color: str,
+        information_set: InformationSet | None = None
+    ) -> int | None:
+        """
+        Choose the card maximizing the points of the team of the player, on average over the
+        distributions of the hidden cards
+        :param player_index: the index of the player to move
+        :param hand: the cards of the player, None for the ones already played
+        :param play_memory: the cards played during the round, in order
+        :param pli_cards: the cards of the current pli, the last played first
+        :param bid_color: the color of the contract
+        :param information_set: what the player knows about the hidden cards, rebuilt from the memory if None
+        :return: the position of the card in the hand, or None if too many tricks remain
+        """
+        hand_ids = {CARD_IDS[(card.color, card.value)]: index for index, card in enumerate(hand) if card is not None}
+        trick = [CARD_IDS[(card.color, card.value)] for card in reversed(pli_cards)]
+        nb_remaining_tricks = len(hand_ids)
+        if nb_remaining_tricks > self.max_tricks:
+            return None
+        trump_index = get_trump_index(bid_color)
+        hand_mask = sum(1 << card for card in hand_ids)
+        legal_cards = list(iter_cards(get_legal_cards(hand_mask, trick, trump_index)))
+        if len(legal_cards) == 1:
+            return hand_ids[legal_cards[0]]
+
+        if information_set is None:
+            information_set = InformationSet.from_memory(player_index, hand_mask, play_memory, trump_index)
+        leader = (player_index - len(trick)) % 4
+        worlds = self._get_worlds(information_set)
+        if not worlds:
+            return None
+        scores = dict.fromkeys(legal_cards, 0)
+        for hands in worlds:
+            for card, value in self.evaluate(hands, leader, trick, trump_index).items():
+                scores[card] += value
+        return hand_ids[max(legal_cards, key=lambda card: scores[card])]
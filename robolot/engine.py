@@ -1,10 +1,45 @@
 from enum import Enum
-from random import randint, sample
 import datetime
 
-import pandas as pd
+from robolot.dealing import rank_deal, unrank_deal
+from robolot.events import (
+    ActionRejected,
+    BiddingStarted,
+    BidPlaced,
+    CardPlayed,
+    ContractSet,
+    GameEnded,
+    PlayerToAct,
+    RoundCancelled,
+    RoundScored,
+    TrickWon
+)
+from robolot.information import InformationSet
+from robolot.instrumentation import instrument as instrument_engine, is_instrumentation_enabled
+from robolot.memory import (
+    Memory,
+    BID_MEMORY_COLUMNS,
+    PLAY_MEMORY_COLUMNS,
+    RESULT_MEMORY_COLUMNS,
+    column_max,
+    is_missing
+)
+from robolot.models import Team, Player, Robolot, Deck, Pile, Color, Card, BID_COLORS, CARD_IDS, COLORS
+from robolot.rng import CounterRng
+from robolot.rules import (
+    ALL_TRUMP_INDEX,
+    CARD_POINTS_BY_TRUMP,
+    CARD_STRENGTHS,
+    get_belote_colors,
+    get_trump_color_index,
+    get_trump_index
+)
 
-from robolot.models import Team, Player, Robolot, Deck, Pile, Value, Color, Card, CARD_POINTS, TRUMP_CARD_POINTS
+
+# Number of bits of the number of draws of a robot, see the robot_seed of the engine
+ROBOT_DRAWS_BITS = 40
+# Index of the stream of the seats of the robots, after the streams of the four robots
+SEATS_STREAM = 5
 
 
 class GameState(Enum):
@@ -17,21 +52,74 @@ class GameState(Enum):
 
 
 class CoincheEngine:
-    def __init__(self, auto_fill: bool = True, target_score = 1000):
+    def __init__(
+        self,
+        auto_fill: bool = True,
+        target_score = 1000,
+        instrument: bool | None = None,
+        nb_robots: int | None = None,
+        memory_dir: str | None = "memory",
+        seed: int | None = None,
+        deal_ids=None,
+        endgame_solver=None,
+        track_information: bool | None = None,
+        contract_table=None,
+        ismcts=None,
+        robot_seed: int | None = None
+    ):
         """
         Engine of the game
         :param auto_fill: whether we want to automatically set the player and team names
+        :param instrument: whether the phases of the engine are timed and counted,
+        defaults to the ROBOLOT_INSTRUMENT environment variable
+        :param nb_robots: the number of robots at the table, asked to the user if None
+        :param memory_dir: the folder where the memory of each round is exported, nothing is exported if None
+        :param seed: the seed of the random generator of the engine, a random one is picked if None
+        :param deal_ids: iterable of deal identifiers, one per round, instead of shuffling and cutting the deck
+        :param endgame_solver: the EndgameSolver shared by the robots to play the last tricks
+        :param track_information: whether each player gets an InformationSet updated at each played card,
+        defaults to whether an endgame solver or an ISMCTS is used
+        :param contract_table: the ContractTable shared by the robots to bid
+        :param ismcts: the ISMCTS shared by the robots to bid and play
+        :param robot_seed: the seed of the seats of the robots and of a random generator owned by each robot,
+        so that several engines can play on threads, the seed of the engine is used if None
         """
+        # We time the phases of the engine if requested
+        if instrument is None:
+            instrument = is_instrumentation_enabled()
+        self.stats = instrument_engine(self) if instrument else None
+        # The subscribers to the events of the game, with the types of events they listen to
+        self.subscribers = []
+
         # We set the teams and players
         self.teams = []
         self.players = []
 
         # We define the target score
         self.target_score = target_score
+        self.memory_dir = memory_dir
+
+        # We setup the random generator used to shuffle and cut the deck
+        self.rng = CounterRng(seed)
+        self.deal_ids = iter(deal_ids) if deal_ids is not None else None
+        self.deal_id = None
+        if track_information is None:
+            track_information = endgame_solver is not None or ismcts is not None
+        self.track_information = track_information
+        # The solvers shared by the robots, released by close
+        self.endgame_solver = endgame_solver
+        self.ismcts = ismcts
+        self.information_sets = []
 
         # We setup the robots in a way that maximizes the number of human-robot interaction
-        nb_robots = int(input(f"Enter the number of robots: "))
-        robot_map = sample(range(4), nb_robots)
+        if nb_robots is None:
+            nb_robots = int(input(f"Enter the number of robots: "))
+        if robot_seed is None:
+            robot_seed = self.rng.seed
+        # The seats and the draws of each robot are taken far apart in the generator of the seed,
+        # after the draws of the deck when it is the seed of the engine
+        robot_map = CounterRng(robot_seed, SEATS_STREAM << ROBOT_DRAWS_BITS).sample(range(4), nb_robots)
+        robot_rngs = [CounterRng(robot_seed, (i + 1) << ROBOT_DRAWS_BITS) for i in range(4)]
 
         for i in range(0, 4):
             if auto_fill:
@@ -46,19 +134,35 @@ class CoincheEngine:
                 player_team = Team(player_team_name)
 
                 if i in robot_map:
-                    self.players.append(Robolot(player_name, player_team))
+                    self.players.append(Robolot(
+                        player_name,
+                        player_team,
+                        endgame_solver=endgame_solver,
+                        contract_table=contract_table,
+                        ismcts=ismcts,
+                        rng=robot_rngs[i]
+                    ))
                 else:
                     self.players.append(Player(player_name, player_team))
 
                 self.teams.append(player_team)
             else:
                 if i in robot_map:
-                    self.players.append(Robolot(player_name, self.teams[i%2]))
+                    self.players.append(Robolot(
+                        player_name,
+                        self.teams[i%2],
+                        endgame_solver=endgame_solver,
+                        contract_table=contract_table,
+                        ismcts=ismcts,
+                        rng=robot_rngs[i]
+                    ))
                 else:
                     self.players.append(Player(player_name, self.teams[i%2]))
+            self.players[i].index = i
         # We setup the cards
         self.deck = Deck()
-        self.deck.shuffle()
+        if self.deal_ids is None:
+            self.deck.shuffle(self.rng)
         self.piles = [Pile(), Pile()]
         self.deal()
         self.pli = Pile()
@@ -66,6 +170,39 @@ class CoincheEngine:
         self.starting_player_index = 0
         self.state = GameState.BIDDING_READY
 
+    def close(self):
+        """
+        Release the solvers of the robots: the processes of the ISMCTS, and the cache of the endgame solver
+        which is saved to its file if it has one
+        """
+        if self.ismcts is not None:
+            self.ismcts.close()
+        if self.endgame_solver is not None:
+            self.endgame_solver.close()
+
+    def subscribe(self, callback, event_types: tuple[type, ...] | None = None):
+        """
+        Register a subscriber to the events of the game
+        The events are only created when there is at least one subscriber
+        :param callback: the function called with each event
+        :param event_types: the types of events sent to the subscriber, all of them if None
+        """
+        self.subscribers.append((callback, event_types))
+
+    def unsubscribe(self, callback):
+        """
+        Remove a subscriber from the events of the game
+        """
+        self.subscribers = [subscriber for subscriber in self.subscribers if subscriber[0] != callback]
+
+    def _emit(self, event):
+        """
+        Send an event to the subscribers listening to its type
+        """
+        for callback, event_types in self.subscribers:
+            if event_types is None or isinstance(event, event_types):
+                callback(event)
+
     def _deal_round(self, nb_cards: int):
         """
         Distribute a given number of cards to each player around the table
@@ -80,9 +217,14 @@ class CoincheEngine:
         """
         Distribute the cards between the players
         """
+        # The deal is given by its identifier if the engine iterates over deals
+        if self.deal_ids is not None:
+            self.deal_from_id(next(self.deal_ids))
+            return
+        self.deal_id = None
         # Decide when we will distribute 2 cards instead of 3
         # Example: method = 1 corresponds to 2, 3, 3 dealing method
-        method = randint(1, 3)
+        method = self.rng.randint(1, 3)
         # We distribute the cards in 4 lists, one for each player
         for step in range(0, 3):
             # Step with two cards
@@ -92,91 +234,173 @@ class CoincheEngine:
             else:
                 self._deal_round(3)
 
+    def deal_from_id(self, deal_id: int):
+        """
+        Distribute the cards of the deck as described by a deal identifier
+        :param deal_id: the identifier of the deal, see robolot.dealing
+        """
+        cards = {CARD_IDS[(card.color, card.value)]: card for card in self.deck.cards}
+        self.deck.cards = []
+        for player, hand in zip(self.players, unrank_deal(deal_id)):
+            player.add_cards([cards[card_id] for card_id in hand])
+        self.deal_id = deal_id
+
+    def get_deal_id(self) -> int:
+        """
+        Get the identifier of the current deal, from the hands of the players
+        It must be called before the first card of the round is played
+        """
+        if self.deal_id is None:
+            self.deal_id = rank_deal([
+                [CARD_IDS[(card.color, card.value)] for card in player.hand] for player in self.players
+            ])
+        return self.deal_id
+
     def _get_belotte_points(self):
-        for player in self.players:
-            if player.team.name == self.bidding_team.name:
+        # The king and queen of trump, in each color when all colors are trump
+        belotte_points = 0
+        for color_index in get_belote_colors(self.trump_index):
+            for player in self.players:
                 if (
-                    any([(card.value == Value.KING and card.color == self.bid_color) for card in player.hand])
-                    and any([(card.value == Value.QUEEN and card.color == self.bid_color) for card in player.hand])
+                    player.team.name == self.bidding_team.name
+                    and player.get_hand_mask() >> (8 * color_index + 4) & 0b11 == 0b11
                 ):
-                    return 20
-        return 0
+                    belotte_points += 20
+        return belotte_points
+
+    def _select_contract_tables(self):
+        """
+        Select the strength and the points of each card once the contract is fixed,
+        so that the plis of every kind of contract are resolved in the same way
+        """
+        self.trump_index = get_trump_index(self.bid_color)
+        trump_color_index = get_trump_color_index(self.trump_index)
+        self.trump_color = COLORS[trump_color_index] if trump_color_index is not None else None
+        self.is_all_trump = self.trump_index == ALL_TRUMP_INDEX
+        table_index = self.trump_index if self.trump_index is not None else -1
+        self.card_strengths = CARD_STRENGTHS[table_index]
+        self.card_points = CARD_POINTS_BY_TRUMP[table_index]
 
     @staticmethod
-    def _check_bid_validity(
-        memory: pd.DataFrame,
+    def _get_highest_bid_team_index(memory: Memory):
+        """
+        Get the index of the team that made the highest bid so far
+        """
+        bid_values = list(memory["bid_value"])
+        highest_bid_index = 0
+        for index, bid_value in enumerate(bid_values):
+            if not is_missing(bid_value) and (
+                is_missing(bid_values[highest_bid_index]) or bid_value > bid_values[highest_bid_index]
+            ):
+                highest_bid_index = index
+        return list(memory["team_index"])[highest_bid_index]
+
+    @staticmethod
+    def _get_bid_error(
+        memory: Memory,
         player_bid_value: int,
         player_bid_color: Color,
         has_coinched: int,
         has_surcoinched: int
-    ):            
+    ) -> str | None:
+        """
+        Get the reason why a bid cannot be made
+        :param memory: the bids of the round so far, a DataFrame with the same columns is also accepted
+        :return: the reason, or None if the bid is valid
+        """
         if has_coinched == 1:
             # If the player does a coinche, other fields must be None and surcoinche must be 0
             if player_bid_value or player_bid_color or has_surcoinched == 1:
-                print("When doing a coinche, no other value can be defined")
-                return False
+                return "When doing a coinche, no other value can be defined"
             # If the player does a coinche, a previous bid must be available
-            if pd.isnull(memory["bid_value"].max()):
-                print("When doing a coinche, a previous bid must be available")
-                return False
+            if column_max(memory["bid_value"]) is None:
+                return "When doing a coinche, a previous bid must be available"
             # The coinche must not be done by the team with the highest bid
             if memory.shape[0] > 0:
-                highest_bid_team_index = memory.sort_values(by=["bid_value"], ascending=False)["team_index"].values[0]
-                if highest_bid_team_index != memory["team_index"].values[-1]:
-                    print("The coinche must not be done by the team with the highest bid")
-                    return False
-            else:
-                print("There must be a previous bid in order to coinche")
+                highest_bid_team_index = CoincheEngine._get_highest_bid_team_index(memory)
+                if highest_bid_team_index != list(memory["team_index"])[-1]:
+                    return "The coinche must not be done by the team with the highest bid"
             # A coinche must not be done twice
-            is_coinched = memory["has_coinched"].max()
-            if not pd.isnull(is_coinched) and is_coinched == 1:
-                print("A coinche must not be done twice")
-                return False
+            is_coinched = column_max(memory["has_coinched"])
+            if is_coinched == 1:
+                return "A coinche must not be done twice"
             
         elif has_surcoinched == 1:
             # If the player does a surcoinche, other fields must be None and coinche must be 0
             if player_bid_value or player_bid_color or has_coinched or has_coinched == 1:
-                print("When doing a surcoinche, no other value can be defined")
-                return False
+                return "When doing a surcoinche, no other value can be defined"
             # If the player does a surcoinche, a previous coinche must be available
-            is_coinched = memory["has_coinched"].max()
-            if pd.isnull(is_coinched) or is_coinched == 0:
-                print("When doing a surcoinche, a previous coinche must be available")
-                return False
+            is_coinched = column_max(memory["has_coinched"])
+            if is_coinched is None or is_coinched == 0:
+                return "When doing a surcoinche, a previous coinche must be available"
             # The surcoinche must not be done by the team who coinched
             if memory.shape[0] > 0:
-                highest_bid_team_index = memory.sort_values(by=["bid_value"], ascending=False)["team_index"].values[0]
-                if highest_bid_team_index == memory["team_index"].values[-1]:
-                    print("The surcoinche must be done by the team with the highest bid")
-                    return False
+                highest_bid_team_index = CoincheEngine._get_highest_bid_team_index(memory)
+                if highest_bid_team_index == list(memory["team_index"])[-1]:
+                    return "The surcoinche must be done by the team with the highest bid"
             # The surcoinche must not be done twice
-            is_surcoinched = memory["has_surcoinched"].max()
-            if not pd.isnull(is_surcoinched) and is_surcoinched == 1:
-                print("A surcoinche must not be done twice")
-                return False
+            is_surcoinched = column_max(memory["has_surcoinched"])
+            if is_surcoinched == 1:
+                return "A surcoinche must not be done twice"
 
         else: 
-            previous_bid = memory["bid_value"].max()
+            previous_bid = column_max(memory["bid_value"])
 
             if not player_bid_value or not player_bid_color:
                 if (player_bid_value or player_bid_color):
-                    print("If the player passes, both value and color must be empty")
-                    return False
+                    return "If the player passes, both value and color must be empty"
 
             # The bid has to be a valid value
             elif player_bid_value not in ([x * 10 for x in range(8, 17)] + [250, 500]):
-                print("The bid has to be a valid value")
-                return False
+                return "The bid has to be a valid value"
+
+            # The bid has to be a color, or a contract without a single trump color
+            elif player_bid_color not in BID_COLORS:
+                return "The bid has to be a valid color"
             
             # The bid has to be higher than the previous ones
-            elif not pd.isnull(previous_bid):
+            elif previous_bid is not None:
                 if player_bid_value <= previous_bid:
-                    print("The bid has to be higher than the previous ones")
-                    return False
+                    return "The bid has to be higher than the previous ones"
             
         # Otherwise, it is a valid bid
-        return True
+        return None
+
+    @staticmethod
+    def _check_bid_validity(
+        memory: Memory,
+        player_bid_value: int,
+        player_bid_color: Color,
+        has_coinched: int,
+        has_surcoinched: int
+    ) -> bool:
+        """
+        Check if the bid can be made
+        :param memory: the bids of the round so far, a DataFrame with the same columns is also accepted
+        """
+        return CoincheEngine._get_bid_error(
+            memory,
+            player_bid_value,
+            player_bid_color,
+            has_coinched,
+            has_surcoinched
+        ) is None
     
+    def _export_memory(self, play_memory: Memory, team_points: list[int]):
+        """
+        Export the memory of the round in parquet files
+        :param play_memory: the cards played during the round
+        :param team_points: the points won by each team at the end of the round
+        """
+        if self.memory_dir is None:
+            return
+        ts = str(datetime.datetime.now()).replace(" ", "_")
+        self.bid_memory.to_parquet(f"{self.memory_dir}/bid_{ts}.parquet")
+        play_memory.to_parquet(f"{self.memory_dir}/play_{ts}.parquet")
+        Memory(RESULT_MEMORY_COLUMNS, [(0, team_points[0]), (1, team_points[1])]).to_parquet(
+            f"{self.memory_dir}/result_{ts}.parquet"
+        )
+
     def start_bidding(self):
         # Setting up bidding variables
         self.is_bidding_closed = False
@@ -187,10 +411,15 @@ class CoincheEngine:
         self.is_surcoinched = 0
         self.bidder_index = None
         self.pli_winners_memory = []
+        # We reset the point counters for each team, they are kept until the next round is started
+        for team in self.teams:
+            team.points = 0
         self.current_player_index = self.starting_player_index
-        self.bid_memory = pd.DataFrame(columns=["player_index", "team_index", "bid_value", "bid_color", "has_coinched", "has_surcoinched"])
+        self.bid_memory = Memory(BID_MEMORY_COLUMNS)
         self.state = GameState.BIDDING
-        return ["Starting bidding phase:", f"{self.players[self.current_player_index].name} has to bid"]
+        if self.subscribers:
+            self._emit(BiddingStarted(self.current_player_index))
+            self._emit(PlayerToAct(self.current_player_index, "bid"))
 
     def bid(
             self,
@@ -198,7 +427,11 @@ class CoincheEngine:
             player_bid_color,
             has_coinched,
             has_surcoinched
-        ):
+        ) -> bool:
+        """
+        Make the bid of the current player
+        :return: whether the bid has been accepted
+        """
         # We check whether the bid is valid
         is_bid_valid = self._check_bid_validity(
             self.bid_memory,
@@ -208,19 +441,28 @@ class CoincheEngine:
             has_surcoinched
         )
         if not is_bid_valid:
-            return ["Your bid is unvalid, please try again"]
+            if self.subscribers:
+                self._emit(ActionRejected(
+                    self.current_player_index,
+                    "bid",
+                    self._get_bid_error(
+                        self.bid_memory,
+                        player_bid_value,
+                        player_bid_color,
+                        has_coinched,
+                        has_surcoinched
+                    )
+                ))
+            return False
         # We add his bid to the memory
-        self.bid_memory = pd.concat([
-            self.bid_memory,
-            pd.DataFrame({
-                "player_index": [self.current_player_index],
-                "team_index": [self.current_player_index % 2],
-                "bid_value": [player_bid_value],
-                "bid_color": [player_bid_color],
-                "has_coinched": [has_coinched],
-                "has_surcoinched": [has_surcoinched]
-            })
-        ], ignore_index=True, axis=0)
+        self.bid_memory.append(
+            self.current_player_index,
+            self.current_player_index % 2,
+            player_bid_value,
+            player_bid_color,
+            has_coinched,
+            has_surcoinched
+        )
         # If the player raised the bid, we update the current bid
         if player_bid_value:
             self.bid_value = player_bid_value
@@ -237,17 +479,15 @@ class CoincheEngine:
             self.is_coinched = 1
             self.bidder_index = self.current_player_index
 
-        # We build the return message with the necessary information
-        message = []
-        if has_coinched:
-            message.append(f"{self.players[self.current_player_index].name} has coinched")
-        elif has_surcoinched:
-            message.append(f"{self.players[self.current_player_index].name} has surcoinched")
-        elif player_bid_value is None:
-            message.append(f"{self.players[self.current_player_index].name} passed")
-        else:
-            message.append(f"{self.players[self.current_player_index].name} bid: {player_bid_value} of {player_bid_color}")
-            
+        if self.subscribers:
+            self._emit(BidPlaced(
+                self.current_player_index,
+                player_bid_value,
+                player_bid_color,
+                has_coinched,
+                has_surcoinched
+            ))
+
         # We iterate over the players
         self.current_player_index += 1
         # If we arrive at the end of the players, we start again from the beginning
@@ -265,35 +505,34 @@ class CoincheEngine:
                 player.top_hand_index = 7
             self.piles[0].add(cards)
             # We export the memory
-            ts = str(datetime.datetime.now()).replace(" ", "_")
-            self.bid_memory.to_parquet(f"memory/bid_{ts}.parquet")
-            pd.DataFrame(columns=["player_index", "card_value", "card_color"]).to_parquet(f"memory/play_{ts}.parquet")
-            pd.DataFrame({
-                "team_index": [0, 1],
-                "points": [0, 0]
-            }).to_parquet(f"memory/result_{ts}.parquet")
+            self._export_memory(Memory(PLAY_MEMORY_COLUMNS), [0, 0])
             self.state = GameState.BETWEEN_ROUNDS
-            message.append("This round is cancelled, everyone passed")
-            return message
+            if self.subscribers:
+                self._emit(RoundCancelled())
+            return True
         # If the selected player is the current highest bidder, the bidding phase is over
         if self.bidder_index is not None and self.current_player_index == self.bidder_index:
             self.is_bidding_closed = True
         
         # We add the winning contract info if the bidding phase is over
         if self.is_bidding_closed:
+            self._select_contract_tables()
             # We calculate whether or not the bidding team has a belotte
             self.belotte_points = self._get_belotte_points()
-            message.append(f"This round is starting with a contract of")
-            message.append(f"{self.bid_value} of {self.bid_color} for {self.bidding_team.name}")
-            if self.is_coinched:
-                message.append("The contract has been coinched")
-            if self.is_surcoinched:
-                message.append("The contract has been surcoinched")
             self.state = GameState.PLAYING_READY
-        else:
-            message.append(f"{self.players[self.current_player_index].name} has to bid")
-        
-        return message
+            if self.subscribers:
+                self._emit(ContractSet(
+                    self.bid_value,
+                    self.bid_color,
+                    self.bidder_index,
+                    self.bidding_team.name,
+                    self.is_coinched,
+                    self.is_surcoinched
+                ))
+        elif self.subscribers:
+            self._emit(PlayerToAct(self.current_player_index, "bid"))
+
+        return True
             
     def between_rounds(self):
         """
@@ -309,56 +548,59 @@ class CoincheEngine:
             cards += pile.pop_all()
         self.deck.add(cards)
         # We cut it
-        self.deck.cut()
+        if self.deal_ids is None:
+            self.deck.cut(self.rng)
         # We deal the cards
         self.deal()
         self.pli_winners_memory = []
         self.state = GameState.BIDDING_READY
 
+    def _is_contract_fulfilled(self, bid_value: int | None = None) -> bool:
+        """
+        Check whether the bidding team fulfilled its contract, once the round is played
+        :param bid_value: the value of the contract, the one of the round if None
+        """
+        if bid_value is None:
+            bid_value = self.bid_value
+        # If a generale has been announced
+        if bid_value == 500:
+            return all([x == self.bidder_index for x in self.pli_winners_memory])
+        # If a capot has been announced, the challengers must not win a single trick, even one worth no points
+        if bid_value == 250:
+            return all([self.players[x].team is self.bidding_team for x in self.pli_winners_memory])
+        # Other contracts
+        return self.bidding_team.points + self.belotte_points >= bid_value
+
     def _get_pli_info(self):
         pli_points = 0
         highest_card_index = None
         highest_card_level = None
-        is_highest_card_trump = None
         card_index = 0
         for card in list(reversed(self.pli.cards)):
-            # We determine it is a trump card
-            is_card_trump = card.color == self.bid_color
-            # We get the corresponding card points
-            if is_card_trump:
-                card_level = list(TRUMP_CARD_POINTS).index(card.value)
-            else:
-                card_level = list(CARD_POINTS).index(card.value)
+            card_id = CARD_IDS[(card.color, card.value)]
+            # The trump cards are stronger than any other card in the tables of the contract
+            card_level = self.card_strengths[card_id]
             if highest_card_index is None:
                 asked_color = card.color
                 highest_card_index = card_index
                 highest_card_level = card_level
-                is_highest_card_trump = is_card_trump
-            else:
-                if (
-                    # Both are trump cards and the current card is stronger
-                    (is_card_trump and is_highest_card_trump and card_level > highest_card_level)
-                    # Both are not trump cards and the current card is stronger
-                    or (not is_card_trump and not is_highest_card_trump and card.color == asked_color and card_level > highest_card_level)
-                    # The current card is a trump one but not the highest card so far is not
-                    or (is_card_trump and not is_highest_card_trump)
-                ):
-                    highest_card_index = card_index
-                    highest_card_level = card_level
+            # Only the cards of the asked color or of the trump color can win the pli
+            elif (card.color == asked_color or card.color == self.trump_color) and card_level > highest_card_level:
+                highest_card_index = card_index
+                highest_card_level = card_level
             # We add the card value to the pli points
-            if is_card_trump:
-                pli_points += TRUMP_CARD_POINTS[card.value]
-            else:
-                pli_points += CARD_POINTS[card.value]
+            pli_points += self.card_points[card_id]
             card_index += 1
-        # We determine the team that played the winning card
-        winning_player_index = (self.current_player_index + highest_card_index) % 4
-        winning_team_index = (self.current_player_index + highest_card_index) % 2
+        # We determine the team that played the winning card, from the player who started the pli
+        starting_player_index = (self.current_player_index - len(self.pli.cards)) % 4
+        winning_player_index = (starting_player_index + highest_card_index) % 4
+        winning_team_index = (starting_player_index + highest_card_index) % 2
         return winning_player_index, winning_team_index, pli_points
     
-    def _check_card_validity(self, hand: list[Card], card: Card):
+    def _get_card_error(self, hand: list[Card], card: Card) -> str | None:
         """
-        Check if the card can be played
+        Get the reason why a card cannot be played
+        :return: the reason, or None if the card is valid
         """
         # If it is not the first card played
         if len(self.pli.cards) > 0:
@@ -368,79 +610,105 @@ class CoincheEngine:
                 any([c.color == asked_color for c in hand if c is not None])
                 and card.color != asked_color
             ):
-                print("You must play the asked color if you can")
-                return False
-            # If the player plays a trump card, it must be higher than the previous trump cards if possible
-            if card.color == self.bid_color:
-                trump_cards_pli = [c.value for c in self.pli.cards if c.color == self.bid_color]
+                return "You must play the asked color if you can"
+            # If the player plays a trump card, it must be higher than the previous trump cards if possible,
+            # every color being played like the trump color when all colors are trump
+            trump_color = asked_color if self.is_all_trump else self.trump_color
+            if card.color == trump_color:
+                strengths = self.card_strengths
+                trump_cards_pli = [c for c in self.pli.cards if c.color == trump_color]
                 if len(trump_cards_pli) > 0:
                     highest_level_trump_card_pli = max([
-                        list(TRUMP_CARD_POINTS).index(c.value) for c in self.pli.cards if c.color == self.bid_color
+                        strengths[CARD_IDS[(c.color, c.value)]] for c in trump_cards_pli
                     ])
                     highest_level_trump_card_hand = max([
-                        list(TRUMP_CARD_POINTS).index(c.value) for c in [
+                        strengths[CARD_IDS[(c.color, c.value)]] for c in [
                             x for x in hand if x is not None
-                        ] if c.color == self.bid_color
+                        ] if c.color == trump_color
                     ])
                     if (
-                        list(TRUMP_CARD_POINTS).index(card.value) < highest_level_trump_card_pli
+                        strengths[CARD_IDS[(card.color, card.value)]] < highest_level_trump_card_pli
                         and highest_level_trump_card_hand > highest_level_trump_card_pli
                     ):
-                        print("If you play a trump card, it should be higher than previous trump cards if possible")
-                        return False
+                        return "If you play a trump card, it should be higher than previous trump cards if possible"
             # If the player has a trump card and no cards with the asked color, he has to play it
             # unless his partner is winning the pli
             if (
-                all([c.color != asked_color for c in hand if c is not None])
-                and card.color != self.bid_color
-                and any([c.color == self.bid_color for c in hand if c is not None])
-                and (
-                    len(self.pli.cards) <= 2
-                    or self.players[self.current_player_index].team != self.teams[self._get_pli_info()[1]])
+                self.trump_color is not None
+                and all([c.color != asked_color for c in hand if c is not None])
+                and card.color != self.trump_color
+                and any([c.color == self.trump_color for c in hand if c is not None])
+                and self.players[self.current_player_index].team != self.teams[self._get_pli_info()[1]]
             ):
-                print(
+                return (
                     "You have to play a trump card if you do not have the asked color, "
                     "unless your partner is winning the pli"
                 )
-                return False
-        return True
+        return None
+
+    def _check_card_validity(self, hand: list[Card], card: Card) -> bool:
+        """
+        Check if the card can be played
+        """
+        return self._get_card_error(hand, card) is None
     
     def start_playing(self):
         self.current_player_index = self.starting_player_index
         self.pli_counter = 0
-        self.play_memory = pd.DataFrame(columns=["player_index", "card_value", "card_color"])
+        self.play_memory = Memory(PLAY_MEMORY_COLUMNS)
+        if self.track_information:
+            self.information_sets = []
+            for player in self.players:
+                player.information_set = InformationSet(
+                    player.index,
+                    player.get_hand_mask(),
+                    self.trump_index,
+                    self.bid_memory.rows
+                )
+                self.information_sets.append(player.information_set)
         self.state = GameState.PLAYING
-        return [f"{self.players[self.current_player_index].name} has to play"]
+        if self.subscribers:
+            self._emit(PlayerToAct(self.current_player_index, "play"))
 
-    def play(self, card_index: int):
+    def play(self, card_index: int) -> bool:
+        """
+        Play a card of the current player
+        :param card_index: the position of the card in the hand of the player
+        :return: whether the card has been accepted
+        """
         # We ask the player to play until his card is valid
         is_card_valid = self._check_card_validity(
             self.players[self.current_player_index].hand,
             self.players[self.current_player_index].hand[card_index]
         )
         if not is_card_valid:
-            return ["Your card is unvalid, please try again"]
-        
+            if self.subscribers:
+                self._emit(ActionRejected(
+                    self.current_player_index,
+                    "card",
+                    self._get_card_error(
+                        self.players[self.current_player_index].hand,
+                        self.players[self.current_player_index].hand[card_index]
+                    )
+                ))
+            return False
+
         # When the card is valid, it is played
         played_card = self.players[self.current_player_index].play_card(card_index)
         self.pli.add([played_card])
-        print(f"> {self.players[self.current_player_index].name} played a {played_card.value} of {played_card.color}\n")
-        self.play_memory = pd.concat([
-            self.play_memory,
-            pd.DataFrame({
-                "player_index": [self.current_player_index],
-                "card_value": [played_card.value],
-                "card_color": [played_card.color]
-            })
-        ], ignore_index=True, axis=0)
+        if self.subscribers:
+            self._emit(CardPlayed(self.current_player_index, played_card.value, played_card.color))
+        self.play_memory.append(self.current_player_index, played_card.value, played_card.color)
+        if self.information_sets:
+            card_id = CARD_IDS[(played_card.color, played_card.value)]
+            for information_set in self.information_sets:
+                information_set.observe(self.current_player_index, card_id)
 
         # We change players
         self.current_player_index += 1
         if self.current_player_index == 4:
             self.current_player_index = 0
 
-        message = []
-        
         # When the pli is complete, it is added to the winning team pile and the points calculated
         if len(self.pli.cards) == 4:
             winning_player_index, winning_team_index, pli_points = self._get_pli_info()
@@ -449,67 +717,55 @@ class CoincheEngine:
             self.piles[winning_team_index].add(self.pli.pop_all())
             self.pli_counter += 1
             self.current_player_index = winning_player_index
-            message.append(f"{self.players[winning_player_index].name} won the pli")
-            message.append(f"for {self.teams[winning_team_index].name}")
+            if self.subscribers:
+                self._emit(TrickWon(
+                    winning_player_index,
+                    winning_team_index,
+                    self.teams[winning_team_index].name,
+                    pli_points
+                ))
 
             # When the round is complete, we determine the winner and distribute the points
             if self.pli_counter == 8:
-                contract_fullfilled = False
-                # If a generale has been announced
-                if self.bid_value == 500:
-                    if all([x == self.bidder_index for x in self.pli_winners_memory]):
-                        contract_fullfilled = True
-                # If a capot has been announced
-                elif self.bid_value == 250:
-                    if self.challenger_team.points == 0:
-                        contract_fullfilled = True                        
-                # Other contracts
-                elif self.bidding_team.points + self.belotte_points >= self.bid_value:
-                    contract_fullfilled = True
+                contract_fullfilled = self._is_contract_fulfilled()
                 
                 if contract_fullfilled:
                     self.bidding_team.score += self.bid_value
-                    message.append("The contract has been fullfilled")
-                    message.append(f"{self.bid_value} points won by the team {self.bidding_team.name}")
                 else:
                     self.challenger_team.score += self.bid_value
-                    message.append("The contract has been failed")
-                    message.append(f"{self.bid_value} points won by the team {self.challenger_team.name}")
 
                 # We export the game memory
-                ts = str(datetime.datetime.now()).replace(" ", "_")
-                self.bid_memory.to_parquet(f"memory/bid_{ts}.parquet")
-                self.play_memory.to_parquet(f"memory/play_{ts}.parquet")
                 if (
                     (contract_fullfilled and self.bidding_team.name == self.teams[0].name)
                     or (not contract_fullfilled and self.bidding_team.name == self.teams[1].name)
                 ):
-                    pd.DataFrame({
-                        "team_index": [0, 1],
-                        "points": [self.bid_value, -self.bid_value]
-                    }).to_parquet(f"memory/result_{ts}.parquet")
+                    self._export_memory(self.play_memory, [self.bid_value, -self.bid_value])
                 else:
-                    pd.DataFrame({
-                        "team_index": [0, 1],
-                        "points": [-self.bid_value, self.bid_value]
-                    }).to_parquet(f"memory/result_{ts}.parquet")
+                    self._export_memory(self.play_memory, [-self.bid_value, self.bid_value])
                 
-                # We reset the point counters for each team
-                for team in self.teams:
-                    team.points = 0
-
                 # We check if there is a winner
-                for team in self.teams:
-                    if team.score >= self.target_score:
-                        message.append(f"Team {team.name} wins with a score of {team.score} !")
-                        self.state = GameState.ENDED
-
+                winning_teams = [team for team in self.teams if team.score >= self.target_score]
+                if winning_teams:
+                    self.state = GameState.ENDED
                 # Otherwise, we start another round
-                if self.state != GameState.ENDED:
-                    message.append("End of round, preparing next round")
+                else:
                     self.state = GameState.BETWEEN_ROUNDS
-        else:
-            message.append(f"{self.players[self.current_player_index].name} has to play")
 
-        return message
+                if self.subscribers:
+                    winning_team = self.bidding_team if contract_fullfilled else self.challenger_team
+                    self._emit(RoundScored(
+                        self.bid_value,
+                        self.teams.index(winning_team),
+                        winning_team.name,
+                        contract_fullfilled,
+                        self.state == GameState.ENDED
+                    ))
+                    for team in winning_teams:
+                        self._emit(GameEnded(team.name, team.score))
+            elif self.subscribers:
+                self._emit(PlayerToAct(self.current_player_index, "play"))
+        elif self.subscribers:
+            self._emit(PlayerToAct(self.current_player_index, "play"))
+
+        return True
 
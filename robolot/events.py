@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class BiddingStarted:
+    starting_player_index: int
+
+    def message(self, player_names: list[str]) -> list[str]:
+        return ["Starting bidding phase:"]
+
+
+@dataclass(frozen=True, slots=True)
+class PlayerToAct:
+    player_index: int
+    # Either "bid" or "play"
+    action: str
+
+    def message(self, player_names: list[str]) -> list[str]:
+        return [f"{player_names[self.player_index]} has to {self.action}"]
+
+
+@dataclass(frozen=True, slots=True)
+class BidPlaced:
+    player_index: int
+    bid_value: int | None
+    bid_color: str | None
+    has_coinched: int
+    has_surcoinched: int
+
+    def message(self, player_names: list[str]) -> list[str]:
+        if self.has_coinched:
+            return [f"{player_names[self.player_index]} has coinched"]
+        if self.has_surcoinched:
+            return [f"{player_names[self.player_index]} has surcoinched"]
+        if self.bid_value is None:
+            return [f"{player_names[self.player_index]} passed"]
+        return [f"{player_names[self.player_index]} bid: {self.bid_value} of {self.bid_color}"]
+
+
+@dataclass(frozen=True, slots=True)
+class ContractSet:
+    bid_value: int
+    bid_color: str
+    bidder_index: int
+    team_name: str
+    is_coinched: int
+    is_surcoinched: int
+
+    def message(self, player_names: list[str]) -> list[str]:
+        message = [
+            "This round is starting with a contract of",
+            f"{self.bid_value} of {self.bid_color} for {self.team_name}"
+        ]
+        if self.is_coinched:
+            message.append("The contract has been coinched")
+        if self.is_surcoinched:
+            message.append("The contract has been surcoinched")
+        return message
+
+
+@dataclass(frozen=True, slots=True)
+class RoundCancelled:
+    def message(self, player_names: list[str]) -> list[str]:
+        return ["This round is cancelled, everyone passed"]
+
+
+@dataclass(frozen=True, slots=True)
+class CardPlayed:
+    player_index: int
+    card_value: str
+    card_color: str
+
+    def message(self, player_names: list[str]) -> list[str]:
+        return [f"{player_names[self.player_index]} played a {self.card_value} of {self.card_color}"]
+
+
+@dataclass(frozen=True, slots=True)
+class TrickWon:
+    player_index: int
+    team_index: int
+    team_name: str
+    points: int
+
+    def message(self, player_names: list[str]) -> list[str]:
+        return [f"{player_names[self.player_index]} won the pli", f"for {self.team_name}"]
+
+
+@dataclass(frozen=True, slots=True)
+class RoundScored:
+    bid_value: int
+    winning_team_index: int
+    winning_team_name: str
+    is_contract_fullfilled: bool
+    is_game_ended: bool
+
+    def message(self, player_names: list[str]) -> list[str]:
+        message = [
+            "The contract has been fullfilled" if self.is_contract_fullfilled else "The contract has been failed",
+            f"{self.bid_value} points won by the team {self.winning_team_name}"
+        ]
+        if not self.is_game_ended:
+            message.append("End of round, preparing next round")
+        return message
+
+
+@dataclass(frozen=True, slots=True)
+class GameEnded:
+    team_name: str
+    score: int
+
+    def message(self, player_names: list[str]) -> list[str]:
+        return [f"Team {self.team_name} wins with a score of {self.score} !"]
+
+
+@dataclass(frozen=True, slots=True)
+class ActionRejected:
+    player_index: int
+    # Either "bid" or "card"
+    action: str
+    reason: str
+
+    def message(self, player_names: list[str]) -> list[str]:
+        return [f"Your {self.action} is unvalid, please try again", self.reason]
+
+
+class MessageLog:
+    def __init__(self, player_names: list[str]):
+        """
+        Subscriber keeping the events until their messages are displayed
+        The messages are only formatted when they are requested
+        :param player_names: the names of the players, by index
+        """
+        self.player_names = player_names
+        self.events = []
+
+    def __call__(self, event) -> None:
+        self.events.append(event)
+
+    def pop_messages(self, max_events: int | None = None) -> list[str] | None:
+        """
+        Get the messages of the events received since the last call
+        :param max_events: the number of last events whose messages are kept, all of them if None
+        :return: the lines to display, or None if nothing happened
+        """
+        if not self.events:
+            return None
+        message = []
+        # Slicing from -max_events would keep all the events when max_events is 0
+        first_event = max(len(self.events) - max_events, 0) if max_events is not None else 0
+        for event in self.events[first_event:]:
+            message += event.message(self.player_names)
+        self.events = []
+        return message
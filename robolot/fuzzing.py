@@ -0,0 +1,292 @@
+import argparse
+import importlib
+import json
+import os
+from dataclasses import asdict, dataclass, replace
+from multiprocessing import Pool
+
+import numpy as np
+
+from robolot import events
+from robolot.dealing import sampled_deal_ids
+from robolot.engine import CoincheEngine, GameState
+from robolot.models import BID_COLORS, BID_VALUES, CARD_IDS
+from robolot.rng import CounterRng
+from robolot.rules import get_legal_cards, get_trick_points, get_trick_winner, get_trump_index, is_bid_legal
+from robolot.scoring import RoundArrays, score_rounds
+
+
+DEFAULT_RULES = "robolot.fuzzing:MaskRules"
+DEFAULT_MAX_BIDS = 12
+PASS_BID = (None, None, 0, 0)
+# The draws of a case are taken after the ones of the previous cases, far enough not to overlap
+CASE_DRAWS = 1 << 16
+
+# Rules of a worker process, set by _init_worker
+_rules = None
+
+
+@dataclass(frozen=True)
+class FuzzCase:
+    """
+    Round played the same way by the engine and by the rules checked against it
+    """
+    deal_id: int
+    starting_player_index: int
+    # The bids tried in order, rejected or not, as bid_value, bid_color, has_coinched, has_surcoinched,
+    # the players pass once they are all tried
+    bids: tuple[tuple, ...]
+    # The card played at each turn, as an index among the legal cards, the first one once they are all used
+    choices: tuple[int, ...]
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FuzzCase":
+        return cls(
+            data["deal_id"],
+            data["starting_player_index"],
+            tuple(tuple(bid) for bid in data["bids"]),
+            tuple(data["choices"])
+        )
+
+
+class MaskRules:
+    """
+    Rules played on card masks by the search, the solvers and the scoring of recorded rounds
+    Any other implementation with the same methods can be checked against the engine
+    """
+    def is_bid_legal(self, bids: list[tuple], bid: tuple) -> bool:
+        return is_bid_legal(bids, *bid)
+
+    def get_legal_cards(self, hand: int, trick: list[int], trump_index: int) -> int:
+        return get_legal_cards(hand, trick, trump_index)
+
+    def get_trick_winner(self, trick: list[int], trump_index: int) -> int:
+        return get_trick_winner(trick, trump_index)
+
+    def get_trick_points(self, trick: list[int], trump_index: int) -> int:
+        return get_trick_points(trick, trump_index)
+
+    def score_round(self, plays: list[tuple[int, int]], bids: list[tuple]) -> tuple[bool, list[int]]:
+        """
+        Score a played round
+        :param plays: the index of the player and the card of each play, in order
+        :param bids: the rows of the bid memory
+        :return: whether the contract is fulfilled, and the score of each team
+        """
+        contract = max((row for row in bids if row[2]), key=lambda row: row[2])
+        multiplier = 4 if any(row[5] == 1 for row in bids) else 2 if any(row[4] == 1 for row in bids) else 1
+        results = score_rounds(RoundArrays(
+            cards=np.array([[card for _, card in plays]], dtype=np.int8),
+            players=np.array([[player for player, _ in plays]], dtype=np.int8),
+            contracts=np.array([get_trump_index(contract[3])], dtype=np.int8),
+            bid_values=np.array([contract[2]], dtype=np.int16),
+            bidders=np.array([contract[0]], dtype=np.int8),
+            multipliers=np.array([multiplier], dtype=np.int8)
+        ))
+        return bool(results["is_fulfilled"][0]), results["scores"][0].tolist()
+
+
+def load_rules(path: str):
+    """
+    Create the rules checked against the engine from their path, as module:class
+    """
+    module_name, class_name = path.split(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def generate_case(seed: int, index: int, max_bids: int = DEFAULT_MAX_BIDS) -> FuzzCase:
+    """
+    Draw the n-th case of a campaign, only depending on the seed and n
+    Some of the bids are invalid on purpose, so that the rejections are compared too
+    """
+    rng = CounterRng(seed, index * CASE_DRAWS)
+    bids = []
+    for _ in range(rng.randint(0, max_bids)):
+        draw = rng.random()
+        if draw < 0.35:
+            bids.append(PASS_BID)
+        elif draw < 0.75:
+            bids.append((rng.choice(BID_VALUES), rng.choice(BID_COLORS), 0, 0))
+        elif draw < 0.85:
+            bids.append((None, None, 1, 0))
+        elif draw < 0.92:
+            bids.append((None, None, 0, 1))
+        else:
+            # A malformed bid, which must be rejected by both implementations
+            bids.append(rng.choice([
+                (85, rng.choice(BID_COLORS), 0, 0),
+                (rng.choice(BID_VALUES), None, 0, 0),
+                (None, rng.choice(BID_COLORS), 0, 0),
+                (rng.choice(BID_VALUES), rng.choice(BID_COLORS), 1, 0),
+                (None, None, 1, 1)
+            ]))
+    return FuzzCase(
+        deal_id=next(sampled_deal_ids(seed, index, index + 1)),
+        starting_player_index=rng.randbelow(4),
+        bids=tuple(bids),
+        choices=tuple(rng.randbelow(8) for _ in range(32))
+    )
+
+
+def find_mismatch(case: FuzzCase, rules) -> str | None:
+    """
+    Play a case on the engine, the reference, and compare each of its decisions with the rules
+    :return: the description of the first mismatch, or None if the rules agree with the engine
+    """
+    engine = CoincheEngine(nb_robots=4, target_score=float("inf"), memory_dir=None, seed=0, deal_ids=[case.deal_id])
+    received = []
+    engine.subscribe(received.append, (events.TrickWon, events.RoundScored))
+    engine.starting_player_index = case.starting_player_index
+    engine.start_bidding()
+    bids = iter(case.bids)
+    while engine.state == GameState.BIDDING:
+        bid = next(bids, PASS_BID)
+        rows = list(engine.bid_memory.rows)
+        is_legal = engine._check_bid_validity(engine.bid_memory, *bid)
+        if rules.is_bid_legal(rows, bid) != is_legal:
+            return f"bid {bid} after {rows}: legal for the engine {is_legal}"
+        engine.bid(*bid)
+    if engine.state != GameState.PLAYING_READY:
+        return None
+
+    engine.start_playing()
+    trump_index = engine.trump_index
+    choices = iter(case.choices)
+    plays = []
+    trick = []
+    leader = engine.current_player_index
+    while engine.state == GameState.PLAYING:
+        player_index = engine.current_player_index
+        hand = engine.players[player_index].hand
+        legal_positions = [
+            position for position, card in enumerate(hand)
+            if card is not None and engine._check_card_validity(hand, card)
+        ]
+        legal_cards = sum(1 << CARD_IDS[(hand[position].color, hand[position].value)] for position in legal_positions)
+        hand_mask = engine.players[player_index].get_hand_mask()
+        if rules.get_legal_cards(hand_mask, trick, trump_index) != legal_cards:
+            return f"legal cards of {hand_mask:#010x} on {trick} with contract {trump_index}: {legal_cards:#010x} for the engine"
+        position = legal_positions[next(choices, 0) % len(legal_positions)]
+        card = CARD_IDS[(hand[position].color, hand[position].value)]
+        engine.play(position)
+        plays.append((player_index, card))
+        trick.append(card)
+        if len(trick) == 4:
+            trick_won = received.pop(0)
+            winner = (leader + rules.get_trick_winner(trick, trump_index)) % 4
+            if winner != trick_won.player_index:
+                return f"winner of {trick} led by {leader} with contract {trump_index}: {trick_won.player_index} for the engine"
+            points = rules.get_trick_points(trick, trump_index)
+            if points != trick_won.points:
+                return f"points of {trick} with contract {trump_index}: {trick_won.points} for the engine"
+            leader = winner
+            trick = []
+
+    round_scored = received.pop(0)
+    scores = [0, 0]
+    scores[round_scored.winning_team_index] = round_scored.bid_value
+    result = (round_scored.is_contract_fullfilled, scores)
+    if rules.score_round(plays, engine.bid_memory.rows) != result:
+        return f"score of {plays} after {engine.bid_memory.rows}: {result} for the engine"
+    return None
+
+
+def shrink_case(case: FuzzCase, rules) -> tuple[FuzzCase, str]:
+    """
+    Simplify a case as long as the rules still disagree with the engine on it
+    The bids are removed one by one, then the choices are cut and lowered, and the first player moved to 0
+    :return: the simplest case found, and its mismatch
+    """
+    mismatch = find_mismatch(case, rules)
+    if mismatch is None:
+        raise ValueError("The rules agree with the engine on this case")
+    is_shrunk = True
+    while is_shrunk:
+        is_shrunk = False
+        candidates = [replace(case, bids=case.bids[:index] + case.bids[index + 1:]) for index in range(len(case.bids))]
+        # Cutting the choices plays the first legal cards from there
+        candidates += [replace(case, choices=case.choices[:length]) for length in range(len(case.choices))]
+        candidates += [
+            replace(case, choices=case.choices[:index] + (0,) + case.choices[index + 1:])
+            for index, choice in enumerate(case.choices) if choice
+        ]
+        if case.starting_player_index:
+            candidates.append(replace(case, starting_player_index=0))
+        for candidate in candidates:
+            candidate_mismatch = find_mismatch(candidate, rules)
+            if candidate_mismatch is not None:
+                case, mismatch, is_shrunk = candidate, candidate_mismatch, True
+                break
+    return case, mismatch
+
+
+def _init_worker(rules_path: str) -> None:
+    global _rules
+    _rules = load_rules(rules_path)
+
+
+def _check_case(arguments: tuple[int, int, int]) -> dict | None:
+    seed, index, max_bids = arguments
+    case = generate_case(seed, index, max_bids)
+    if find_mismatch(case, _rules) is None:
+        return None
+    shrunk_case, mismatch = shrink_case(case, _rules)
+    return {"index": index, "case": asdict(case), "shrunk_case": asdict(shrunk_case), "mismatch": mismatch}
+
+
+def fuzz(
+    nb_cases: int,
+    rules_path: str = DEFAULT_RULES,
+    seed: int = 0,
+    nb_workers: int | None = None,
+    max_bids: int = DEFAULT_MAX_BIDS
+) -> list[dict]:
+    """
+    Compare rules with the engine on random cases in parallel, and shrink the ones where they disagree
+    :param nb_cases: the number of cases
+    :param rules_path: the path of the class of the rules, as module:class
+    :param seed: the seed of the campaign of cases
+    :param nb_workers: the number of processes, all the cores if None
+    :param max_bids: the maximum number of bids tried in a case
+    :return: the failing cases, with their index, their shrunk version and its mismatch
+    """
+    arguments = [(seed, index, max_bids) for index in range(nb_cases)]
+    if nb_workers == 1:
+        _init_worker(rules_path)
+        results = [_check_case(argument) for argument in arguments]
+    else:
+        with Pool(nb_workers, initializer=_init_worker, initargs=(rules_path,)) as pool:
+            chunksize = max(1, nb_cases // (4 * (nb_workers or os.cpu_count())))
+            results = pool.map(_check_case, arguments, chunksize=chunksize)
+    return [result for result in results if result is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare an implementation of the rules with the engine on random rounds")
+    parser.add_argument("--rules", default=DEFAULT_RULES, help="class of the rules checked, as module:class")
+    parser.add_argument("--cases", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-bids", type=int, default=DEFAULT_MAX_BIDS)
+    parser.add_argument("--replay", help="JSON file of a case to check again instead of random ones")
+    parser.add_argument("-o", "--output", help="JSON file of the failing cases")
+    args = parser.parse_args()
+    if args.replay:
+        with open(args.replay) as fp:
+            case = FuzzCase.from_dict(json.load(fp))
+        mismatch = find_mismatch(case, load_rules(args.rules))
+        print(mismatch or "The rules agree with the engine")
+        raise SystemExit(mismatch is not None)
+    failures = fuzz(args.cases, args.rules, args.seed, args.workers, args.max_bids)
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(failures, fp, indent=2)
+    for failure in failures:
+        print(f"case {failure['index']}: {failure['mismatch']}")
+        print(f"  {json.dumps(failure['shrunk_case'])}")
+    print(f"{len(failures)} failing cases out of {args.cases}")
+    raise SystemExit(bool(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+from robolot.models import CARD_IDS
+from robolot.rules import (
+    ALL_CARDS_MASK,
+    ALL_TRUMP_INDEX,
+    CARD_STRENGTHS,
+    COLOR_MASKS,
+    NB_CARDS,
+    get_trick_winner,
+    get_trump_color_index,
+    iter_cards
+)
+
+ALL_PLAYERS_MASK = 0b1111
+
+
+class InformationSet:
+    def __init__(self, seat: int, hand: int, trump_index: int | None = None, bids: list[tuple] | None = None):
+        """
+        What a player knows about the location of the cards during a round
+        Each card keeps the mask of the players who can hold it, updated at each played card
+        :param seat: the index of the player
+        :param hand: the mask of the cards of the player
+        :param trump_index: the index of the contract
+        :param bids: the rows of the bid memory of the round, used to weight the hands of the other players
+        """
+        self.seat = seat
+        self.trump_index = trump_index
+        self.bids = bids if bids is not None else []
+        self.holders = [
+            1 << seat if hand >> card & 1 else ALL_PLAYERS_MASK & ~(1 << seat)
+            for card in range(NB_CARDS)
+        ]
+        # The cards each player can hold, kept in sync with the holders
+        self.possible = [0] * 4
+        for card in range(NB_CARDS):
+            for player in range(4):
+                if self.holders[card] >> player & 1:
+                    self.possible[player] |= 1 << card
+        self.played = 0
+        # The cards played by each player
+        self.played_cards = [0] * 4
+        self.hand_sizes = [8] * 4
+        self.trick = []
+        # Cache of the number of distributions, reset at each played card
+        self._counts = None
+
+    @classmethod
+    def from_memory(
+        cls,
+        seat: int,
+        hand: int,
+        play_memory,
+        trump_index: int | None = None,
+        bids: list[tuple] | None = None
+    ) -> "InformationSet":
+        """
+        Build the information of a player from the cards played so far in the round
+        :param hand: the mask of the cards still held by the player
+        :param play_memory: the cards played during the round, in order
+        """
+        played_by_seat = 0
+        for player_index, card_value, card_color in play_memory.rows:
+            if player_index == seat:
+                played_by_seat |= 1 << CARD_IDS[(card_color, card_value)]
+        information_set = cls(seat, hand | played_by_seat, trump_index, bids)
+        for player_index, card_value, card_color in play_memory.rows:
+            information_set.observe(player_index, CARD_IDS[(card_color, card_value)])
+        return information_set
+
+    def _remove_holder(self, player: int, cards: int) -> None:
+        """
+        Indicate that a player cannot hold some cards
+        """
+        for card in iter_cards(cards & self.possible[player]):
+            self.holders[card] &= ~(1 << player)
+        self.possible[player] &= ~cards
+
+    def observe(self, player: int, card: int) -> None:
+        """
+        Update the information with a played card
+        :param player: the index of the player who played the card
+        :param card: the identifier of the card
+        """
+        trump_index = self.trump_index
+        trump_color_index = get_trump_color_index(trump_index)
+        if self.trick:
+            asked_color = self.trick[0] >> 3
+            if card >> 3 != asked_color:
+                # A player who does not follow the asked color has none of them
+                self._remove_holder(player, COLOR_MASKS[asked_color])
+                # A player who does not cut while his partner is not winning has no trump card
+                is_partner_winning = (
+                    len(self.trick) >= 2 and get_trick_winner(self.trick, trump_index) == len(self.trick) - 2
+                )
+                if trump_color_index is not None and card >> 3 != trump_color_index and not is_partner_winning:
+                    self._remove_holder(player, COLOR_MASKS[trump_color_index])
+            # A player who plays under a previous trump card has no higher trump card,
+            # every color being played like the trump color when all colors are trump
+            if trump_index == ALL_TRUMP_INDEX:
+                trump_color_index = asked_color
+            if trump_color_index is not None and card >> 3 == trump_color_index:
+                strengths = CARD_STRENGTHS[trump_index]
+                highest_trump = max((strengths[c] for c in self.trick if c >> 3 == trump_color_index), default=None)
+                if highest_trump is not None and strengths[card] < highest_trump:
+                    higher_trumps = 0
+                    for trump_card in iter_cards(COLOR_MASKS[trump_color_index]):
+                        if strengths[trump_card] > highest_trump:
+                            higher_trumps |= 1 << trump_card
+                    self._remove_holder(player, higher_trumps)
+        for holder in range(4):
+            if self.holders[card] >> holder & 1:
+                self.possible[holder] &= ~(1 << card)
+        self.holders[card] = 0
+        self.played |= 1 << card
+        self.played_cards[player] |= 1 << card
+        self.hand_sizes[player] -= 1
+        self.trick.append(card)
+        if len(self.trick) == 4:
+            self.trick = []
+        self._counts = None
+
+    def get_remaining_cards(self, color_index: int | None = None) -> int:
+        """
+        Get the mask of the cards that have not been played yet, the ones of the player included
+        :param color_index: the color of the cards, all colors if None
+        """
+        remaining = ALL_CARDS_MASK & ~self.played
+        return remaining & COLOR_MASKS[color_index] if color_index is not None else remaining
+
+    def get_possible_cards(self, player: int) -> int:
+        """
+        Get the mask of the cards a player can still hold
+        """
+        return self.possible[player]
+
+    def get_possible_holders(self, card: int) -> list[int]:
+        return [player for player in range(4) if self.holders[card] >> player & 1]
+
+    def get_known_cards(self, player: int) -> int:
+        """
+        Get the mask of the cards that can only be held by a player
+        """
+        return sum(1 << card for card in iter_cards(self.possible[player]) if self.holders[card] == 1 << player)
+
+    def is_void(self, player: int, color_index: int) -> bool:
+        return not self.possible[player] & COLOR_MASKS[color_index]
+
+    def _count(self, cards: list[int], others: list[int], index: int, capacities: tuple[int, ...]) -> int:
+        """
+        Count the ways to distribute the cards from the given index among the other players
+        """
+        if index == len(cards):
+            return 1
+        key = (index, capacities)
+        count = self._counts.get(key)
+        if count is None:
+            count = 0
+            holders = self.holders[cards[index]]
+            for k, player in enumerate(others):
+                if capacities[k] and holders >> player & 1:
+                    count += self._count(
+                        cards, others, index + 1, capacities[:k] + (capacities[k] - 1,) + capacities[k + 1:]
+                    )
+            self._counts[key] = count
+        return count
+
+    def _prepare_counts(self) -> tuple[list[int], list[int], tuple[int, ...]]:
+        others = [player for player in range(4) if player != self.seat]
+        # The player only holds his own cards, the other ones are hidden
+        cards = list(iter_cards(self.get_remaining_cards() & ~self.possible[self.seat]))
+        if self._counts is None:
+            self._counts = {}
+        return cards, others, tuple(self.hand_sizes[player] for player in others)
+
+    def count_distributions(self) -> int:
+        """
+        Count the distributions of the hidden cards consistent with the information
+        """
+        cards, others, capacities = self._prepare_counts()
+        return self._count(cards, others, 0, capacities)
+
+    def sample(self, rng) -> list[int]:
+        """
+        Draw a distribution of the hidden cards, uniformly among the consistent ones
+        :param rng: the random generator, with a randbelow method like CounterRng
+        :return: the mask of the cards of each player
+        """
+        cards, others, capacities = self._prepare_counts()
+        total = self._count(cards, others, 0, capacities)
+        if total == 0:
+            raise ValueError("No distribution of the cards is consistent with the information")
+        hands = [0] * 4
+        hands[self.seat] = self.possible[self.seat]
+        for index, card in enumerate(cards):
+            draw = rng.randbelow(total)
+            for k, player in enumerate(others):
+                if capacities[k] and self.holders[card] >> player & 1:
+                    next_capacities = capacities[:k] + (capacities[k] - 1,) + capacities[k + 1:]
+                    count = self._count(cards, others, index + 1, next_capacities)
+                    if draw < count:
+                        hands[player] |= 1 << card
+                        capacities = next_capacities
+                        total = count
+                        break
+                    draw -= count
+        return hands
+
+    def iter_distributions(self):
+        """
+        Iterate over all the distributions of the hidden cards consistent with the information
+        """
+        cards, others, capacities = self._prepare_counts()
+
+        def distribute(index, capacities, hands):
+            if index == len(cards):
+                yield list(hands)
+                return
+            card = cards[index]
+            for k, player in enumerate(others):
+                if capacities[k] and self.holders[card] >> player & 1:
+                    next_capacities = capacities[:k] + (capacities[k] - 1,) + capacities[k + 1:]
+                    if self._count(cards, others, index + 1, next_capacities):
+                        hands[player] |= 1 << card
+                        yield from distribute(index + 1, next_capacities, hands)
+                        hands[player] &= ~(1 << card)
+
+        hands = [0] * 4
+        hands[self.seat] = self.possible[self.seat]
+        yield from distribute(0, capacities, hands)
@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+from time import perf_counter_ns
+
+
+# Environment variable enabling the instrumentation of every engine
+INSTRUMENTATION_ENV_VAR = "ROBOLOT_INSTRUMENT"
+
+# Engine methods that are timed, with the name of the corresponding phase
+INSTRUMENTED_PHASES = {
+    "bid": "bid",
+    "_check_bid_validity": "check_bid_validity",
+    "play": "play",
+    "_check_card_validity": "check_card_validity",
+    "_get_pli_info": "get_pli_info",
+    "deal": "deal",
+    "_export_memory": "export_memory",
+}
+
+
+def is_instrumentation_enabled() -> bool:
+    """
+    Check whether the instrumentation has been requested through the environment
+    """
+    return os.environ.get(INSTRUMENTATION_ENV_VAR, "").lower() in ("1", "true", "yes", "on")
+
+
+class EngineStats:
+    def __init__(self):
+        """
+        Timers and counters collected on the phases of an engine
+        """
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Reset all the timers and counters
+        """
+        with self._lock:
+            self.calls = {phase: 0 for phase in INSTRUMENTED_PHASES.values()}
+            self.total_ns = {phase: 0 for phase in INSTRUMENTED_PHASES.values()}
+            self.max_ns = {phase: 0 for phase in INSTRUMENTED_PHASES.values()}
+            self.rejected_bids = 0
+            self.rejected_cards = 0
+
+    def record(self, phase: str, elapsed_ns: int) -> None:
+        """
+        Record a call to a phase
+        :param phase: the name of the phase
+        :param elapsed_ns: the duration of the call, in nanoseconds
+        """
+        with self._lock:
+            self.calls[phase] += 1
+            self.total_ns[phase] += elapsed_ns
+            if elapsed_ns > self.max_ns[phase]:
+                self.max_ns[phase] = elapsed_ns
+
+    def record_rejection(self, phase: str) -> None:
+        """
+        Record a bid or a card that has been rejected by the engine
+        :param phase: the validity check that rejected the action
+        """
+        with self._lock:
+            if phase == "check_bid_validity":
+                self.rejected_bids += 1
+            else:
+                self.rejected_cards += 1
+
+    def snapshot(self) -> dict:
+        """
+        Export the current state of the timers and counters
+        :return: a JSON serializable dictionary
+        """
+        with self._lock:
+            return {
+                "phases": {
+                    phase: {
+                        "calls": self.calls[phase],
+                        "total_s": self.total_ns[phase] / 1e9,
+                        "mean_s": self.total_ns[phase] / self.calls[phase] / 1e9 if self.calls[phase] else 0.0,
+                        "max_s": self.max_ns[phase] / 1e9,
+                    }
+                    for phase in self.calls
+                },
+                "rejected_bids": self.rejected_bids,
+                "rejected_cards": self.rejected_cards,
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self) -> str:
+        """
+        Export the current state of the timers and counters in the Prometheus text format
+        """
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP robolot_engine_calls_total Number of calls per engine phase",
+            "# TYPE robolot_engine_calls_total counter",
+        ]
+        for phase, stats in snapshot["phases"].items():
+            lines.append(f'robolot_engine_calls_total{{phase="{phase}"}} {stats["calls"]}')
+        lines += [
+            "# HELP robolot_engine_phase_seconds_total Time spent per engine phase",
+            "# TYPE robolot_engine_phase_seconds_total counter",
+        ]
+        for phase, stats in snapshot["phases"].items():
+            lines.append(f'robolot_engine_phase_seconds_total{{phase="{phase}"}} {stats["total_s"]:.9f}')
+        lines += [
+            "# HELP robolot_engine_phase_seconds_max Longest call per engine phase",
+            "# TYPE robolot_engine_phase_seconds_max gauge",
+        ]
+        for phase, stats in snapshot["phases"].items():
+            lines.append(f'robolot_engine_phase_seconds_max{{phase="{phase}"}} {stats["max_s"]:.9f}')
+        lines += [
+            "# HELP robolot_engine_rejected_bids_total Number of bids rejected by the engine",
+            "# TYPE robolot_engine_rejected_bids_total counter",
+            f"robolot_engine_rejected_bids_total {snapshot['rejected_bids']}",
+            "# HELP robolot_engine_rejected_cards_total Number of cards rejected by the engine",
+            "# TYPE robolot_engine_rejected_cards_total counter",
+            f"robolot_engine_rejected_cards_total {snapshot['rejected_cards']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _timed(stats: EngineStats, phase: str, method, count_rejections: bool = False):
+    """
+    Wrap a method so that its calls are timed
+    :param stats: the stats in which the calls are recorded
+    :param phase: the name of the phase
+    :param method: the bound method to wrap
+    :param count_rejections: whether a False result is counted as a rejection
+    """
+    def wrapper(*args, **kwargs):
+        start = perf_counter_ns()
+        try:
+            result = method(*args, **kwargs)
+        finally:
+            stats.record(phase, perf_counter_ns() - start)
+        if count_rejections and result is False:
+            stats.record_rejection(phase)
+        return result
+    wrapper.__wrapped__ = method
+    return wrapper
+
+
+def instrument(engine, stats: EngineStats | None = None) -> EngineStats:
+    """
+    Time the phases of an engine
+    The wrappers are only set on the given instance, so that the engines which are
+    not instrumented keep calling their methods directly
+    :param engine: the engine to instrument
+    :param stats: the stats in which the calls are recorded, a new one is created if None
+    :return: the stats of the engine
+    """
+    if stats is None:
+        stats = EngineStats()
+    for method_name, phase in INSTRUMENTED_PHASES.items():
+        setattr(
+            engine,
+            method_name,
+            _timed(stats, phase, getattr(engine, method_name), method_name.startswith("_check_"))
+        )
+    return stats
+
+
+def serve_metrics(stats: EngineStats, host: str = "127.0.0.1", port: int = 9108) -> "http.server.ThreadingHTTPServer":
+    """
+    Serve the stats of an engine on a local HTTP endpoint, in a background thread
+    /metrics returns the Prometheus text page and /stats.json the JSON snapshot
+    :param stats: the stats to serve
+    :param host: the address to listen on
+    :param port: the port to listen on, 0 picks a free one
+    :return: the running server, stopped with its shutdown method
+    """
+    # The HTTP server is only imported when the metrics are served, it would double the import time of the engine
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = stats.to_prometheus().encode()
+                content_type = "text/plain; version=0.0.4"
+            elif self.path == "/stats.json":
+                body = stats.to_json().encode()
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            # We do not want the requests to be written on the game output
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,477 @@
+import math
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from robolot.auction import AuctionModel, AuctionSampler
+from robolot.information import InformationSet
+from robolot.memory import Memory, column_max
+from robolot.models import BID_COLORS, BID_VALUES, CARD_IDS
+from robolot.rng import CounterRng
+from robolot.rules import (
+    get_belote_colors,
+    get_legal_cards,
+    get_trick_points,
+    get_trick_winner,
+    get_trump_index,
+    iter_cards
+)
+
+
+DEFAULT_TIME_BUDGET = 0.5
+DEFAULT_MAX_ITERATIONS = 5_000
+DEFAULT_MAX_NODES = 250_000
+DEFAULT_EXPLORATION = 0.7
+
+# The actions of the tree are the card identifiers, then passing and the bids of the robot
+PASS_ACTION = 32
+FIRST_BID_ACTION = 33
+NO_CHILD = -1
+# The bids of the robot searched, from the lowest above the current one
+BID_CANDIDATES = [(bid_value, bid_color) for bid_value in BID_VALUES for bid_color in BID_COLORS]
+
+
+class SearchTree:
+    def __init__(self, max_nodes: int = DEFAULT_MAX_NODES):
+        """
+        Tree of a search, stored in preallocated arrays indexed by node
+        The children of a node are contiguous, from its first child
+        :param max_nodes: the number of nodes allocated, the tree stops growing once they are used
+        """
+        self.max_nodes = max_nodes
+        self.visits = np.zeros(max_nodes, dtype=np.int32)
+        self.value_sums = np.zeros(max_nodes, dtype=np.float64)
+        # Number of times a node could have been selected, its action being legal
+        self.availabilities = np.zeros(max_nodes, dtype=np.int32)
+        self.actions = np.zeros(max_nodes, dtype=np.int16)
+        # The player who chose the action of the node
+        self.players = np.zeros(max_nodes, dtype=np.int8)
+        self.first_children = np.full(max_nodes, NO_CHILD, dtype=np.int32)
+        self.nb_children = np.zeros(max_nodes, dtype=np.int16)
+        self.nb_nodes = 0
+
+    def clear(self) -> int:
+        """
+        Remove every node and add a new root
+        :return: the index of the root
+        """
+        self.nb_nodes = 0
+        self._allocate(1, 0, -1)
+        return 0
+
+    def _allocate(self, nb_nodes: int, player: int, action: int) -> int:
+        start = self.nb_nodes
+        end = start + nb_nodes
+        self.visits[start:end] = 0
+        self.value_sums[start:end] = 0
+        self.availabilities[start:end] = 0
+        self.actions[start:end] = action
+        self.players[start:end] = player
+        self.first_children[start:end] = NO_CHILD
+        self.nb_children[start:end] = 0
+        self.nb_nodes = end
+        return start
+
+    def expand(self, node: int, player: int, actions: list[int]) -> bool:
+        """
+        Add the children of a node
+        :param player: the player choosing among the actions
+        :param actions: the actions of the children
+        :return: whether there was enough space left in the tree
+        """
+        if self.nb_nodes + len(actions) > self.max_nodes:
+            return False
+        start = self._allocate(len(actions), player, 0)
+        self.actions[start:self.nb_nodes] = actions
+        self.first_children[node] = start
+        self.nb_children[node] = len(actions)
+        return True
+
+    def find_child(self, node: int, action: int) -> int | None:
+        start = self.first_children[node]
+        if start == NO_CHILD:
+            return None
+        matches = np.flatnonzero(self.actions[start:start + self.nb_children[node]] == action)
+        return int(start + matches[0]) if matches.size else None
+
+    def get_root_statistics(self, root: int) -> dict[int, tuple[int, float]]:
+        """
+        Get the visits and the sum of the values of each action of the root
+        """
+        start = self.first_children[root]
+        if start == NO_CHILD:
+            return {}
+        end = start + self.nb_children[root]
+        return {
+            int(action): (int(visits), float(value_sum))
+            for action, visits, value_sum in zip(self.actions[start:end], self.visits[start:end], self.value_sums[start:end])
+        }
+
+
+class _RoundState:
+    __slots__ = ("hands", "trick", "leader", "trump_index", "points", "trick_winners")
+
+    def __init__(self, hands: list[int], trick: list[int], leader: int, trump_index: int | None):
+        """
+        Cards of a round played on masks, from a known distribution of the cards
+        """
+        self.hands = hands
+        self.trick = trick
+        self.leader = leader
+        self.trump_index = trump_index
+        self.points = [0, 0]
+        self.trick_winners = []
+
+    def get_player(self) -> int:
+        return (self.leader + len(self.trick)) % 4
+
+    def is_over(self) -> bool:
+        return not self.trick and not self.hands[self.leader]
+
+    def get_legal_cards(self) -> int:
+        return get_legal_cards(self.hands[self.get_player()], self.trick, self.trump_index)
+
+    def play(self, card: int) -> None:
+        self.hands[self.get_player()] &= ~(1 << card)
+        self.trick.append(card)
+        if len(self.trick) == 4:
+            winner = (self.leader + get_trick_winner(self.trick, self.trump_index)) % 4
+            self.points[winner % 2] += get_trick_points(self.trick, self.trump_index)
+            self.trick_winners.append(winner)
+            self.leader = winner
+            self.trick = []
+
+
+class ISMCTS:
+    def __init__(
+        self,
+        time_budget: float | None = DEFAULT_TIME_BUDGET,
+        max_iterations: int | None = DEFAULT_MAX_ITERATIONS,
+        max_nodes: int = DEFAULT_MAX_NODES,
+        exploration: float = DEFAULT_EXPLORATION,
+        nb_workers: int = 1,
+        seed: int | None = None,
+        auction_model: AuctionModel | None = None
+    ):
+        """
+        Information set Monte Carlo tree search, for the bids and the cards of the robots
+        Each iteration draws a distribution of the hidden cards consistent with what the player knows,
+        and walks down a single tree shared by all the distributions, among the legal actions
+        :param time_budget: the maximum duration of a decision in seconds, no limit if None
+        :param max_iterations: the maximum number of iterations of a decision, no limit if None
+        :param max_nodes: the number of nodes of the tree of each player
+        :param exploration: the exploration constant of the upper confidence bound
+        :param nb_workers: the number of processes searching independent trees, whose statistics are merged
+        :param seed: the seed of the random generator of the search
+        :param auction_model: the likelihoods of the hands given the bids, the distributions are uniform if None
+        """
+        if time_budget is None and max_iterations is None:
+            raise ValueError("The search needs a time budget or a maximum number of iterations")
+        self.time_budget = time_budget
+        self.max_iterations = max_iterations
+        self.max_nodes = max_nodes
+        self.exploration = exploration
+        self.nb_workers = nb_workers
+        self.rng = CounterRng(seed)
+        self.auction_model = auction_model
+        # The tree of each player, with its root and the cards played before the root
+        self.trees = {}
+        self.pool = None
+
+    def __getstate__(self):
+        # The trees and the pool stay in the process that created them
+        state = self.__dict__.copy()
+        state["trees"] = {}
+        state["pool"] = None
+        return state
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def _get_tree(self, player_index: int) -> SearchTree:
+        if player_index not in self.trees:
+            self.trees[player_index] = [SearchTree(self.max_nodes), 0, None]
+        return self.trees[player_index][0]
+
+    def _iterate(
+        self,
+        tree: SearchTree,
+        root: int,
+        information_set: InformationSet,
+        trick: list[int],
+        leader: int,
+        trump_index: int | None,
+        bid_candidates: list[tuple[int, str]] | None,
+        sampler: InformationSet | AuctionSampler
+    ) -> None:
+        """
+        Run one iteration of the search on a distribution of the hidden cards
+        :param bid_candidates: the bids of the robot at the root, None when a card is chosen
+        :param sampler: the sampler of the distributions, the information set or an AuctionSampler
+        """
+        rng = self.rng
+        hands = sampler.sample(rng)
+        seat = information_set.seat
+        state = _RoundState(hands, list(trick), leader, trump_index)
+        path = [root]
+        node = root
+        played = 0
+        bid_value = None
+        belote_points = 0
+        is_new_node = False
+        if bid_candidates is not None:
+            if tree.first_children[root] == NO_CHILD:
+                tree.expand(root, seat, list(range(PASS_ACTION, FIRST_BID_ACTION + len(bid_candidates))))
+            node = self._select(tree, root, None)
+            path.append(node)
+            is_new_node = tree.visits[node] == 0
+            action = int(tree.actions[node])
+            if action == PASS_ACTION:
+                self._backpropagate(tree, path, 0.5)
+                return
+            bid_value, bid_color = bid_candidates[action - FIRST_BID_ACTION]
+            state.trump_index = get_trump_index(bid_color)
+            # The belote is held by the team of the robot when one of them has the king and the queen of trump
+            for color_index in get_belote_colors(state.trump_index):
+                belote_shift = 8 * color_index + 4
+                if any(hands[player] >> belote_shift & 0b11 == 0b11 for player in (seat, (seat + 2) % 4)):
+                    belote_points += 20
+        # Selection and expansion, until a node is visited for the first time
+        while not is_new_node and not state.is_over():
+            player = state.get_player()
+            if tree.first_children[node] == NO_CHILD:
+                candidates = information_set.possible[player] & ~played
+                if not tree.expand(node, player, list(iter_cards(candidates))):
+                    break
+            node = self._select(tree, node, state.get_legal_cards())
+            path.append(node)
+            is_new_node = tree.visits[node] == 0
+            card = int(tree.actions[node])
+            played |= 1 << card
+            state.play(card)
+        # Simulation with random cards
+        while not state.is_over():
+            cards = list(iter_cards(state.get_legal_cards()))
+            state.play(cards[rng.randbelow(len(cards))])
+        self._backpropagate(tree, path, self._get_reward(state, seat, bid_value, belote_points, bid_candidates))
+
+    def _select(self, tree: SearchTree, node: int, legal_cards: int | None) -> int:
+        """
+        Select the child of a node with the highest upper confidence bound among the legal actions,
+        a child that has never been visited being selected first
+        :param legal_cards: the mask of the legal cards, every action being legal if None
+        """
+        start = tree.first_children[node]
+        end = start + tree.nb_children[node]
+        if legal_cards is None:
+            children = np.arange(start, end)
+        else:
+            children = start + np.flatnonzero((legal_cards >> tree.actions[start:end].astype(np.int64)) & 1)
+        tree.availabilities[children] += 1
+        visits = tree.visits[children]
+        unvisited = children[visits == 0]
+        if unvisited.size:
+            return int(unvisited[self.rng.randbelow(unvisited.size)])
+        scores = tree.value_sums[children] / visits + self.exploration * np.sqrt(
+            np.log(tree.availabilities[children]) / visits
+        )
+        return int(children[np.argmax(scores)])
+
+    @staticmethod
+    def _backpropagate(tree: SearchTree, path: list[int], reward: float) -> None:
+        """
+        Add the result of an iteration to the nodes of its path
+        :param reward: the reward of the team 0, the one of the team 1 being its complement
+        """
+        nodes = np.array(path[1:], dtype=np.int64)
+        tree.visits[path[0]] += 1
+        tree.visits[nodes] += 1
+        tree.value_sums[nodes] += np.where(tree.players[nodes] % 2 == 0, reward, 1 - reward)
+
+    @staticmethod
+    def _get_reward(
+        state: _RoundState,
+        seat: int,
+        bid_value: int | None,
+        belote_points: int,
+        bid_candidates: list[tuple[int, str]] | None
+    ) -> float:
+        """
+        Get the reward of the team 0 at the end of a round
+        The share of the points is used when a card is chosen, and the score of the contract when a bid is chosen
+        """
+        if bid_value is None:
+            total_points = state.points[0] + state.points[1]
+            return state.points[0] / total_points if total_points else 0.5
+        team = seat % 2
+        if bid_value == 500:
+            is_fulfilled = all(winner == seat for winner in state.trick_winners)
+        elif bid_value == 250:
+            is_fulfilled = state.points[1 - team] == 0
+        else:
+            is_fulfilled = state.points[team] + belote_points >= bid_value
+        scale = 2 * max(value for value, _ in bid_candidates)
+        reward = 0.5 + (bid_value if is_fulfilled else -bid_value) / scale
+        return reward if team == 0 else 1 - reward
+
+    def _run(
+        self,
+        tree: SearchTree,
+        root: int,
+        information_set: InformationSet,
+        trick: list[int],
+        leader: int,
+        trump_index: int | None,
+        bid_candidates: list[tuple[int, str]] | None = None
+    ) -> dict[int, tuple[int, float]]:
+        """
+        Search within the budgets
+        :return: the visits and the sum of the values of each action of the root
+        """
+        deadline = time.perf_counter() + self.time_budget if self.time_budget is not None else math.inf
+        # The distributions contradicting the auction are drawn less often
+        sampler = (
+            AuctionSampler(self.auction_model, information_set) if self.auction_model is not None else information_set
+        )
+        iteration = 0
+        while (self.max_iterations is None or iteration < self.max_iterations) and (
+            # The clock is only read from time to time
+            iteration % 16 or time.perf_counter() < deadline
+        ):
+            self._iterate(tree, root, information_set, trick, leader, trump_index, bid_candidates, sampler)
+            iteration += 1
+        return tree.get_root_statistics(root)
+
+    def _search(
+        self,
+        tree: SearchTree,
+        root: int,
+        information_set: InformationSet,
+        trick: list[int],
+        leader: int,
+        trump_index: int | None,
+        bid_candidates: list[tuple[int, str]] | None = None
+    ) -> int:
+        """
+        Search from the root, in parallel when several workers are used, and get the most visited action
+        """
+        statistics = [None]
+        if self.nb_workers > 1:
+            if self.pool is None:
+                self.pool = Pool(self.nb_workers - 1)
+            arguments = [
+                (self, self.rng.bits64(), information_set, trick, leader, trump_index, bid_candidates)
+                for _ in range(self.nb_workers - 1)
+            ]
+            result = self.pool.map_async(_search_independent_tree, arguments)
+            statistics[0] = self._run(tree, root, information_set, trick, leader, trump_index, bid_candidates)
+            statistics += result.get()
+        else:
+            statistics[0] = self._run(tree, root, information_set, trick, leader, trump_index, bid_candidates)
+        visits = {}
+        for root_statistics in statistics:
+            for action, (action_visits, _) in root_statistics.items():
+                visits[action] = visits.get(action, 0) + action_visits
+        return max(visits, key=visits.get)
+
+    def choose_card(
+        self,
+        player_index: int,
+        hand: list,
+        play_memory: Memory,
+        pli_cards: list,
+        bid_color: str,
+        information_set: InformationSet | None = None
+    ) -> int:
+        """
+        Choose a card to play
+        The tree of the previous decision of the player is kept when it contains the cards played since
+        :param player_index: the index of the player to move
+        :param hand: the cards of the player, None for the ones already played
+        :param play_memory: the cards played during the round, in order
+        :param pli_cards: the cards of the current pli, the last played first
+        :param bid_color: the color of the contract
+        :param information_set: what the player knows about the hidden cards, rebuilt from the memory if None
+        :return: the position of the card in the hand
+        """
+        hand_ids = {CARD_IDS[(card.color, card.value)]: index for index, card in enumerate(hand) if card is not None}
+        trick = [CARD_IDS[(card.color, card.value)] for card in reversed(pli_cards)]
+        trump_index = get_trump_index(bid_color)
+        hand_mask = sum(1 << card for card in hand_ids)
+        legal_cards = list(iter_cards(get_legal_cards(hand_mask, trick, trump_index)))
+        if len(legal_cards) == 1:
+            return hand_ids[legal_cards[0]]
+        if information_set is None:
+            information_set = InformationSet.from_memory(player_index, hand_mask, play_memory, trump_index)
+        history = tuple(CARD_IDS[(card_color, card_value)] for _, card_value, card_color in play_memory.rows)
+        tree = self._get_tree(player_index)
+        root = self._reuse_root(player_index, history, trump_index)
+        self.trees[player_index][1:] = [root, (history, trump_index)]
+        leader = (player_index - len(trick)) % 4
+        return hand_ids[self._search(tree, root, information_set, trick, leader, trump_index)]
+
+    def _reuse_root(self, player_index: int, history: tuple[int, ...], trump_index: int | None) -> int:
+        """
+        Get the node of the previous tree of a player reached by the cards played since its root,
+        or a new root if there is none
+        """
+        tree, root, root_key = self.trees[player_index]
+        if root_key is not None:
+            root_history, root_trump_index = root_key
+            # At least half of the nodes must be left to search
+            if (
+                root_trump_index == trump_index
+                and history[:len(root_history)] == root_history
+                and tree.nb_nodes < tree.max_nodes // 2
+            ):
+                node = root
+                for card in history[len(root_history):]:
+                    node = tree.find_child(node, card)
+                    if node is None:
+                        break
+                else:
+                    return node
+        return tree.clear()
+
+    def choose_bid(self, player_index: int, hand: list, bid_memory: Memory) -> tuple[int | None, str | None, int, int]:
+        """
+        Choose a bid, among passing and the contracts above the current one
+        The other players are assumed to pass after the bid of the robot
+        :param player_index: the index of the player to bid
+        :param hand: the cards of the player
+        :param bid_memory: the bids of the round so far
+        :return: the value and the color of the bid, and whether the player coinches and surcoinches
+        """
+        current_bid = column_max(bid_memory["bid_value"])
+        bid_candidates = [
+            (bid_value, bid_color) for bid_value, bid_color in BID_CANDIDATES
+            if current_bid is None or bid_value > current_bid
+        ]
+        if not bid_candidates:
+            return None, None, 0, 0
+        hand_mask = sum(1 << CARD_IDS[(card.color, card.value)] for card in hand if card is not None)
+        information_set = InformationSet(player_index, hand_mask, bids=bid_memory.rows)
+        # The round is started by the first player who bid
+        leader = bid_memory.rows[0][0] if bid_memory.rows else player_index
+        tree = self._get_tree(player_index)
+        root = tree.clear()
+        self.trees[player_index][1:] = [root, None]
+        action = self._search(tree, root, information_set, [], leader, None, bid_candidates)
+        if action == PASS_ACTION:
+            return None, None, 0, 0
+        bid_value, bid_color = bid_candidates[action - FIRST_BID_ACTION]
+        return bid_value, bid_color, 0, 0
+
+
+def _search_independent_tree(arguments: tuple) -> dict[int, tuple[int, float]]:
+    """
+    Search a new tree in a worker process, with its own seed
+    """
+    ismcts, seed, information_set, trick, leader, trump_index, bid_candidates = arguments
+    ismcts.rng = CounterRng(seed)
+    tree = SearchTree(ismcts.max_nodes)
+    return ismcts._run(tree, tree.clear(), information_set, trick, leader, trump_index, bid_candidates)
@@ -1,12 +1,32 @@
+import argparse
+import datetime
+import os
+
 import pygame
 
-from robolot.models import Card
+from robolot.models import Card, IMAGES_DIR
+from robolot.contracts import ContractTable
+from robolot.endgame import EndgameSolver
 from robolot.engine import CoincheEngine, GameState
+from robolot.events import MessageLog
+from robolot.replay import Replay, ReplayRecorder
 
 
+# Whether the delays between the steps of the robots are skipped at normal speed
 FAST_PLAY = True
+# The fast-forward advances the robots without drawing, a frame being drawn once its budget is spent
+FAST_FORWARD_KEY = pygame.K_f
+FRAME_BUDGET_MS = 16
+# Number of last events whose messages are displayed during the fast-forward
+FAST_FORWARD_EVENTS = 4
 TARGET_SCORE = 1000
-BASE_CARDBACK = pygame.image.load('images/back_card.png')
+ENDGAME_CACHE_PATH = "memory/endgame_cache.pkl"
+CONTRACT_TABLE_PATH = "memory/contract_table.bin"
+REPLAY_DIR = "memory/replays"
+# Delay between two events of a replay at normal speed
+REPLAY_STEP_MS = 500
+REPLAY_SPEEDS = [0.25, 0.5, 1, 2, 4, 8, 16]
+BASE_CARDBACK = pygame.image.load(IMAGES_DIR / 'back_card.png')
 COLOR_INACTIVE = pygame.Color('lightskyblue3')
 COLOR_ACTIVE = pygame.Color('dodgerblue2')
 
@@ -19,7 +39,7 @@ def blitRotateCenter(surf, image, topleft, angle):
     surf.blit(rotated_image, new_rect)
 
 
-def render_pli(cards: list[Card]):
+def render_pli(window, cards: list[Card]):
     for i in range(0, len(cards)):
         window.blit(
            pygame.transform.scale(cards[len(cards) - (i + 1)].image, (int(238*0.5), int(332*0.5))),
@@ -27,7 +47,7 @@ def render_pli(cards: list[Card]):
         )
 
 
-def render_player(cards: list[Card], x, y, angle, display_indicators):
+def render_player(window, cards: list[Card], x, y, angle, display_indicators):
     if angle == 90:
        vertical = -1
        horizontal = 0
@@ -57,7 +77,7 @@ def render_player(cards: list[Card], x, y, angle, display_indicators):
                 blitRotateCenter(
                     window,
                     pygame.transform.scale(
-                        pygame.image.load(f"images/{8-i}.png"),
+                        pygame.image.load(IMAGES_DIR / f"{8-i}.png"),
                         (int(30), int(30))
                     ),
                     (
@@ -72,11 +92,11 @@ def renderGame(window, game_engine, message):
     window.fill((39, 174, 96))
     font = pygame.font.SysFont('comicsans',20, True)
 
-    render_pli(game_engine.pli.cards)
-    render_player(game_engine.players[0].hand, 625, 575, 0, game_engine.current_player_index==0 and game_engine.state==GameState.PLAYING)
-    render_player(game_engine.players[1].hand, 850, 125, 90, game_engine.current_player_index==1 and game_engine.state==GameState.PLAYING)
-    render_player(game_engine.players[2].hand, 275, 25, 180, game_engine.current_player_index==2 and game_engine.state==GameState.PLAYING)
-    render_player(game_engine.players[3].hand, 50, 475, 270, game_engine.current_player_index==3 and game_engine.state==GameState.PLAYING)
+    render_pli(window, game_engine.pli.cards)
+    render_player(window, game_engine.players[0].hand, 625, 575, 0, game_engine.current_player_index==0 and game_engine.state==GameState.PLAYING)
+    render_player(window, game_engine.players[1].hand, 850, 125, 90, game_engine.current_player_index==1 and game_engine.state==GameState.PLAYING)
+    render_player(window, game_engine.players[2].hand, 275, 25, 180, game_engine.current_player_index==2 and game_engine.state==GameState.PLAYING)
+    render_player(window, game_engine.players[3].hand, 50, 475, 270, game_engine.current_player_index==3 and game_engine.state==GameState.PLAYING)
 
     if message:
         padding = 0
@@ -86,6 +106,56 @@ def renderGame(window, game_engine, message):
             padding += 30
 
 
+def is_robot_turn(game_engine) -> bool:
+    """
+    Check whether the engine can go on without a human
+    """
+    if game_engine.state in (GameState.BIDDING, GameState.PLAYING):
+        return not game_engine.players[game_engine.current_player_index].is_human
+    return game_engine.state != GameState.ENDED
+
+
+def play_robot_step(game_engine) -> int:
+    """
+    Advance the engine by one step needing no human
+    :return: the delay in seconds before the next step at normal speed
+    """
+    if game_engine.state == GameState.BIDDING_READY:
+        game_engine.start_bidding()
+        return 3
+    if game_engine.state == GameState.PLAYING_READY:
+        game_engine.start_playing()
+        return 3
+    if game_engine.state == GameState.BIDDING:
+        game_engine.bid(*game_engine.players[game_engine.current_player_index].bid(game_engine.bid_memory))
+        return 1
+    if game_engine.state == GameState.PLAYING:
+        game_engine.play(game_engine.players[game_engine.current_player_index].try_card(
+            game_engine.pli,
+            game_engine.play_memory,
+            game_engine.bid_color
+        ))
+        return 1
+    if game_engine.state == GameState.BETWEEN_ROUNDS:
+        game_engine.between_rounds()
+        return 1
+    raise NotImplementedError("This game state doesn't exist")
+
+
+def fast_forward(game_engine, budget_ms: float = FRAME_BUDGET_MS) -> int:
+    """
+    Advance the engine as long as the robots are playing and the budget of the frame is not spent,
+    without drawing the intermediate states
+    :return: the number of steps
+    """
+    deadline = pygame.time.get_ticks() + budget_ms
+    nb_steps = 0
+    while is_robot_turn(game_engine) and (nb_steps == 0 or pygame.time.get_ticks() < deadline):
+        play_robot_step(game_engine)
+        nb_steps += 1
+    return nb_steps
+
+
 class InputBox:
 
     def __init__(self, x, y, w, h, text=''):
@@ -131,61 +201,72 @@ class InputBox:
         pygame.draw.rect(screen, self.color, self.rect, 2)
 
 
-pygame.init()
-bounds = (1024, 768)
-window = pygame.display.set_mode(bounds)
-pygame.display.set_caption("Robolot")
-
-input_box = None
-bid_messages = [
-            ["Please enter your bid value, or press Enter: "],
-            ["Please enter your bid color, or press Enter: "],
-            ["Please enter 1 if you want to coinche, or press Enter: "],
-            ["Please enter 1 if you want to surcoinche, or press Enter: "]
-        ]
-bid_values = [None] * 4
-game_engine = CoincheEngine(target_score=TARGET_SCORE)
-
-run = True
-while run:
-    key = None
-    input_value = None
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            run = False
-        if event.type == pygame.KEYDOWN:
-            key = event.key
-        if input_box:
-            input_value = input_box.handle_event(event)
+def main():
+    """
+    Run the game in a pygame window
+    F toggles the fast-forward, on from the start when no human is seated
+    """
+    pygame.init()
+    bounds = (1024, 768)
+    window = pygame.display.set_mode(bounds)
+    pygame.display.set_caption("Robolot")
 
-    if input_box:
-        input_box.update()
-    message = None
-    delay_s = 1
+    input_box = None
+    bid_messages = [
+                ["Please enter your bid value, or press Enter: "],
+                ["Please enter your bid color, or press Enter: "],
+                ["Please enter 1 if you want to coinche, or press Enter: "],
+                ["Please enter 1 if you want to surcoinche, or press Enter: "]
+            ]
+    bid_values = [None] * 4
+    endgame_solver = EndgameSolver(cache_path=ENDGAME_CACHE_PATH)
+    # The robots bid randomly when no contract table has been built
+    contract_table = ContractTable(CONTRACT_TABLE_PATH) if os.path.exists(CONTRACT_TABLE_PATH) else None
+    game_engine = CoincheEngine(
+        target_score=TARGET_SCORE,
+        endgame_solver=endgame_solver,
+        contract_table=contract_table
+    )
+    # The messages of the game are only formatted when they are displayed
+    message_log = MessageLog([player.name for player in game_engine.players])
+    game_engine.subscribe(message_log)
+    # The game is recorded to be watched again with the replay mode
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    recorder = ReplayRecorder(
+        game_engine,
+        f"{REPLAY_DIR}/game_{datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')}.jsonl"
+    )
 
-    if game_engine.state == GameState.BIDDING_READY:
-        message = game_engine.start_bidding()
-        delay_s = 3
-    elif game_engine.state == GameState.PLAYING_READY:
-        message = game_engine.start_playing()
-        delay_s = 3
-    elif game_engine.state == GameState.BIDDING:
-        if not game_engine.players[game_engine.current_player_index].is_human:
-            (
-                bid_value,
-                bid_color,
-                is_coinched,
-                is_surcoinched
-            ) = game_engine.players[game_engine.current_player_index].bid(game_engine.bid_memory)
-            message = game_engine.bid(
-                bid_value,
-                bid_color,
-                is_coinched,
-                is_surcoinched
-            )
-            bid_values = [None] * 4
-            delay_s = 1
-        else:
+    is_fast_forward = not any(player.is_human for player in game_engine.players)
+    run = True
+    while run:
+        key = None
+        input_value = None
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+            if event.type == pygame.KEYDOWN:
+                key = event.key
+            if input_box:
+                input_value = input_box.handle_event(event)
+
+        # The letter is typed in the input box when there is one
+        if key == FAST_FORWARD_KEY and not input_box:
+            is_fast_forward = not is_fast_forward
+            key = None
+
+        if input_box:
+            input_box.update()
+        message = None
+        delay_s = 1
+
+        # The robots play at normal speed again as soon as a human has to act
+        if is_fast_forward and is_robot_turn(game_engine):
+            fast_forward(game_engine)
+            delay_s = 0
+        elif is_robot_turn(game_engine):
+            delay_s = play_robot_step(game_engine)
+        elif game_engine.state == GameState.BIDDING:
             for i in range(0, 4):
                 if i == 2 and bid_values[0] is not None and bid_values[1] is not None and bid_values[0] != "" and bid_values[1] != "":
                     bid_values[2] = ""
@@ -211,7 +292,7 @@ while run:
                 is_coinched = 0 if bid_values[2] == "" else 1
                 is_surcoinched = 0 if bid_values[3] == "" else 1
 
-                message = game_engine.bid(
+                game_engine.bid(
                     bid_value,
                     bid_color,
                     is_coinched,
@@ -219,25 +300,86 @@ while run:
                 )
                 bid_values = [None] * 4
                 delay_s = 2
-    elif game_engine.state == GameState.PLAYING:
-        if not game_engine.players[game_engine.current_player_index].is_human:
-            card_index = game_engine.players[game_engine.current_player_index].try_card(game_engine.pli, game_engine.play_memory)
-            message = game_engine.play(card_index)
-            delay_s = 1
-        elif key:
-            if key >= 49 and key <= 56:
-                message = game_engine.play(key - 49)
-                delay_s = 1
-    elif game_engine.state == GameState.BETWEEN_ROUNDS:
-        game_engine.between_rounds()
-    elif game_engine.state == GameState.ENDED:
-        pass
+        elif game_engine.state == GameState.PLAYING:
+            if key:
+                if key >= 49 and key <= 56:
+                    game_engine.play(key - 49)
+                    delay_s = 1
+
+        message = message_log.pop_messages(FAST_FORWARD_EVENTS if is_fast_forward else None) or message
+        if is_fast_forward:
+            message = (message or []) + ["Fast-forward, press F to watch at normal speed"]
+        renderGame(window, game_engine, message)
+        if input_box:
+            input_box.draw(window)
+        pygame.display.update()
+        if message and delay_s and not FAST_PLAY:
+            pygame.time.delay(delay_s * 1000)
+
+    recorder.close()
+    game_engine.close()
+
+
+def replay(path: str):
+    """
+    Watch a recorded game in a pygame window
+    Space pauses, up and down change the speed, left and right go to the previous and next trick,
+    page up and page down to the previous and next round
+    """
+    pygame.init()
+    window = pygame.display.set_mode((1024, 768))
+    pygame.display.set_caption("Robolot replay")
+    clock = pygame.time.Clock()
+    game_replay = Replay(path)
+    is_playing = True
+    speed_index = REPLAY_SPEEDS.index(1)
+    next_step_ms = 0
+
+    run = True
+    while run:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    is_playing = not is_playing
+                elif event.key == pygame.K_UP:
+                    speed_index = min(speed_index + 1, len(REPLAY_SPEEDS) - 1)
+                elif event.key == pygame.K_DOWN:
+                    speed_index = max(speed_index - 1, 0)
+                elif event.key == pygame.K_RIGHT:
+                    game_replay.seek_next_stop()
+                elif event.key == pygame.K_LEFT:
+                    game_replay.seek_previous_stop()
+                elif event.key == pygame.K_PAGEDOWN:
+                    game_replay.seek_round(game_replay.state.round_index + 1)
+                elif event.key == pygame.K_PAGEUP:
+                    game_replay.seek_round(game_replay.state.round_index - 1)
+                elif event.key == pygame.K_HOME:
+                    game_replay.seek(0)
+                next_step_ms = pygame.time.get_ticks() + REPLAY_STEP_MS / REPLAY_SPEEDS[speed_index]
+
+        if is_playing and pygame.time.get_ticks() >= next_step_ms:
+            game_replay.step()
+            next_step_ms = pygame.time.get_ticks() + REPLAY_STEP_MS / REPLAY_SPEEDS[speed_index]
+
+        status = (
+            f"Round {game_replay.state.round_index + 1}/{game_replay.nb_rounds}"
+            f" - trick {min(game_replay.state.trick_index + 1, 8)}"
+            f" - x{REPLAY_SPEEDS[speed_index]}{'' if is_playing else ' - paused'}"
+        )
+        renderGame(window, game_replay.state, (game_replay.get_message() or []) + [status])
+        pygame.display.update()
+        clock.tick(60)
+
+    game_replay.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play a game of coinche against the robots")
+    parser.add_argument("--replay", default=None, help="watch a recorded game instead of playing")
+    args = parser.parse_args()
+    if args.replay is not None:
+        replay(args.replay)
     else:
-        raise NotImplementedError("This game state doesn't exist")
-
-    renderGame(window, game_engine, message)
-    if input_box:
-        input_box.draw(window)
-    pygame.display.update()
-    if message and not FAST_PLAY:
-        pygame.time.delay(delay_s * 1000)
\ No newline at end of file
+        main()
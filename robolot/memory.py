@@ -0,0 +1,68 @@
+BID_MEMORY_COLUMNS = ["player_index", "team_index", "bid_value", "bid_color", "has_coinched", "has_surcoinched"]
+PLAY_MEMORY_COLUMNS = ["player_index", "card_value", "card_color"]
+RESULT_MEMORY_COLUMNS = ["team_index", "points"]
+
+
+def is_missing(value) -> bool:
+    """
+    Check whether a value of a memory is empty, either None or NaN
+    """
+    return value is None or value != value
+
+
+def column_max(values):
+    """
+    Get the highest value of a column of a memory, ignoring the empty values
+    :param values: the values of the column
+    :return: the highest value, or None if the column is empty
+    """
+    highest_value = None
+    for value in values:
+        if not is_missing(value) and (highest_value is None or value > highest_value):
+            highest_value = value
+    return highest_value
+
+
+class Memory:
+    def __init__(self, columns: list[str], rows: list[tuple] | None = None):
+        """
+        Lightweight table recording the actions of a round, one row per action
+        Columns can be read like the ones of a DataFrame, which is only built on request
+        :param columns: the names of the columns
+        :param rows: the initial rows of the table
+        """
+        self.columns = list(columns)
+        self.rows = rows if rows is not None else []
+
+    def append(self, *values) -> None:
+        """
+        Add a row at the end of the table
+        :param values: the values of the row, in the order of the columns
+        """
+        self.rows.append(values)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.rows), len(self.columns)
+
+    def __getitem__(self, column: str) -> list:
+        """
+        Get the values of a column
+        """
+        index = self.columns.index(column)
+        return [row[index] for row in self.rows]
+
+    def to_dataframe(self):
+        """
+        Build a DataFrame view of the table
+        pandas is only imported here, so that the engine can run without it
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.rows, columns=self.columns)
+
+    def to_parquet(self, path: str) -> None:
+        self.to_dataframe().to_parquet(path)
@@ -1,15 +1,23 @@
 from enum import Enum
-from random import randint, shuffle, choice
+from pathlib import Path
 
-import pandas as pd
-import pygame
+from robolot.memory import Memory, column_max
+from robolot.rng import CounterRng
 
 
+# Folder containing the images of the game
+IMAGES_DIR = Path(__file__).parent / "images"
+
 # Dumb mode settings
 DUMB_BID_RAISE_PROB = 0.2
 DUMB_COINCHE_PROB = 0.05
 DUMB_SURCOINCHE_PROB = 0.02
 
+# Bid settings
+BID_VALUES = [x * 10 for x in range(8, 17)] + [250, 500]
+# Minimum probability to fulfill a contract for a robot to bid it, when a contract table is used
+CONTRACT_SUCCESS_THRESHOLD = 0.5
+
 # Card points
 CARD_POINTS = {
     "7": 0,
@@ -31,6 +39,28 @@ TRUMP_CARD_POINTS = {
     "9": 14,
     "J": 20
 }
+# Points of the cards without trump, every color being ordered like a color which is not trump
+NO_TRUMP_CARD_POINTS = {
+    "7": 0,
+    "8": 0,
+    "9": 0,
+    "J": 2,
+    "Q": 3,
+    "K": 4,
+    "10": 10,
+    "A": 19
+}
+# Points of the cards when all colors are trump, every color being ordered like the trump color
+ALL_TRUMP_CARD_POINTS = {
+    "7": 0,
+    "8": 0,
+    "Q": 1,
+    "K": 3,
+    "10": 5,
+    "A": 6,
+    "9": 9,
+    "J": 14
+}
 
 
 class Value(Enum):
@@ -51,6 +81,17 @@ class Color(Enum):
     DIAMONDS = "diamonds"
 
 
+# Identifier of each card, colors first then values, so that each color is a block of 8 identifiers
+COLORS = [color.value for color in Color]
+# The contracts without a single trump color, bid in place of a color
+NO_TRUMP = "no_trump"
+ALL_TRUMP = "all_trump"
+BID_COLORS = COLORS + [NO_TRUMP, ALL_TRUMP]
+VALUES = [value.value for value in Value]
+CARD_KEYS = [(color, value) for color in COLORS for value in VALUES]
+CARD_IDS = {card_key: card_id for card_id, card_key in enumerate(CARD_KEYS)}
+
+
 class Card:
     def __init__(self, color: Color, value: Value):
         """
@@ -62,7 +103,18 @@ class Card:
         """
         self.color = color
         self.value = value
-        self.image = pygame.image.load('images/' + self.value + '_of_' + self.color + '.png')
+        self._image = None
+
+    @property
+    def image(self):
+        """
+        The image of the card, loaded on first use so that pygame is only imported for rendering
+        """
+        if self._image is None:
+            import pygame
+
+            self._image = pygame.image.load(IMAGES_DIR / (self.value + '_of_' + self.color + '.png'))
+        return self._image
 
 
 class Deck:
@@ -75,16 +127,21 @@ class Deck:
     def add(self, cards: list[Card]):
         self.cards = cards + self.cards
 
-    def shuffle(self) -> None:
+    def shuffle(self, rng: CounterRng) -> None:
+        """
+        Shuffle the deck
+        :param rng: the random generator to use
+        """
         # We shuffle the cards
-        shuffle(self.cards)
+        rng.shuffle(self.cards)
 
-    def cut(self) -> None:
+    def cut(self, rng: CounterRng) -> None:
         """
         Cut the deck at a random position
+        :param rng: the random generator to use
         """
         # The position where the deck is cut
-        cut_pos = randint(1, len(self.cards) - 1)
+        cut_pos = rng.randint(1, len(self.cards) - 1)
         # The deck is cut then stacked again
         self.cards = self.cards[cut_pos:] + self.cards[:cut_pos]
 
@@ -92,9 +149,8 @@ class Deck:
         """
         Deal a specific number of cards from the top of the deck
         """
-        cards = []
-        for _ in range(0, nb_cards):
-            cards.append(self.cards.pop(0))
+        cards = self.cards[:nb_cards]
+        del self.cards[:nb_cards]
         return cards
     
 
@@ -140,6 +196,10 @@ class Player:
         self.is_human = True
         self.name = name
         self.team = team
+        # The position of the player around the table, set by the engine
+        self.index = None
+        # What the player knows about the hidden cards, set by the engine when it is tracked
+        self.information_set = None
         self.hand = [None] * 8
         self.top_hand_index = 7
     
@@ -152,7 +212,13 @@ class Player:
             self.hand[self.top_hand_index] = card
             self.top_hand_index -= 1
 
-    def try_card(self, _1, _2):
+    def get_hand_mask(self) -> int:
+        """
+        Get the mask of the cards of the player, see CARD_IDS
+        """
+        return sum(1 << CARD_IDS[(card.color, card.value)] for card in self.hand if card is not None)
+
+    def try_card(self, _1, _2, _3=None):
         print(
             "Your cards are:\n" + "\n".join(
                 [str(index + 1) + ' -> ' + card.value + ' of ' + card.color if card is not None else "EMPTY" for index, card in enumerate(self.hand)]
@@ -203,42 +269,93 @@ class Player:
 
 
 class Robolot(Player):
-    def __init__(self, name: str, team: Team, smart_mode: bool = False):
+    def __init__(
+        self,
+        name: str,
+        team: Team,
+        smart_mode: bool = False,
+        endgame_solver=None,
+        contract_table=None,
+        ismcts=None,
+        rng=None
+    ):
+        """
+        Class representing a robot player
+        :param endgame_solver: the EndgameSolver used to play the last tricks, cards are random if None
+        :param contract_table: the ContractTable used to bid, bids are random if None
+        :param ismcts: the ISMCTS used to bid and play, before the contract table and the endgame solver
+        :param rng: the CounterRng of the random bids and cards, one with a random seed if None
+        """
         super().__init__(name, team)
         self.is_human = False
         self.smart_mode = smart_mode
+        self.endgame_solver = endgame_solver
+        self.contract_table = contract_table
+        self.ismcts = ismcts
+        self.rng = rng if rng is not None else CounterRng()
 
-    def try_card(self, pli: Pile, memory: pd.DataFrame):
-        card_index = randint(0, 7)
+    def try_card(self, pli: Pile, memory: Memory, bid_color: str | None = None):
+        """
+        Choose the card to play
+        :param pli: the cards of the current pli
+        :param memory: the cards played during the round
+        :param bid_color: the color of the contract, needed by the endgame solver and the ISMCTS
+        :return: the position of the card in the hand
+        """
+        if self.endgame_solver is not None and bid_color is not None:
+            card_index = self.endgame_solver.choose_card(
+                self.index,
+                self.hand,
+                memory,
+                pli.cards,
+                bid_color,
+                self.information_set
+            )
+            if card_index is not None:
+                return card_index
+        if self.ismcts is not None and bid_color is not None:
+            return self.ismcts.choose_card(
+                self.index,
+                self.hand,
+                memory,
+                pli.cards,
+                bid_color,
+                self.information_set
+            )
+        card_index = self.rng.randint(0, 7)
         while self.hand[card_index] is None:
-            card_index = randint(0, 7)
+            card_index = self.rng.randint(0, 7)
         return card_index
 
-    def bid(self, memory: pd.DataFrame):
+    def bid(self, memory: Memory):
         """
         Create a bid
         """
+        if self.ismcts is not None:
+            return self.ismcts.choose_bid(self.index, self.hand, memory)
+        if self.contract_table is not None:
+            return self._bid_from_contract_table(memory)
         if self.smart_mode:
             raise NotImplementedError("Smart mode has not been implemented yet")
         else:
-            rdm = (randint(1, 100) / 100)
+            rdm = (self.rng.randint(1, 100) / 100)
 
             # Case 1: it raises the bid
             if rdm <= DUMB_BID_RAISE_PROB:
-                current_bid = memory["bid_value"].max()
-                all_possible_bid_values = ([x * 10 for x in range(8, 17)] + [250, 500])
+                current_bid = column_max(memory["bid_value"])
+                all_possible_bid_values = BID_VALUES
 
                 # We choose the bid value and color randomly in the possible values
-                if pd.isnull(current_bid):
-                    bid_value = choice(all_possible_bid_values)
-                    bid_color = choice(list(Color)).value
+                if current_bid is None:
+                    bid_value = self.rng.choice(all_possible_bid_values)
+                    bid_color = self.rng.choice(BID_COLORS)
                 # We cannot exceed the bid limit
                 elif current_bid == 500:
                     bid_value = None
                     bid_color = None
                 else:
-                    bid_value = choice([x for x in all_possible_bid_values if x > current_bid])
-                    bid_color = choice(list(Color)).value
+                    bid_value = self.rng.choice([x for x in all_possible_bid_values if x > current_bid])
+                    bid_color = self.rng.choice(BID_COLORS)
                 
                 return bid_value, bid_color, 0, 0
 
@@ -254,5 +371,20 @@ class Robolot(Player):
             else:
                 return None, None, 0, 0
 
-
-    
\ No newline at end of file
+    def _bid_from_contract_table(self, memory: Memory):
+        """
+        Bid the highest contract above the current one that is likely enough to be fulfilled, or pass
+        """
+        current_bid = column_max(memory["bid_value"])
+        hand = self.get_hand_mask()
+        bid_value = None
+        bid_color = None
+        for trump_index, color in enumerate(COLORS):
+            for value in BID_VALUES:
+                if (current_bid is not None and value <= current_bid) or (bid_value is not None and value <= bid_value):
+                    continue
+                probability = self.contract_table.get_success_probability(hand, trump_index, value)
+                if probability is not None and probability >= CONTRACT_SUCCESS_THRESHOLD:
+                    bid_value = value
+                    bid_color = color
+        return bid_value, bid_color, 0, 0
@@ -0,0 +1,243 @@
+import argparse
+import mmap
+import os
+import struct
+from multiprocessing import Pool
+
+import numpy as np
+
+from robolot.canonical import canonicalize_position
+from robolot.rng import mix64
+from robolot.scoring import RoundArrays, score_rounds
+
+
+# Header of the index file: magic, version, number of positions, number of bits of the buckets
+INDEX_MAGIC = b"RBPI"
+INDEX_VERSION = 1
+HEADER_FORMAT = "<4sIQQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# The positions are sorted by key, and the buckets hold the positions sharing the first bits of their key
+RECORD_DTYPE = np.dtype([
+    ("key", np.uint64),
+    ("count", np.uint32),
+    # Number of times the team of the player won the round, and sum of the card points it made
+    ("wins", np.uint32),
+    ("points", np.uint64)
+])
+RECORDS_PER_BUCKET = 4
+MAX_BUCKET_BITS = 32
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def get_decision_key(hand: int, seen: int, trick: list[int], trump_index: int, is_bidder_team: bool) -> int:
+    """
+    Get a 64 bits key shared by the decisions equal up to a change of colors, whatever the seat of the player
+    :param hand: the mask of the cards of the player
+    :param seen: the mask of the cards played in the previous tricks
+    :param trick: the cards already played in the trick, in order
+    :param trump_index: the index of the contract
+    :param is_bidder_team: whether the player is in the team of the contract
+    """
+    (hand, seen), trick, trump_index, _ = canonicalize_position((hand, seen), tuple(trick), trump_index)
+    # The trick takes 6 bits by card, so that an empty place differs from every card
+    trick_code = 0
+    for card in trick:
+        trick_code = trick_code << 6 | 32 | card
+    return mix64(mix64(hand | seen << 32) ^ (trick_code << 4 | trump_index << 1 | is_bidder_team))
+
+
+def get_round_decisions(round_: dict, team_points: list[int], team_wins: list[bool]) -> list[tuple[int, int, int]]:
+    """
+    Get the key of each card played in a round, with the outcome of the round for the team of the player
+    :param round_: a round loaded by robolot.analysis.load_rounds
+    :param team_points: the card points made by each team
+    :param team_wins: whether each team won the round
+    :return: the key, whether the team won and its points, for each decision
+    """
+    hands = [0] * 4
+    for player_index, card in round_["plays"]:
+        hands[player_index] |= 1 << card
+    trump_index = int(round_["contract"])
+    decisions = []
+    seen = 0
+    trick = []
+    for player_index, card in round_["plays"]:
+        team_index = player_index % 2
+        key = get_decision_key(
+            hands[player_index], seen, trick, trump_index, team_index == round_["bidder_team_index"]
+        )
+        decisions.append((key, team_wins[team_index], team_points[team_index]))
+        hands[player_index] &= ~(1 << card)
+        trick.append(card)
+        if len(trick) == 4:
+            for trick_card in trick:
+                seen |= 1 << trick_card
+            trick = []
+    return decisions
+
+
+def reduce_records(records: np.ndarray) -> np.ndarray:
+    """
+    Sort records by key and sum the statistics of the records with the same key
+    """
+    records = records[np.argsort(records["key"], kind="stable")]
+    keys, starts = np.unique(records["key"], return_index=True)
+    reduced = np.empty(len(keys), dtype=RECORD_DTYPE)
+    reduced["key"] = keys
+    for name in RECORD_DTYPE.names[1:]:
+        reduced[name] = np.add.reduceat(records[name], starts) if len(keys) else []
+    return reduced
+
+
+def index_rounds(rounds: list[dict]) -> np.ndarray:
+    """
+    Get the records of the decisions of rounds loaded by robolot.analysis.load_rounds
+    :return: the records, sorted by key
+    """
+    if not rounds:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    arrays = RoundArrays.from_rounds(rounds)
+    results = score_rounds(arrays)
+    records = np.zeros(32 * len(rounds), dtype=RECORD_DTYPE)
+    index = 0
+    for round_, contract, team_points, scores in zip(rounds, arrays.contracts, results["team_points"], results["scores"]):
+        for key, is_win, points in get_round_decisions(
+            {**round_, "contract": contract}, team_points.tolist(), (scores > 0).tolist()
+        ):
+            records[index] = (key, 1, is_win, points)
+            index += 1
+    return reduce_records(records)
+
+
+def write_index(path: str, records: np.ndarray) -> None:
+    """
+    Write sorted records in an index file, with the offsets of the buckets of their keys
+    """
+    bucket_bits = min(MAX_BUCKET_BITS, max(1, (len(records) // RECORDS_PER_BUCKET).bit_length()))
+    prefixes = records["key"] >> np.uint64(64 - bucket_bits)
+    offsets = np.searchsorted(prefixes, np.arange((1 << bucket_bits) + 1, dtype=np.uint64)).astype(np.uint64)
+    # The index is replaced at once, so that the readers never see a partial file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fp:
+        fp.write(struct.pack(HEADER_FORMAT, INDEX_MAGIC, INDEX_VERSION, len(records), bucket_bits))
+        fp.write(offsets.tobytes())
+        fp.write(np.ascontiguousarray(records, dtype=RECORD_DTYPE).tobytes())
+    os.replace(tmp_path, path)
+
+
+def _index_chunk(rounds: list[dict]) -> np.ndarray:
+    return index_rounds(rounds)
+
+
+def build_position_index(
+    path: str,
+    rounds: list[dict],
+    merged_paths: list[str] | None = None,
+    nb_workers: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """
+    Index the decisions of rounds in parallel, merged with existing indexes
+    :param path: the file of the index, which can be one of the merged ones
+    :param rounds: the rounds loaded by robolot.analysis.load_rounds
+    :param merged_paths: the indexes whose positions are added to the ones of the rounds
+    :param nb_workers: the number of processes, the number of CPUs if None
+    :param chunk_size: the number of rounds indexed at once by a process
+    :return: the number of distinct positions
+    """
+    chunks = [rounds[start:start + chunk_size] for start in range(0, len(rounds), chunk_size)]
+    if nb_workers == 1 or len(chunks) <= 1:
+        parts = [_index_chunk(chunk) for chunk in chunks]
+    else:
+        with Pool(nb_workers) as pool:
+            parts = pool.map(_index_chunk, chunks)
+    for merged_path in merged_paths or []:
+        index = PositionIndex(merged_path)
+        parts.append(np.array(index.records))
+        index.close()
+    records = reduce_records(np.concatenate(parts)) if parts else np.zeros(0, dtype=RECORD_DTYPE)
+    write_index(path, records)
+    return len(records)
+
+
+class PositionIndex:
+    def __init__(self, path: str):
+        """
+        Read-only access to an index of positions, mapped in memory
+        A key is found in its bucket, which holds a few positions on average
+        :param path: the file of the index
+        """
+        self.path = path
+        with open(path, "rb") as fp:
+            self.buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, nb_records, bucket_bits = struct.unpack_from(HEADER_FORMAT, self.buffer)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"{path} is not a position index")
+        self.shift = 64 - bucket_bits
+        nb_offsets = (1 << bucket_bits) + 1
+        self.offsets = np.frombuffer(self.buffer, dtype=np.uint64, count=nb_offsets, offset=HEADER_SIZE)
+        self.records = np.frombuffer(
+            self.buffer, dtype=RECORD_DTYPE, count=nb_records, offset=HEADER_SIZE + 8 * nb_offsets
+        )
+        self.keys = self.records["key"]
+
+    def __getstate__(self):
+        # The mapping is opened again by each process instead of being copied
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def close(self) -> None:
+        # The views must be released before the mapping
+        del self.offsets, self.records, self.keys
+        self.buffer.close()
+
+    def _find(self, key: int) -> int | None:
+        prefix = key >> self.shift
+        start = int(self.offsets[prefix])
+        stop = int(self.offsets[prefix + 1])
+        position = start + int(self.keys[start:stop].searchsorted(np.uint64(key)))
+        return position if position < stop and int(self.keys[position]) == key else None
+
+    def get_count(self, key: int) -> int:
+        """
+        Get the number of times a position has been recorded, 0 if it never has
+        """
+        position = self._find(key)
+        return 0 if position is None else int(self.records[position]["count"])
+
+    def get_stats(self, key: int) -> tuple[int, float, float] | None:
+        """
+        Get the statistics of the rounds in which a position has been recorded
+        :return: the number of times, the rate of the rounds won by the team of the player and the mean of its points,
+        or None if the position has never been recorded
+        """
+        position = self._find(key)
+        if position is None:
+            return None
+        record = self.records[position]
+        count = int(record["count"])
+        return count, int(record["wins"]) / count, int(record["points"]) / count
+
+
+def main():
+    from robolot.analysis import load_rounds
+
+    parser = argparse.ArgumentParser(description="Index the positions of the cards played in exported rounds")
+    parser.add_argument("memory_dirs", nargs="*", help="folders of exported rounds")
+    parser.add_argument("-o", "--output", required=True, help="file of the index")
+    parser.add_argument("--merge", nargs="+", default=[], help="indexes whose positions are added to the new one")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+    rounds = [round_ for memory_dir in args.memory_dirs for round_ in load_rounds(memory_dir)]
+    nb_positions = build_position_index(args.output, rounds, args.merge, args.workers, args.chunk_size)
+    print(f"{len(rounds)} rounds, {32 * len(rounds)} decisions, {nb_positions} distinct positions")
+
+
+if __name__ == "__main__":
+    main()
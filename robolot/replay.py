@@ -0,0 +1,256 @@
+import json
+import os
+from bisect import bisect_left, bisect_right
+from dataclasses import asdict
+
+from robolot import events
+from robolot.engine import GameState
+from robolot.models import CARD_IDS, CARD_KEYS, Card, Pile, Player
+
+
+DEFAULT_KEYFRAME_INTERVAL = 64
+# The record written before the events of a round, with the hands dealt to the players
+DEAL_RECORD = "deal"
+INDEX_VERSION = 1
+
+
+class ReplayRecorder:
+    def __init__(self, engine, path: str):
+        """
+        Subscriber writing the events of a game to a replay file, one JSON record per line
+        :param engine: the engine whose events are recorded
+        :param path: the replay file, the events are appended if it exists
+        """
+        self.engine = engine
+        self.fp = open(path, "a")
+        engine.subscribe(self)
+
+    def __call__(self, event) -> None:
+        if isinstance(event, events.BiddingStarted):
+            # The hands are only known by the engine, they are written before the bids of the round
+            self._write({
+                "type": DEAL_RECORD,
+                "hands": [
+                    [CARD_IDS[(card.color, card.value)] if card is not None else None for card in player.hand]
+                    for player in self.engine.players
+                ]
+            })
+        self._write({"type": type(event).__name__, **asdict(event)})
+
+    def _write(self, record: dict) -> None:
+        self.fp.write(json.dumps(record) + "\n")
+
+    def close(self) -> None:
+        self.engine.unsubscribe(self)
+        self.fp.close()
+
+
+class ReplayState:
+    def __init__(self):
+        """
+        State of a replayed game, with the attributes of the engine used by the rendering
+        """
+        self.players = [Player(f"player{i + 1}", None) for i in range(4)]
+        self.pli = Pile()
+        self.current_player_index = 0
+        self.state = GameState.BIDDING_READY
+        self.round_index = -1
+        self.trick_index = 0
+        # The cards are shared by every state, so that their image is only loaded once
+        self.cards = [Card(color, value) for color, value in CARD_KEYS]
+
+    def apply(self, record: dict):
+        """
+        Update the state with a record of the replay file
+        :return: the event of the record, None for the deal of the hands
+        """
+        if record["type"] == DEAL_RECORD:
+            for player, hand in zip(self.players, record["hands"]):
+                player.hand = [self.cards[card] if card is not None else None for card in hand]
+            self.pli = Pile()
+            self.round_index += 1
+            self.trick_index = 0
+            self.state = GameState.BIDDING_READY
+            return None
+        fields = dict(record)
+        event = getattr(events, fields.pop("type"))(**fields)
+        if isinstance(event, events.BiddingStarted):
+            self.current_player_index = event.starting_player_index
+            self.state = GameState.BIDDING
+        elif isinstance(event, events.PlayerToAct):
+            self.current_player_index = event.player_index
+        elif isinstance(event, events.ContractSet):
+            self.state = GameState.PLAYING
+        elif isinstance(event, events.CardPlayed):
+            hand = self.players[event.player_index].hand
+            card = self.cards[CARD_IDS[(event.card_color, event.card_value)]]
+            hand[hand.index(card)] = None
+            self.pli.add([card])
+            self.current_player_index = (event.player_index + 1) % 4
+        elif isinstance(event, events.TrickWon):
+            self.pli = Pile()
+            self.trick_index += 1
+            self.current_player_index = event.player_index
+        elif isinstance(event, (events.RoundCancelled, events.RoundScored)):
+            self.state = GameState.BETWEEN_ROUNDS
+        elif isinstance(event, events.GameEnded):
+            self.state = GameState.ENDED
+        return event
+
+    def to_keyframe(self) -> dict:
+        return {
+            "hands": [
+                [CARD_IDS[(card.color, card.value)] if card is not None else None for card in player.hand]
+                for player in self.players
+            ],
+            # The pli is stored in the order the cards were played
+            "pli": [CARD_IDS[(card.color, card.value)] for card in reversed(self.pli.cards)],
+            "current_player_index": self.current_player_index,
+            "state": self.state.name,
+            "round_index": self.round_index,
+            "trick_index": self.trick_index
+        }
+
+    def load_keyframe(self, keyframe: dict) -> None:
+        for player, hand in zip(self.players, keyframe["hands"]):
+            player.hand = [self.cards[card] if card is not None else None for card in hand]
+        self.pli = Pile()
+        for card in keyframe["pli"]:
+            self.pli.add([self.cards[card]])
+        self.current_player_index = keyframe["current_player_index"]
+        self.state = GameState[keyframe["state"]]
+        self.round_index = keyframe["round_index"]
+        self.trick_index = keyframe["trick_index"]
+
+
+def build_index(path: str, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL) -> dict:
+    """
+    Scan a replay file and save its index next to it
+    The index holds the full state every keyframe_interval records, with the position of the next record in the
+    file, and the position of the start of each round and each trick
+    """
+    state = ReplayState()
+    keyframes = []
+    rounds = []
+    offset = 0
+    nb_records = 0
+    with open(path, "rb") as fp:
+        for line in fp:
+            if nb_records % keyframe_interval == 0:
+                keyframes.append([nb_records, offset, state.to_keyframe()])
+            record = json.loads(line)
+            state.apply(record)
+            offset += len(line)
+            nb_records += 1
+            if record["type"] == DEAL_RECORD:
+                rounds.append([nb_records])
+            # A trick starts once the contract is set or the previous trick is won
+            elif record["type"] in ("ContractSet", "TrickWon") and state.pli.cards == [] and state.trick_index < 8:
+                rounds[-1].append(nb_records)
+    index = {
+        "version": INDEX_VERSION,
+        "size": offset,
+        "keyframe_interval": keyframe_interval,
+        "nb_records": nb_records,
+        "keyframes": keyframes,
+        "rounds": rounds
+    }
+    with open(f"{path}.idx", "w") as fp:
+        json.dump(index, fp)
+    return index
+
+
+class Replay:
+    def __init__(self, path: str, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL):
+        """
+        Replay of a recorded game, seeking from the closest keyframe of its index
+        The index is built when it is missing or when the file has changed since
+        :param path: the replay file
+        :param keyframe_interval: the number of records between two keyframes of a new index
+        """
+        self.path = path
+        index = None
+        if os.path.exists(f"{path}.idx"):
+            with open(f"{path}.idx") as fp:
+                index = json.load(fp)
+            if index.get("version") != INDEX_VERSION or index["size"] != os.path.getsize(path):
+                index = None
+        self.index = index or build_index(path, keyframe_interval)
+        self.keyframe_positions = [keyframe[0] for keyframe in self.index["keyframes"]]
+        # The positions of the deals and of the starts of the tricks, to move from one to the next
+        self.stops = sorted(position for positions in self.index["rounds"] for position in positions)
+        self.fp = open(path, "rb")
+        self.state = ReplayState()
+        self.position = 0
+        self.last_event = None
+
+    @property
+    def nb_records(self) -> int:
+        return self.index["nb_records"]
+
+    @property
+    def nb_rounds(self) -> int:
+        return len(self.index["rounds"])
+
+    def close(self) -> None:
+        self.fp.close()
+
+    def step(self):
+        """
+        Apply the next record
+        :return: the event of the record, None for the deal of the hands or at the end of the replay
+        """
+        if self.position >= self.nb_records:
+            return None
+        self.last_event = self.state.apply(json.loads(self.fp.readline()))
+        self.position += 1
+        return self.last_event
+
+    def seek(self, position: int) -> None:
+        """
+        Go to the state after a number of records, applying at most keyframe_interval records
+        """
+        position = max(0, min(position, self.nb_records))
+        keyframe_position, offset, keyframe = self.index["keyframes"][bisect_right(self.keyframe_positions, position) - 1]
+        # We only go back to the keyframe when we are not already between it and the position
+        if not keyframe_position <= self.position <= position:
+            self.state.load_keyframe(keyframe)
+            self.fp.seek(offset)
+            self.position = keyframe_position
+            self.last_event = None
+        while self.position < position:
+            self.step()
+
+    def seek_round(self, round_index: int) -> None:
+        """
+        Go to a round, once its hands are dealt
+        """
+        round_index = max(0, min(round_index, self.nb_rounds - 1))
+        self.seek(self.index["rounds"][round_index][0])
+
+    def seek_trick(self, round_index: int, trick_index: int) -> None:
+        """
+        Go to the start of a trick of a round, or to the deal if the round has been cancelled
+        """
+        round_index = max(0, min(round_index, self.nb_rounds - 1))
+        positions = self.index["rounds"][round_index]
+        self.seek(positions[min(trick_index + 1, len(positions) - 1)])
+
+    def seek_next_stop(self) -> None:
+        """
+        Go to the start of the next trick or round
+        """
+        stop_index = bisect_right(self.stops, self.position)
+        self.seek(self.stops[stop_index] if stop_index < len(self.stops) else self.nb_records)
+
+    def seek_previous_stop(self) -> None:
+        """
+        Go to the start of the previous trick or round
+        """
+        stop_index = bisect_left(self.stops, self.position) - 1
+        self.seek(self.stops[stop_index] if stop_index >= 0 else 0)
+
+    def get_message(self) -> list[str] | None:
+        if self.last_event is None:
+            return None
+        return self.last_event.message([player.name for player in self.state.players])
@@ -0,0 +1,300 @@
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from robolot import events
+from robolot.engine import CoincheEngine
+from robolot.models import CARD_IDS
+from robolot.rules import get_trump_index
+from robolot.simulation import make_range_engine, play_round
+
+
+# A card played by a player: what the player saw, the card, and the points won by its team in the round
+TRANSITION_DTYPE = np.dtype([
+    ("hand", np.uint32),
+    ("played", np.uint32),
+    # The cards of the current trick in order, -1 for the missing ones
+    ("trick", np.int8, 3),
+    ("seat", np.int8),
+    ("contract", np.int8),
+    ("is_bidder_team", np.bool_),
+    ("bid_value", np.int16),
+    ("action", np.int8),
+    ("reward", np.float32),
+    # Whether it is the last card of the player in the round
+    ("done", np.bool_)
+])
+TOTAL_CARD_POINTS = 152
+
+
+class TransitionRecorder:
+    def __init__(self, engine: CoincheEngine):
+        """
+        Subscriber building the transitions of the cards played in the rounds of an engine
+        The transitions of a round are available once it is scored, the cancelled rounds have none
+        """
+        self.engine = engine
+        self.round_transitions = np.zeros(32, dtype=TRANSITION_DTYPE)
+        self.nb_cards = 0
+        self.played = 0
+        self.transitions = []
+        engine.subscribe(self, (events.PlayerToAct, events.CardPlayed, events.RoundScored))
+
+    def __call__(self, event) -> None:
+        engine = self.engine
+        if isinstance(event, events.PlayerToAct):
+            if event.action != "play":
+                return
+            if self.nb_cards == 0:
+                self.played = 0
+            # The observation is taken before the card is played
+            transition = self.round_transitions[self.nb_cards]
+            transition["hand"] = engine.players[event.player_index].get_hand_mask()
+            transition["played"] = self.played
+            trick = [CARD_IDS[(card.color, card.value)] for card in reversed(engine.pli.cards)]
+            transition["trick"] = trick + [-1] * (3 - len(trick))
+            transition["seat"] = event.player_index
+            transition["contract"] = get_trump_index(engine.bid_color)
+            transition["is_bidder_team"] = engine.players[event.player_index].team is engine.bidding_team
+            transition["bid_value"] = engine.bid_value
+        elif isinstance(event, events.CardPlayed):
+            card = CARD_IDS[(event.card_color, event.card_value)]
+            self.round_transitions[self.nb_cards]["action"] = card
+            self.played |= 1 << card
+            self.nb_cards += 1
+        elif isinstance(event, events.RoundScored):
+            transitions = self.round_transitions.copy()
+            team_points = np.array([engine.players[seat].team.points for seat in range(4)], dtype=np.float32)
+            transitions["reward"] = team_points[transitions["seat"]] / TOTAL_CARD_POINTS
+            transitions["done"][-4:] = True
+            self.transitions.append(transitions)
+            self.nb_cards = 0
+
+    def pop(self) -> np.ndarray:
+        """
+        Get the transitions of the rounds scored since the last call
+        """
+        transitions = np.concatenate(self.transitions) if self.transitions else np.zeros(0, dtype=TRANSITION_DTYPE)
+        self.transitions = []
+        return transitions
+
+    def close(self) -> None:
+        self.engine.unsubscribe(self)
+
+
+class SharedReplayBuffer:
+    def __init__(self, capacity: int, nb_writers: int = 1, name: str | None = None):
+        """
+        Fixed size buffer of transitions in shared memory, written by several processes and sampled by a learner
+        Each writer owns a segment of the buffer, used as a ring, so that the writes need no lock
+        The buffer is created when no name is given, and attached to otherwise,
+        it is attached again by each process it is sent to
+        :param capacity: the number of transitions of the buffer, split between the writers
+        :param nb_writers: the number of processes writing in the buffer
+        :param name: the name of the shared memory of an existing buffer
+        """
+        self.capacity = capacity
+        self.nb_writers = nb_writers
+        self.segment_size = capacity // nb_writers
+        # Each segment has a sum-tree of its priorities, whose leaves are the slots of the segment
+        self.nb_leaves = 1 << max(self.segment_size - 1, 0).bit_length()
+        self.tree_depth = self.nb_leaves.bit_length() - 1
+        # The position of the next write of each writer, the sum-trees, then the priority, the transition
+        # and the flag of each slot
+        cursors_size = 8 * nb_writers
+        trees_size = 8 * nb_writers * 2 * self.nb_leaves
+        priorities_size = 4 * capacity
+        transitions_size = TRANSITION_DTYPE.itemsize * capacity
+        size = cursors_size + trees_size + priorities_size + transitions_size + capacity
+        # Only the process which created the buffer destroys it, even when the buffer is inherited by a fork
+        self.owner_pid = os.getpid() if name is None else None
+        if name is None:
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+        buffer = self.shared_memory.buf
+        self.cursors = np.ndarray(nb_writers, dtype=np.int64, buffer=buffer)
+        # The node i of a tree is the sum of the nodes 2i and 2i + 1, the root being the node 1
+        self.sum_trees = np.ndarray(
+            (nb_writers, 2 * self.nb_leaves), dtype=np.float64, buffer=buffer, offset=cursors_size
+        )
+        offset = cursors_size + trees_size
+        # The empty slots and the ones being written have no priority, they are never sampled
+        self.priorities = np.ndarray(capacity, dtype=np.float32, buffer=buffer, offset=offset)
+        self.transitions = np.ndarray(capacity, dtype=TRANSITION_DTYPE, buffer=buffer, offset=offset + priorities_size)
+        # Whether each slot holds a transition, whatever its priority, the slots being written having none
+        self.written = np.ndarray(
+            capacity, dtype=np.bool_, buffer=buffer, offset=offset + priorities_size + transitions_size
+        )
+        if name is None:
+            self.cursors[:] = 0
+            self.sum_trees[:] = 0
+            self.priorities[:] = 0
+            self.written[:] = False
+
+    @property
+    def name(self) -> str:
+        return self.shared_memory.name
+
+    def __getstate__(self):
+        return {"capacity": self.capacity, "nb_writers": self.nb_writers, "name": self.name}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __len__(self) -> int:
+        return int(np.minimum(self.cursors, self.segment_size).sum())
+
+    def close(self) -> None:
+        """
+        Detach from the buffer, which is destroyed when its creator closes it
+        """
+        # The views must be released before the shared memory
+        del self.cursors, self.sum_trees, self.priorities, self.transitions, self.written
+        self.shared_memory.close()
+        if self.owner_pid == os.getpid():
+            self.shared_memory.unlink()
+
+    def push(self, writer_index: int, transitions: np.ndarray, priorities: np.ndarray | float = 1.0) -> None:
+        """
+        Write transitions in the segment of a writer, replacing the oldest ones when it is full
+        :param writer_index: the index of the writer, each one being used by a single process
+        :param transitions: the transitions, an array of TRANSITION_DTYPE
+        :param priorities: the priority of each transition, or the same one for all of them
+        """
+        nb_transitions = len(transitions)
+        if nb_transitions > self.segment_size:
+            transitions = transitions[-self.segment_size:]
+            priorities = priorities[-self.segment_size:] if isinstance(priorities, np.ndarray) else priorities
+            nb_transitions = self.segment_size
+        cursor = int(self.cursors[writer_index])
+        slots = writer_index * self.segment_size + (cursor + np.arange(nb_transitions)) % self.segment_size
+        # The slots are hidden from the sampling while they are written
+        self.update_priorities(slots, 0)
+        self.written[slots] = False
+        self.transitions[slots] = transitions
+        self.written[slots] = True
+        self.update_priorities(slots, priorities)
+        self.cursors[writer_index] = cursor + nb_transitions
+
+    def sample(
+        self,
+        batch_size: int,
+        rng: np.random.Generator,
+        is_prioritized: bool = False,
+        out: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Sample a batch of transitions, uniformly or proportionally to their priority
+        The uniform sampling draws every transition written, including the ones whose priority was set to 0
+        :param batch_size: the number of transitions
+        :param rng: the random generator
+        :param is_prioritized: whether the transitions are sampled proportionally to their priority
+        :param out: the array receiving the batch, reused between batches instead of allocating a new one
+        :return: the slots of the transitions, to update their priority, and the batch
+        """
+        if is_prioritized:
+            # A segment is drawn from the roots of the trees, then a slot by going down its tree
+            sum_trees = self.sum_trees
+            roots = sum_trees[:, 1].copy()
+            cumulated_roots = np.cumsum(roots)
+            if cumulated_roots[-1] <= 0:
+                raise ValueError("The buffer is empty")
+            draws = rng.random(batch_size) * cumulated_roots[-1]
+            segments = np.minimum(np.searchsorted(cumulated_roots, draws, side="right"), self.nb_writers - 1)
+            draws -= cumulated_roots[segments] - roots[segments]
+            nodes = np.ones(batch_size, dtype=np.int64)
+            for _ in range(self.tree_depth):
+                left_nodes = 2 * nodes
+                left_sums = sum_trees[segments, left_nodes]
+                # The subtrees without priority are never entered, whatever the rounding of the draws
+                go_right = (draws >= left_sums) & (sum_trees[segments, left_nodes + 1] > 0)
+                draws = np.where(go_right, draws - left_sums, draws)
+                nodes = left_nodes + go_right
+            slots = segments * self.segment_size + nodes - self.nb_leaves
+        else:
+            filled_slots = np.flatnonzero(self.written)
+            if len(filled_slots) == 0:
+                raise ValueError("The buffer is empty")
+            slots = filled_slots[rng.integers(0, len(filled_slots), batch_size)]
+        batch = np.empty(batch_size, dtype=TRANSITION_DTYPE) if out is None else out[:batch_size]
+        np.take(self.transitions, slots, out=batch)
+        return slots, batch
+
+    def update_priorities(self, slots: np.ndarray, priorities: np.ndarray | float) -> None:
+        """
+        Set the priority of slots and the sums of their trees
+        The sums are computed again from their two nodes, so a sum left stale by an update of the learner
+        during a push in the same segment is fixed by the next write below it
+        :param slots: the slots, in the segments of the writers
+        :param priorities: the priority of each slot, or the same one for all of them
+        """
+        self.priorities[slots] = priorities
+        segments, nodes = np.divmod(slots, self.segment_size)
+        nodes = nodes + self.nb_leaves
+        sum_trees = self.sum_trees
+        sum_trees[segments, nodes] = self.priorities[slots]
+        for _ in range(self.tree_depth):
+            nodes //= 2
+            sum_trees[segments, nodes] = sum_trees[segments, 2 * nodes] + sum_trees[segments, 2 * nodes + 1]
+
+    def save_snapshot(self, path: str) -> None:
+        """
+        Save the content of the buffer, the writers can keep writing during the copy
+        """
+        np.savez(
+            path, cursors=self.cursors, priorities=self.priorities, transitions=self.transitions, written=self.written
+        )
+
+    @classmethod
+    def load_snapshot(cls, path: str, nb_writers: int | None = None) -> "SharedReplayBuffer":
+        """
+        Create a buffer from a snapshot
+        :param nb_writers: the number of writers of the new buffer, the one of the snapshot if None
+        :raise ValueError: if the transitions of the snapshot do not fit in the segments of the new writers
+        """
+        with np.load(path) as data:
+            cursors = data["cursors"]
+            priorities = data["priorities"]
+            transitions = data["transitions"]
+            written = data["written"]
+        nb_writers = nb_writers or len(cursors)
+        filled_slots = np.flatnonzero(written)
+        segment_size = len(transitions) // nb_writers
+        if nb_writers != len(cursors) and len(filled_slots) > nb_writers * segment_size:
+            raise ValueError(
+                f"The {len(filled_slots)} transitions of the snapshot do not fit in {nb_writers} segments "
+                f"of {segment_size} transitions"
+            )
+        buffer = cls(len(transitions), nb_writers)
+        if nb_writers == len(cursors):
+            buffer.cursors[:] = cursors
+            buffer.transitions[:] = transitions
+            buffer.written[:] = written
+            buffer.update_priorities(np.arange(nb_writers * segment_size), priorities[:nb_writers * segment_size])
+        else:
+            # The transitions are handed out again to the segments of the new writers, at most one segment each
+            for writer_index, slots in enumerate(np.array_split(filled_slots, nb_writers)):
+                buffer.push(writer_index, transitions[slots], priorities[slots])
+        return buffer
+
+
+def run_writer(buffer: SharedReplayBuffer, writer_index: int, seed: int, start: int, stop: int) -> None:
+    """
+    Play one round between robots on each deal of a range and push their transitions in a buffer
+    :param buffer: the buffer, attached again in the process of the writer
+    :param writer_index: the index of the writer in the buffer
+    :param seed: the seed of the campaign of deals
+    :param start: the index of the first deal
+    :param stop: the index after the last deal
+    """
+    engine = make_range_engine(seed, start, stop)
+    recorder = TransitionRecorder(engine)
+    for _ in range(start, stop):
+        play_round(engine)
+        transitions = recorder.pop()
+        if len(transitions):
+            buffer.push(writer_index, transitions)
+    recorder.close()
+    buffer.close()
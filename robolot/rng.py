@@ -0,0 +1,74 @@
+import secrets
+
+MASK_64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def mix64(value: int) -> int:
+    """
+    Scramble a 64 bits integer with the finalizer of SplitMix64
+    """
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return value ^ (value >> 31)
+
+
+class CounterRng:
+    def __init__(self, seed: int | None = None, counter: int = 0):
+        """
+        Counter based random generator: the n-th draw only depends on the seed and n
+        It has the same methods as the random module for the draws used by the game,
+        so that any draw can be replayed by setting the counter back
+        :param seed: the seed of the generator, a random one is picked if None
+        :param counter: the number of draws already done
+        """
+        if seed is None:
+            seed = secrets.randbits(64)
+        self.seed = seed
+        self.counter = counter
+        self._key = mix64(seed & MASK_64)
+
+    def bits64(self) -> int:
+        """
+        Draw 64 random bits
+        """
+        self.counter += 1
+        return mix64(self._key ^ ((self.counter * GOLDEN_GAMMA) & MASK_64))
+
+    def randbelow(self, n: int) -> int:
+        """
+        Draw an integer uniformly in [0, n), n must be lower than 2^64
+        """
+        # We reject the draws of the last incomplete block of size n to remove the bias
+        limit = (1 << 64) - (1 << 64) % n
+        value = self.bits64()
+        while value >= limit:
+            value = self.bits64()
+        return value % n
+
+    def randrange(self, start: int, stop: int | None = None) -> int:
+        if stop is None:
+            start, stop = 0, start
+        return start + self.randbelow(stop - start)
+
+    def randint(self, a: int, b: int) -> int:
+        return a + self.randbelow(b - a + 1)
+
+    def random(self) -> float:
+        return (self.bits64() >> 11) / (1 << 53)
+
+    def choice(self, sequence):
+        return sequence[self.randbelow(len(sequence))]
+
+    def shuffle(self, items: list) -> None:
+        # Fisher-Yates shuffle
+        for i in range(len(items) - 1, 0, -1):
+            j = self.randbelow(i + 1)
+            items[i], items[j] = items[j], items[i]
+
+    def sample(self, population, k: int) -> list:
+        pool = list(population)
+        for i in range(k):
+            j = i + self.randbelow(len(pool) - i)
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
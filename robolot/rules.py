@@ -0,0 +1,198 @@
+from robolot.memory import is_missing
+from robolot.models import (
+    ALL_TRUMP,
+    ALL_TRUMP_CARD_POINTS,
+    BID_COLORS,
+    BID_VALUES,
+    CARD_POINTS,
+    COLORS,
+    NO_TRUMP,
+    NO_TRUMP_CARD_POINTS,
+    TRUMP_CARD_POINTS,
+    VALUES
+)
+
+
+# The cards are identified by color_index * 8 + value_index, see robolot.models.CARD_KEYS
+NB_CARDS = 32
+ALL_CARDS_MASK = (1 << NB_CARDS) - 1
+COLOR_MASKS = [0xFF << (8 * color_index) for color_index in range(len(COLORS))]
+# The contracts are identified by the index of their trump color, then by these indexes
+NO_TRUMP_INDEX = len(COLORS)
+ALL_TRUMP_INDEX = len(COLORS) + 1
+
+
+def _get_tables(trump_index: int | None) -> tuple[list[int], list[int]]:
+    """
+    Get the strength and the points of each card for a given contract
+    A trump card is always stronger than a card of another color
+    """
+    strengths = []
+    points = []
+    for card_id in range(NB_CARDS):
+        value = VALUES[card_id % 8]
+        if trump_index == ALL_TRUMP_INDEX:
+            strengths.append(8 + list(ALL_TRUMP_CARD_POINTS).index(value))
+            points.append(ALL_TRUMP_CARD_POINTS[value])
+        elif trump_index == NO_TRUMP_INDEX:
+            strengths.append(list(NO_TRUMP_CARD_POINTS).index(value))
+            points.append(NO_TRUMP_CARD_POINTS[value])
+        elif card_id >> 3 == trump_index:
+            strengths.append(8 + list(TRUMP_CARD_POINTS).index(value))
+            points.append(TRUMP_CARD_POINTS[value])
+        else:
+            strengths.append(list(CARD_POINTS).index(value))
+            points.append(CARD_POINTS[value])
+    return strengths, points
+
+
+# Tables by contract index, the last one being used when there is no contract
+CARD_STRENGTHS = []
+CARD_POINTS_BY_TRUMP = []
+for _trump_index in list(range(len(COLORS))) + [NO_TRUMP_INDEX, ALL_TRUMP_INDEX, None]:
+    _strengths, _points = _get_tables(_trump_index)
+    CARD_STRENGTHS.append(_strengths)
+    CARD_POINTS_BY_TRUMP.append(_points)
+
+
+def get_trump_index(bid_color: str | None) -> int | None:
+    """
+    Get the index of a contract: the index of its trump color, NO_TRUMP_INDEX or ALL_TRUMP_INDEX
+    """
+    if bid_color in COLORS:
+        return COLORS.index(bid_color)
+    if bid_color == NO_TRUMP:
+        return NO_TRUMP_INDEX
+    if bid_color == ALL_TRUMP:
+        return ALL_TRUMP_INDEX
+    return None
+
+
+def get_trump_color_index(trump_index: int | None) -> int | None:
+    """
+    Get the index of the color cutting the other ones in a contract, None without a single trump color
+    """
+    return trump_index if trump_index is not None and trump_index < NO_TRUMP_INDEX else None
+
+
+def get_belote_colors(trump_index: int | None) -> list[int]:
+    """
+    Get the indexes of the colors whose king and queen give a belote in a contract
+    """
+    if trump_index == ALL_TRUMP_INDEX:
+        return list(range(len(COLORS)))
+    trump_color_index = get_trump_color_index(trump_index)
+    return [trump_color_index] if trump_color_index is not None else []
+
+
+def iter_cards(mask: int):
+    """
+    Iterate over the identifiers of the cards of a mask
+    """
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def get_trick_winner(trick: list[int], trump_index: int | None) -> int:
+    """
+    Get the position in the trick of the winning card
+    :param trick: the cards of the trick, in the order they were played
+    """
+    strengths = CARD_STRENGTHS[trump_index if trump_index is not None else -1]
+    asked_color = trick[0] >> 3
+    winner = 0
+    for position in range(1, len(trick)):
+        card = trick[position]
+        color = card >> 3
+        if (color == asked_color or color == trump_index) and strengths[card] > strengths[trick[winner]]:
+            winner = position
+    return winner
+
+
+def get_trick_points(trick: list[int], trump_index: int | None) -> int:
+    points = CARD_POINTS_BY_TRUMP[trump_index if trump_index is not None else -1]
+    return sum(points[card] for card in trick)
+
+
+def _get_higher_cards(cards: int, trick: list[int], color_index: int, trump_index: int) -> int:
+    """
+    Get the cards of a color higher than the ones of the same color in the trick, all of them if there are none
+    """
+    strengths = CARD_STRENGTHS[trump_index]
+    highest = max((strengths[card] for card in trick if card >> 3 == color_index), default=None)
+    if highest is None:
+        return cards
+    higher_cards = 0
+    for card in iter_cards(cards):
+        if strengths[card] > highest:
+            higher_cards |= 1 << card
+    return higher_cards or cards
+
+
+def get_legal_cards(hand: int, trick: list[int], trump_index: int | None) -> int:
+    """
+    Get the cards of a hand that can be played on a trick
+    :param hand: the mask of the cards of the player
+    :param trick: the cards already played in the trick, in order
+    :param trump_index: the index of the contract
+    :return: the mask of the playable cards
+    """
+    if not trick:
+        return hand
+    asked_color_index = trick[0] >> 3
+    asked_cards = hand & COLOR_MASKS[asked_color_index]
+    if trump_index == ALL_TRUMP_INDEX:
+        # Every color is played like the trump color, but the other colors do not cut the asked one
+        return _get_higher_cards(asked_cards, trick, asked_color_index, trump_index) if asked_cards else hand
+    trump_index = get_trump_color_index(trump_index)
+    trump_cards = hand & COLOR_MASKS[trump_index] if trump_index is not None else 0
+    # A player who plays a trump card must play higher than the previous trump cards if possible
+    if trump_cards:
+        trump_cards = _get_higher_cards(trump_cards, trick, trump_index, trump_index)
+    # The asked color must be played if possible
+    if asked_cards:
+        return trump_cards if asked_color_index == trump_index else asked_cards
+    if not trump_cards:
+        return hand
+    # Without the asked color, a trump card must be played unless the partner is winning the trick
+    if len(trick) >= 2 and get_trick_winner(trick, trump_index) == len(trick) - 2:
+        return (hand & ~COLOR_MASKS[trump_index]) | trump_cards
+    return trump_cards
+
+
+def is_bid_legal(
+    bids: list[tuple],
+    bid_value: int | None,
+    bid_color: str | None,
+    has_coinched: int,
+    has_surcoinched: int
+) -> bool:
+    """
+    Check whether a bid can be made, like CoincheEngine._check_bid_validity but on the rows of the bids
+    :param bids: the rows of the bid memory of the round so far
+    """
+    contract = None
+    is_coinched = False
+    is_surcoinched = False
+    for row in bids:
+        if not is_missing(row[2]) and (contract is None or row[2] > contract[2]):
+            contract = row
+        is_coinched = is_coinched or row[4] == 1
+        is_surcoinched = is_surcoinched or row[5] == 1
+    # The previous bid is made by the other team, so a coinche is made against the team of the contract
+    if has_coinched == 1:
+        return (
+            not bid_value and not bid_color and has_surcoinched != 1
+            and contract is not None and contract[1] == bids[-1][1] and not is_coinched
+        )
+    if has_surcoinched == 1:
+        return (
+            not bid_value and not bid_color
+            and is_coinched and contract[1] != bids[-1][1] and not is_surcoinched
+        )
+    # A pass has neither a value nor a color
+    if not bid_value or not bid_color:
+        return not bid_value and not bid_color
+    return bid_value in BID_VALUES and bid_color in BID_COLORS and (contract is None or bid_value > contract[2])
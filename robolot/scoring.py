@@ -0,0 +1,201 @@
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+
+from robolot.models import BID_VALUES
+from robolot.rules import ALL_TRUMP_INDEX, CARD_POINTS_BY_TRUMP, CARD_STRENGTHS, NO_TRUMP_INDEX, get_trump_index
+
+
+SCORING_CONTRACT = "contract"
+SCORING_POINTS_PLUS_CONTRACT = "points_plus_contract"
+# The points of the cards of a round, whatever the contract
+TOTAL_CARD_POINTS = 152
+
+# Tables of the contracts, the rows being indexed like CARD_STRENGTHS
+STRENGTH_TABLE = np.array(CARD_STRENGTHS, dtype=np.int8)
+POINT_TABLE = np.array(CARD_POINTS_BY_TRUMP, dtype=np.int16)
+# Colors whose king and queen give a belote, by contract
+BELOTE_COLOR_TABLE = np.zeros((len(CARD_STRENGTHS), 4), dtype=bool)
+for _trump_index in range(NO_TRUMP_INDEX):
+    BELOTE_COLOR_TABLE[_trump_index, _trump_index] = True
+BELOTE_COLOR_TABLE[ALL_TRUMP_INDEX] = True
+
+
+@dataclass(frozen=True, slots=True)
+class RuleSet:
+    """
+    Rules scoring a played round, the default ones being the rules of the engine
+    """
+    # Either SCORING_CONTRACT, where the winning team scores the contract,
+    # or SCORING_POINTS_PLUS_CONTRACT, where the points made are scored too
+    scoring: str = SCORING_CONTRACT
+    belote_points: int = 20
+    # Whether the belote of the defending team counts for them
+    is_defender_belote_counted: bool = False
+    # Points of the team winning the last trick
+    last_trick_bonus: int = 0
+    # Whether the contract is doubled by a coinche and doubled again by a surcoinche
+    is_coinche_multiplied: bool = False
+    capot_value: int = BID_VALUES[-2]
+    generale_value: int = BID_VALUES[-1]
+
+
+@dataclass(frozen=True, slots=True)
+class RoundArrays:
+    """
+    Played rounds stored in arrays, one row per round
+    """
+    # Identifiers of the 32 cards, in the order they were played
+    cards: np.ndarray
+    # Index of the player of each card
+    players: np.ndarray
+    # Index of the contract, see robolot.rules.get_trump_index
+    contracts: np.ndarray
+    bid_values: np.ndarray
+    # Index of the player who made the contract
+    bidders: np.ndarray
+    # 1, or 2 if the contract has been coinched, 4 if it has been surcoinched
+    multipliers: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    @classmethod
+    def from_rounds(cls, rounds: list[dict]) -> "RoundArrays":
+        """
+        Build the arrays of rounds loaded by robolot.analysis.load_rounds
+        """
+        return cls(
+            cards=np.array([[card for _, card in round_["plays"]] for round_ in rounds], dtype=np.int8).reshape(-1, 32),
+            players=np.array(
+                [[player for player, _ in round_["plays"]] for round_ in rounds], dtype=np.int8
+            ).reshape(-1, 32),
+            contracts=np.array([get_trump_index(round_["bid_color"]) for round_ in rounds], dtype=np.int8),
+            bid_values=np.array([round_["bid_value"] for round_ in rounds], dtype=np.int16),
+            bidders=np.array([round_["bidder_index"] for round_ in rounds], dtype=np.int8),
+            multipliers=np.array([round_["multiplier"] for round_ in rounds], dtype=np.int8)
+        )
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, **{name: getattr(self, name) for name in self.__slots__})
+
+    @classmethod
+    def load(cls, path: str) -> "RoundArrays":
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in cls.__slots__})
+
+
+def score_rounds(rounds: RoundArrays, rules: RuleSet = RuleSet()) -> dict[str, np.ndarray]:
+    """
+    Score played rounds under a rule set, all at once
+    :param rounds: the rounds
+    :param rules: the rules of the scoring
+    :return: the arrays of the points of the tricks and the belote of each team, whether the contract is fulfilled
+    and the score of each team
+    """
+    nb_rounds = len(rounds)
+    round_indexes = np.arange(nb_rounds)
+    # The tables are read with one index by card, made of the contract and the card
+    table_indexes = (rounds.contracts[:, None].astype(np.intp) * 32 + rounds.cards).reshape(nb_rounds, 8, 4)
+    players = rounds.players.reshape(nb_rounds, 8, 4)
+
+    # Only the cards of the asked color or of the trump color can win a trick
+    colors = rounds.cards.reshape(nb_rounds, 8, 4) >> 3
+    trump_colors = np.where(rounds.contracts < NO_TRUMP_INDEX, rounds.contracts, -1).astype(np.int8)
+    can_win = (colors == colors[:, :, :1]) | (colors == trump_colors[:, None, None])
+    # The position in the trick is kept in the lowest bits, so that the highest value gives the winning card
+    strengths = np.where(can_win, STRENGTH_TABLE.ravel()[table_indexes] * 4 + np.arange(4, dtype=np.int8), -1)
+    winning_positions = np.maximum(
+        np.maximum(strengths[:, :, 0], strengths[:, :, 1]),
+        np.maximum(strengths[:, :, 2], strengths[:, :, 3])
+    ) & 3
+    winners = np.take_along_axis(players, winning_positions[:, :, None].astype(np.intp), axis=2)[:, :, 0]
+    winning_teams = winners % 2
+    card_points = POINT_TABLE.ravel()[table_indexes]
+    trick_points = card_points[:, :, 0] + card_points[:, :, 1] + card_points[:, :, 2] + card_points[:, :, 3]
+    team_points = np.empty((nb_rounds, 2), dtype=np.int32)
+    team_points[:, 1] = (trick_points * winning_teams).sum(axis=1)
+    team_points[:, 0] = TOTAL_CARD_POINTS - team_points[:, 1]
+    team_points[round_indexes, winning_teams[:, -1]] += rules.last_trick_bonus
+    team_tricks = np.empty((nb_rounds, 2), dtype=np.int8)
+    team_tricks[:, 1] = winning_teams.sum(axis=1)
+    team_tricks[:, 0] = 8 - team_tricks[:, 1]
+
+    # The belote is held by a player with the king and the queen of a belote color
+    holders = np.zeros((nb_rounds, 32), dtype=np.int8)
+    holders[round_indexes[:, None], rounds.cards] = rounds.players
+    colors = np.arange(4)
+    kings = holders[:, colors * 8 + 5]
+    queens = holders[:, colors * 8 + 4]
+    belotes = (kings == queens) & BELOTE_COLOR_TABLE[rounds.contracts]
+    belote_points = np.stack(
+        [(belotes & (kings % 2 == team)).sum(axis=1) * rules.belote_points for team in (0, 1)], axis=1
+    )
+    bidder_teams = rounds.bidders.astype(np.intp) % 2
+    defender_teams = 1 - bidder_teams
+    if not rules.is_defender_belote_counted:
+        belote_points[round_indexes, defender_teams] = 0
+
+    bid_values = rounds.bid_values.astype(np.int32)
+    is_generale = bid_values == rules.generale_value
+    is_capot = bid_values == rules.capot_value
+    is_fulfilled = np.where(
+        is_generale,
+        (winners == rounds.bidders[:, None]).all(axis=1),
+        np.where(
+            is_capot,
+            team_tricks[round_indexes, defender_teams] == 0,
+            team_points[round_indexes, bidder_teams] + belote_points[round_indexes, bidder_teams] >= bid_values
+        )
+    )
+
+    contract_values = bid_values * rounds.multipliers if rules.is_coinche_multiplied else bid_values
+    winning_teams = np.where(is_fulfilled, bidder_teams, defender_teams)
+    scores = np.zeros((nb_rounds, 2), dtype=np.int32)
+    scores[round_indexes, winning_teams] = contract_values
+    if rules.scoring == SCORING_POINTS_PLUS_CONTRACT:
+        # The points made are scored, all of them going to the defenders when the contract fails
+        scores += belote_points
+        scores[round_indexes, bidder_teams] += np.where(is_fulfilled, team_points[round_indexes, bidder_teams], 0)
+        scores[round_indexes, defender_teams] += np.where(
+            is_fulfilled,
+            team_points[round_indexes, defender_teams],
+            TOTAL_CARD_POINTS + rules.last_trick_bonus
+        )
+    elif rules.scoring != SCORING_CONTRACT:
+        raise ValueError(f"Unknown scoring {rules.scoring}")
+    return {
+        "team_points": team_points,
+        "belote_points": belote_points,
+        "is_fulfilled": is_fulfilled,
+        "scores": scores
+    }
+
+
+def main():
+    from robolot.analysis import load_rounds
+
+    parser = argparse.ArgumentParser(description="Score exported rounds again under other rules")
+    parser.add_argument("memory_dirs", nargs="+", help="folders of exported rounds")
+    parser.add_argument("--scoring", choices=[SCORING_CONTRACT, SCORING_POINTS_PLUS_CONTRACT], default=SCORING_CONTRACT)
+    parser.add_argument("--belote-points", type=int, default=20)
+    parser.add_argument("--defender-belote", action="store_true")
+    parser.add_argument("--last-trick-bonus", type=int, default=0)
+    parser.add_argument("--coinche-multiplied", action="store_true")
+    args = parser.parse_args()
+    rounds = RoundArrays.from_rounds([round_ for memory_dir in args.memory_dirs for round_ in load_rounds(memory_dir)])
+    results = score_rounds(rounds, RuleSet(
+        scoring=args.scoring,
+        belote_points=args.belote_points,
+        is_defender_belote_counted=args.defender_belote,
+        last_trick_bonus=args.last_trick_bonus,
+        is_coinche_multiplied=args.coinche_multiplied
+    ))
+    scores = results["scores"].sum(axis=0)
+    print(f"{len(rounds)} rounds, {results['is_fulfilled'].mean():.1%} of the contracts fulfilled")
+    print(f"team1: {scores[0]}, team2: {scores[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Process
+
+from robolot.simulation import make_range_engine, play_round
+
+
+DEFAULT_SHARD_SIZE = 100
+DEFAULT_LEASE_TIMEOUT = 60.0
+DEFAULT_PORT = 9109
+# Delay before a worker asks again for a shard when they are all leased
+WAIT_DELAY = 0.2
+STAT_KEYS = ["rounds", "cancelled", "contracts", "fulfilled"]
+
+
+def _new_stats() -> dict:
+    stats = dict.fromkeys(STAT_KEYS, 0)
+    stats["points"] = [0, 0]
+    stats["scores"] = [0, 0]
+    return stats
+
+
+def _merge_stats(stats: dict, other: dict) -> None:
+    for key in STAT_KEYS:
+        stats[key] += other[key]
+    for key in ("points", "scores"):
+        stats[key] = [a + b for a, b in zip(stats[key], other[key])]
+
+
+def play_shard(
+    seed: int,
+    start: int,
+    stop: int,
+    policy: dict,
+    contract_table=None
+) -> dict:
+    """
+    Play one round on each deal of a range of a campaign
+    :param seed: the seed of the campaign of deals
+    :param start: the index of the first deal
+    :param stop: the index after the last deal
+    :param policy: the settings of the robots, with the arguments of the "ismcts" and the "endgame_solver" if any,
+    and the file of the "auction_model" of the ISMCTS if any
+    :param contract_table: the ContractTable of the robots, only read so it can be shared between threads
+    :return: the statistics of the rounds
+    """
+    ismcts = None
+    if policy.get("ismcts") is not None:
+        from robolot.auction import AuctionModel
+        from robolot.ismcts import ISMCTS
+        auction_model = AuctionModel.load(policy["auction_model"]) if policy.get("auction_model") else None
+        ismcts = ISMCTS(**policy["ismcts"], seed=seed + start, auction_model=auction_model)
+    endgame_solver = None
+    if policy.get("endgame_solver") is not None:
+        from robolot.endgame import EndgameSolver
+        endgame_solver = EndgameSolver(**policy["endgame_solver"], seed=seed + start)
+    engine = make_range_engine(
+        seed,
+        start,
+        stop,
+        endgame_solver=endgame_solver,
+        contract_table=contract_table,
+        ismcts=ismcts
+    )
+    stats = _new_stats()
+    for _ in range(start, stop):
+        play_round(engine)
+        stats["rounds"] += 1
+        # The rounds where everyone passed have no contract
+        if engine.bid_value is None:
+            stats["cancelled"] += 1
+            continue
+        stats["contracts"] += 1
+        is_fulfilled = engine._is_contract_fulfilled()
+        stats["fulfilled"] += is_fulfilled
+        bidding_team_index = engine.teams.index(engine.bidding_team)
+        winning_team_index = bidding_team_index if is_fulfilled else 1 - bidding_team_index
+        stats["scores"][winning_team_index] += engine.bid_value
+        for team_index, team in enumerate(engine.teams):
+            stats["points"][team_index] += team.points
+    engine.close()
+    return stats
+
+
+class _CampaignServer(socketserver.ThreadingTCPServer):
+    # The port can be used again right after a campaign, and the connections of the workers do not block the exit
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class Coordinator:
+    def __init__(
+        self,
+        nb_deals: int,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        seed: int = 0,
+        policy: dict | None = None,
+        checkpoint_path: str | None = None,
+        lease_timeout: float = DEFAULT_LEASE_TIMEOUT
+    ):
+        """
+        Coordinator of a self-play campaign, handing out shards of deals to the workers and merging their results
+        A shard leased by a worker that disconnected or did not answer in time is handed out again
+        :param nb_deals: the number of deals of the campaign
+        :param shard_size: the number of deals of a shard
+        :param seed: the seed of the campaign of deals
+        :param policy: the settings of the robots, see play_shard
+        :param checkpoint_path: the file where the campaign is saved after each shard, resumed if it exists
+        :param lease_timeout: the duration in seconds after which a leased shard is handed out again
+        """
+        self.nb_deals = nb_deals
+        self.shard_size = shard_size
+        self.seed = seed
+        self.policy = dict(policy or {}, version=(policy or {}).get("version", 0))
+        self.checkpoint_path = checkpoint_path
+        self.lease_timeout = lease_timeout
+        self.nb_shards = -(-nb_deals // shard_size)
+        self.completed = set()
+        # The merged statistics by version of the policy
+        self.stats = {}
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            self._load_checkpoint(checkpoint_path)
+        self.pending = deque(shard for shard in range(self.nb_shards) if shard not in self.completed)
+        # The leased shards, with the identifier of the lease, its deadline and the connection of the worker
+        self.leases = {}
+        self.nb_leases = 0
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        if not self.pending:
+            self.done.set()
+
+    def _load_checkpoint(self, path: str) -> None:
+        with open(path) as fp:
+            checkpoint = json.load(fp)
+        if (checkpoint["nb_deals"], checkpoint["shard_size"], checkpoint["seed"]) != (
+            self.nb_deals, self.shard_size, self.seed
+        ):
+            raise ValueError("The checkpoint belongs to another campaign")
+        self.policy = checkpoint["policy"]
+        self.completed = set(checkpoint["completed"])
+        self.stats = {int(version): stats for version, stats in checkpoint["stats"].items()}
+
+    def save_checkpoint(self, path: str | None = None) -> None:
+        path = path or self.checkpoint_path
+        if path is None:
+            raise ValueError("No file has been given to save the campaign")
+        checkpoint = {
+            "nb_deals": self.nb_deals,
+            "shard_size": self.shard_size,
+            "seed": self.seed,
+            "policy": self.policy,
+            "completed": sorted(self.completed),
+            "stats": self.stats
+        }
+        # The checkpoint is replaced at once, so that an interrupted save keeps the previous one
+        with open(f"{path}.tmp", "w") as fp:
+            json.dump(checkpoint, fp)
+        os.replace(f"{path}.tmp", path)
+
+    def set_policy(self, policy: dict) -> None:
+        """
+        Change the settings of the robots for the shards handed out from now on
+        """
+        with self.lock:
+            self.policy = dict(policy, version=self.policy["version"] + 1)
+            if self.checkpoint_path is not None:
+                self.save_checkpoint()
+
+    def lease(self, connection_id: int) -> dict:
+        """
+        Hand out the next shard to a worker
+        :param connection_id: the identifier of the connection of the worker
+        :return: the message sent to the worker
+        """
+        with self.lock:
+            self._expire_leases()
+            if self.done.is_set():
+                return {"type": "done"}
+            if not self.pending:
+                return {"type": "wait"}
+            shard = self.pending.popleft()
+            self.nb_leases += 1
+            self.leases[shard] = (self.nb_leases, time.monotonic() + self.lease_timeout, connection_id)
+            deals = range(shard * self.shard_size, min((shard + 1) * self.shard_size, self.nb_deals))
+            return {
+                "type": "shard",
+                "shard": shard,
+                "lease": self.nb_leases,
+                "seed": self.seed,
+                "start": deals.start,
+                "stop": deals.stop,
+                "policy": self.policy
+            }
+
+    def complete(self, shard: int, lease: int, stats: dict, policy_version: int) -> bool:
+        """
+        Merge the results of a shard
+        :return: whether the results were expected, the ones of an expired lease being ignored
+        """
+        with self.lock:
+            if self.leases.get(shard, (None,))[0] != lease:
+                return False
+            del self.leases[shard]
+            self.completed.add(shard)
+            _merge_stats(self.stats.setdefault(policy_version, _new_stats()), stats)
+            if self.checkpoint_path is not None:
+                self.save_checkpoint()
+            if len(self.completed) == self.nb_shards:
+                self.done.set()
+            return True
+
+    def release(self, connection_id: int) -> None:
+        """
+        Hand out again the shards leased by a worker that disconnected
+        """
+        with self.lock:
+            for shard, (_, _, lease_connection_id) in list(self.leases.items()):
+                if lease_connection_id == connection_id:
+                    del self.leases[shard]
+                    self.pending.appendleft(shard)
+
+    def _expire_leases(self) -> None:
+        now = time.monotonic()
+        for shard, (_, deadline, _) in list(self.leases.items()):
+            if deadline < now:
+                del self.leases[shard]
+                self.pending.appendleft(shard)
+
+    def get_stats(self) -> dict:
+        """
+        Get the statistics merged over every version of the policy
+        """
+        with self.lock:
+            stats = _new_stats()
+            for version_stats in self.stats.values():
+                _merge_stats(stats, version_stats)
+            return stats
+
+    def serve(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> socketserver.ThreadingTCPServer:
+        """
+        Serve the campaign to the workers in a background thread, one JSON message per line
+        :param host: the address to listen on
+        :param port: the port to listen on, 0 picks a free one
+        :return: the running server, stopped with its shutdown method
+        """
+        coordinator = self
+
+        class WorkerHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                connection_id = id(self)
+                try:
+                    for line in self.rfile:
+                        message = json.loads(line)
+                        if message["type"] == "lease":
+                            answer = coordinator.lease(connection_id)
+                        elif message["type"] == "result":
+                            is_accepted = coordinator.complete(
+                                message["shard"], message["lease"], message["stats"], message["policy_version"]
+                            )
+                            answer = {"type": "ack", "accepted": is_accepted}
+                        else:
+                            answer = {"type": "error", "reason": f"Unknown message {message['type']}"}
+                        self.wfile.write(json.dumps(answer).encode() + b"\n")
+                except ConnectionError:
+                    pass
+                finally:
+                    coordinator.release(connection_id)
+
+        server = _CampaignServer((host, port), WorkerHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
+
+
+def run_worker(host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> int:
+    """
+    Play the shards handed out by a coordinator until the campaign is over
+    :return: the number of shards played
+    """
+    nb_shards = 0
+    with socket.create_connection((host, port)) as connection, connection.makefile("rwb") as stream:
+        def send(message: dict) -> dict:
+            stream.write(json.dumps(message).encode() + b"\n")
+            stream.flush()
+            return json.loads(stream.readline())
+
+        while True:
+            answer = send({"type": "lease"})
+            if answer["type"] == "done":
+                return nb_shards
+            if answer["type"] == "wait":
+                time.sleep(WAIT_DELAY)
+                continue
+            stats = play_shard(answer["seed"], answer["start"], answer["stop"], answer["policy"])
+            send({
+                "type": "result",
+                "shard": answer["shard"],
+                "lease": answer["lease"],
+                "policy_version": answer["policy"]["version"],
+                "stats": stats
+            })
+            nb_shards += 1
+
+
+def run_local_campaign(coordinator: Coordinator, nb_workers: int, timeout: float | None = None) -> dict:
+    """
+    Run a campaign with worker processes on the local machine
+    :param timeout: the duration in seconds after which the campaign is stopped, no limit if None
+    :return: the merged statistics
+    :raise TimeoutError: when the campaign is not over in time, the shards played being kept in its checkpoint if any
+    """
+    server = coordinator.serve(port=0)
+    port = server.server_address[1]
+    workers = [Process(target=run_worker, args=("127.0.0.1", port)) for _ in range(nb_workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        is_done = coordinator.done.wait(timeout)
+    finally:
+        for worker in workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+        server.shutdown()
+        server.server_close()
+    if not is_done:
+        raise TimeoutError(
+            f"The campaign is not over after {timeout}s, {len(coordinator.completed)} shards played "
+            f"out of {coordinator.nb_shards}"
+        )
+    return coordinator.get_stats()
+
+
+def run_threaded_campaign(
+    nb_deals: int,
+    nb_threads: int | None = None,
+    seed: int = 0,
+    policy: dict | None = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    contract_table=None
+) -> dict:
+    """
+    Run a campaign on threads of a single process, each shard being played on its own table
+    The tables own their engine, robots, random generators and search, and only share read-only tables,
+    so the results do not depend on the number of threads, which run in parallel on a free-threaded Python
+    :param nb_deals: the number of deals of the campaign
+    :param nb_threads: the number of threads, see ThreadPoolExecutor if None
+    :param seed: the seed of the campaign of deals
+    :param policy: the settings of the robots, see play_shard
+    :param shard_size: the number of deals of a shard
+    :param contract_table: the ContractTable shared by every table
+    :return: the merged statistics
+    """
+    policy = policy or {}
+    stats = _new_stats()
+    with ThreadPoolExecutor(nb_threads) as executor:
+        futures = [
+            executor.submit(play_shard, seed, start, min(start + shard_size, nb_deals), policy, contract_table)
+            for start in range(0, nb_deals, shard_size)
+        ]
+        for future in futures:
+            _merge_stats(stats, future.result())
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-play campaigns shared between worker processes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    coordinator_parser = subparsers.add_parser("coordinator", help="hand out the deals and merge the results")
+    coordinator_parser.add_argument("--nb-deals", type=int, required=True)
+    coordinator_parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    coordinator_parser.add_argument("--seed", type=int, default=0)
+    coordinator_parser.add_argument("--policy", default="{}", help="settings of the robots, as JSON")
+    coordinator_parser.add_argument("--checkpoint", default=None, help="file of the campaign, resumed if it exists")
+    coordinator_parser.add_argument("--lease-timeout", type=float, default=DEFAULT_LEASE_TIMEOUT)
+    coordinator_parser.add_argument("--host", default="127.0.0.1")
+    coordinator_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    coordinator_parser.add_argument("--local-workers", type=int, default=0, help="worker processes started locally")
+    worker_parser = subparsers.add_parser("worker", help="play the deals handed out by a coordinator")
+    worker_parser.add_argument("--host", default="127.0.0.1")
+    worker_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    threads_parser = subparsers.add_parser("threads", help="play the deals on threads of this process")
+    threads_parser.add_argument("--nb-deals", type=int, required=True)
+    threads_parser.add_argument("--threads", type=int, default=None)
+    threads_parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    threads_parser.add_argument("--seed", type=int, default=0)
+    threads_parser.add_argument("--policy", default="{}", help="settings of the robots, as JSON")
+    threads_parser.add_argument("--contract-table", default=None, help="file of the contract table of the robots")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        run_worker(args.host, args.port)
+        return
+    if args.command == "threads":
+        contract_table = None
+        if args.contract_table is not None:
+            from robolot.contracts import ContractTable
+            contract_table = ContractTable(args.contract_table)
+        stats = run_threaded_campaign(
+            args.nb_deals,
+            args.threads,
+            args.seed,
+            json.loads(args.policy),
+            args.shard_size,
+            contract_table
+        )
+        print(json.dumps(stats))
+        return
+    coordinator = Coordinator(
+        args.nb_deals,
+        args.shard_size,
+        args.seed,
+        json.loads(args.policy),
+        args.checkpoint,
+        args.lease_timeout
+    )
+    server = coordinator.serve(args.host, args.port)
+    workers = [Process(target=run_worker, args=(args.host, args.port)) for _ in range(args.local_workers)]
+    for worker in workers:
+        worker.start()
+    coordinator.done.wait()
+    for worker in workers:
+        worker.join()
+    server.shutdown()
+    print(json.dumps(coordinator.get_stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from robolot.dealing import sampled_deal_ids
+from robolot.engine import CoincheEngine, GameState
+from robolot.rng import MASK_64, mix64
+
+
+def play_round(engine: CoincheEngine) -> None:
+    """
+    Play a full round between robots, from the bidding phase to the scoring
+    The robots are asked again until their bid or card is accepted by the engine
+    :param engine: an engine whose players are all robots
+    """
+    if any(player.is_human for player in engine.players):
+        raise ValueError("Only the rounds between robots can be simulated")
+    # We prepare the round if the previous one is over
+    if engine.state == GameState.BETWEEN_ROUNDS:
+        engine.between_rounds()
+    engine.start_bidding()
+    while engine.state == GameState.BIDDING:
+        engine.bid(*engine.players[engine.current_player_index].bid(engine.bid_memory))
+    # The round is cancelled when everyone passed
+    if engine.state != GameState.PLAYING_READY:
+        return
+    engine.start_playing()
+    while engine.state == GameState.PLAYING:
+        engine.play(engine.players[engine.current_player_index].try_card(
+            engine.pli,
+            engine.play_memory,
+            engine.bid_color
+        ))
+
+
+def make_range_engine(seed: int, start: int, stop: int, deal_ids=None, **kwargs) -> CoincheEngine:
+    """
+    Create an engine with four robots playing an endless game on the deals of a range of a campaign
+    The robots draw from generators seeded for the range, so that its rounds do not depend on where it is played
+    :param seed: the seed of the campaign of deals
+    :param start: the index of the first deal
+    :param stop: the index after the last deal
+    :param deal_ids: the identifiers of the deals to play, the deals of the range if None
+    :param kwargs: the other arguments of the engine, like the solvers of the robots
+    """
+    if deal_ids is None:
+        deal_ids = sampled_deal_ids(seed, start, stop)
+    return CoincheEngine(
+        nb_robots=4,
+        target_score=float("inf"),
+        memory_dir=None,
+        seed=seed,
+        deal_ids=deal_ids,
+        robot_seed=mix64(mix64(seed & MASK_64) ^ start),
+        **kwargs
+    )
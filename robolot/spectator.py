@@ -0,0 +1,250 @@
+import argparse
+import asyncio
+import json
+from collections import deque
+from dataclasses import asdict
+
+from robolot import events
+from robolot.engine import CoincheEngine, GameState
+from robolot.models import CARD_IDS
+from robolot.simulation import play_round
+
+
+DEFAULT_PORT = 9110
+DEFAULT_QUEUE_SIZE = 256
+DEFAULT_ROUND_DELAY = 1.0
+SNAPSHOT_MESSAGE = "snapshot"
+# The events seen by the spectators, the actions asked to the players and rejected stay private
+SPECTATOR_EVENTS = (
+    events.BiddingStarted,
+    events.BidPlaced,
+    events.ContractSet,
+    events.RoundCancelled,
+    events.CardPlayed,
+    events.TrickWon,
+    events.RoundScored,
+    events.GameEnded
+)
+
+
+class SpectatorState:
+    def __init__(self):
+        """
+        Public state of a table, updated with the deltas sent to the spectators
+        """
+        self.seq = 0
+        self.round_index = -1
+        self.scores = [0, 0]
+        # The bids of the round, as player_index, bid_value, bid_color, has_coinched, has_surcoinched
+        self.bids = []
+        self.contract = None
+        # The cards of the current trick in the order they were played
+        self.trick = []
+        self.trick_points = [0, 0]
+        self.tricks_won = [0, 0]
+        self.is_game_ended = False
+
+    def apply(self, delta: dict) -> None:
+        """
+        Update the state with a delta, the deltas already included in the state being ignored
+        """
+        if delta["seq"] <= self.seq:
+            return
+        self.seq = delta["seq"]
+        event_type = delta["type"]
+        if event_type == "BiddingStarted":
+            self.round_index += 1
+            self.bids = []
+            self.contract = None
+            self.trick = []
+            self.trick_points = [0, 0]
+            self.tricks_won = [0, 0]
+        elif event_type == "BidPlaced":
+            self.bids.append([
+                delta["player_index"],
+                delta["bid_value"],
+                delta["bid_color"],
+                delta["has_coinched"],
+                delta["has_surcoinched"]
+            ])
+        elif event_type == "ContractSet":
+            self.contract = {
+                key: delta[key] for key in ("bid_value", "bid_color", "bidder_index", "is_coinched", "is_surcoinched")
+            }
+        elif event_type == "CardPlayed":
+            self.trick.append(CARD_IDS[(delta["card_color"], delta["card_value"])])
+        elif event_type == "TrickWon":
+            self.trick = []
+            self.trick_points[delta["team_index"]] += delta["points"]
+            self.tricks_won[delta["team_index"]] += 1
+        elif event_type == "RoundScored":
+            self.scores[delta["winning_team_index"]] += delta["bid_value"]
+        elif event_type == "GameEnded":
+            self.is_game_ended = True
+
+    def to_snapshot(self) -> dict:
+        return {
+            "seq": self.seq,
+            "type": SNAPSHOT_MESSAGE,
+            "round_index": self.round_index,
+            "scores": self.scores,
+            "bids": self.bids,
+            "contract": self.contract,
+            "trick": self.trick,
+            "trick_points": self.trick_points,
+            "tricks_won": self.tricks_won,
+            "is_game_ended": self.is_game_ended
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict) -> "SpectatorState":
+        state = cls()
+        for key, value in snapshot.items():
+            if key != "type":
+                setattr(state, key, value)
+        return state
+
+
+class Spectator:
+    def __init__(self, hub: "SpectatorHub", max_queue_size: int):
+        """
+        Bounded queue of the messages of a spectator, a full snapshot first and then the deltas
+        When the spectator falls behind, its pending deltas are dropped and replaced by a single snapshot,
+        so that the table never waits for it
+        """
+        self.hub = hub
+        self.max_queue_size = max_queue_size
+        self.queue = deque()
+        # Whether the next message is a snapshot, the deltas being ignored until it is sent
+        self.is_behind = True
+        self.nb_dropped = 0
+        self.wakeup = asyncio.Event()
+
+    def push(self, message: bytes) -> None:
+        if not self.is_behind:
+            if len(self.queue) >= self.max_queue_size:
+                self.nb_dropped += len(self.queue)
+                self.queue.clear()
+                self.is_behind = True
+            else:
+                self.queue.append(message)
+        self.wakeup.set()
+
+    def get_nowait(self) -> bytes | None:
+        """
+        Get the next message, or None if there is none
+        """
+        if self.is_behind:
+            # The snapshot is taken when it is sent, and includes every delta dropped until then
+            self.is_behind = False
+            return self.hub.get_snapshot()
+        if self.queue:
+            return self.queue.popleft()
+        return None
+
+    async def get(self) -> bytes:
+        """
+        Wait for the next message
+        """
+        while (message := self.get_nowait()) is None:
+            self.wakeup.clear()
+            await self.wakeup.wait()
+        return message
+
+
+class SpectatorHub:
+    def __init__(self, engine: CoincheEngine, max_queue_size: int = DEFAULT_QUEUE_SIZE):
+        """
+        Subscriber broadcasting the public events of a table to its spectators, one JSON message per line
+        Each event is encoded once for every spectator, and the snapshot once for every spectator joining
+        or falling behind before the next event
+        The hub is created before the game starts, so that its state holds the whole game
+        :param engine: the engine of the table
+        :param max_queue_size: the number of deltas kept for a spectator before they are replaced by a snapshot
+        """
+        self.engine = engine
+        self.max_queue_size = max_queue_size
+        self.state = SpectatorState()
+        self.spectators = set()
+        self.snapshot = None
+        engine.subscribe(self, SPECTATOR_EVENTS)
+
+    def __call__(self, event) -> None:
+        delta = {"seq": self.state.seq + 1, "type": type(event).__name__, **asdict(event)}
+        self.state.apply(delta)
+        self.snapshot = None
+        message = json.dumps(delta).encode() + b"\n"
+        for spectator in self.spectators:
+            spectator.push(message)
+
+    def get_snapshot(self) -> bytes:
+        if self.snapshot is None:
+            self.snapshot = json.dumps(self.state.to_snapshot()).encode() + b"\n"
+        return self.snapshot
+
+    def join(self) -> Spectator:
+        spectator = Spectator(self, self.max_queue_size)
+        self.spectators.add(spectator)
+        return spectator
+
+    def leave(self, spectator: Spectator) -> None:
+        self.spectators.discard(spectator)
+
+    def close(self) -> None:
+        self.engine.unsubscribe(self)
+
+    async def _handle_spectator(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        spectator = self.join()
+        try:
+            while True:
+                writer.write(await spectator.get())
+                # A slow spectator only waits here, its deltas are coalesced meanwhile
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.leave(spectator)
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> asyncio.Server:
+        """
+        Serve the table to the spectators connecting to a TCP port
+        :param host: the address to listen on
+        :param port: the port to listen on, 0 picks a free one
+        :return: the running server
+        """
+        return await asyncio.start_server(self._handle_spectator, host, port)
+
+
+async def run_table(engine: CoincheEngine, round_delay: float = DEFAULT_ROUND_DELAY) -> None:
+    """
+    Play rounds between robots until the end of the game, the spectators being served between the rounds
+    :param engine: an engine whose players are all robots
+    :param round_delay: the delay between two rounds, in seconds
+    """
+    while engine.state != GameState.ENDED:
+        play_round(engine)
+        await asyncio.sleep(round_delay)
+
+
+async def _serve_game(args) -> None:
+    engine = CoincheEngine(nb_robots=4, memory_dir=None, target_score=args.target_score, seed=args.seed)
+    hub = SpectatorHub(engine, args.queue_size)
+    server = await hub.serve(args.host, args.port)
+    async with server:
+        await run_table(engine, args.round_delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a game between robots in front of spectators")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--target-score", type=int, default=1000)
+    parser.add_argument("--round-delay", type=float, default=DEFAULT_ROUND_DELAY)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    asyncio.run(_serve_game(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
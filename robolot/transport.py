@@ -0,0 +1,253 @@
+import argparse
+import os
+from queue import Empty
+from multiprocessing import Process, Queue, resource_tracker, shared_memory
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from robolot import events
+from robolot.engine import CoincheEngine
+from robolot.memory import BID_MEMORY_COLUMNS, PLAY_MEMORY_COLUMNS, RESULT_MEMORY_COLUMNS
+from robolot.simulation import make_range_engine, play_round
+
+
+# The tables of the rounds, with the columns of the memories of the engine and the identifier of the round
+SCHEMAS = {
+    "bid": pa.schema([
+        ("round_id", pa.int64()),
+        ("player_index", pa.int8()),
+        ("team_index", pa.int8()),
+        ("bid_value", pa.int16()),
+        ("bid_color", pa.string()),
+        ("has_coinched", pa.int8()),
+        ("has_surcoinched", pa.int8())
+    ]),
+    "play": pa.schema([
+        ("round_id", pa.int64()),
+        ("player_index", pa.int8()),
+        ("card_value", pa.string()),
+        ("card_color", pa.string())
+    ]),
+    "result": pa.schema([
+        ("round_id", pa.int64()),
+        ("team_index", pa.int8()),
+        ("points", pa.int16())
+    ])
+}
+MEMORY_COLUMNS = {"bid": BID_MEMORY_COLUMNS, "play": PLAY_MEMORY_COLUMNS, "result": RESULT_MEMORY_COLUMNS}
+DEFAULT_BATCH_ROUNDS = 500
+# Message sent by a worker once all its rounds have been sent
+DONE_MESSAGE = None
+
+
+class RoundBatchBuilder:
+    def __init__(self, engine: CoincheEngine, first_round_id: int = 0):
+        """
+        Subscriber gathering the memories of the rounds of an engine in Arrow record batches
+        :param engine: the engine whose rounds are gathered
+        :param first_round_id: the identifier of the first round, increased by one at each round
+        """
+        self.engine = engine
+        self.round_id = first_round_id
+        self.columns = {kind: {name: [] for name in schema.names} for kind, schema in SCHEMAS.items()}
+        self.nb_rounds = 0
+        engine.subscribe(self, (events.RoundScored, events.RoundCancelled))
+
+    def __call__(self, event) -> None:
+        engine = self.engine
+        # The results are the ones exported by the engine, the contract being positive for the team which scored it
+        if isinstance(event, events.RoundCancelled):
+            play_rows = []
+            points = [0, 0]
+        else:
+            play_rows = engine.play_memory.rows
+            points = [-event.bid_value, -event.bid_value]
+            points[event.winning_team_index] = event.bid_value
+        for kind, rows in (
+            ("bid", engine.bid_memory.rows),
+            ("play", play_rows),
+            ("result", list(enumerate(points)))
+        ):
+            columns = self.columns[kind]
+            columns["round_id"].extend([self.round_id] * len(rows))
+            for name, values in zip(MEMORY_COLUMNS[kind], zip(*rows)):
+                columns[name].extend(values)
+        self.round_id += 1
+        self.nb_rounds += 1
+
+    def pop_batches(self) -> dict[str, pa.RecordBatch]:
+        """
+        Get the record batches of the rounds played since the last call
+        """
+        batches = {
+            kind: pa.RecordBatch.from_pydict(self.columns[kind], schema=schema) for kind, schema in SCHEMAS.items()
+        }
+        self.columns = {kind: {name: [] for name in schema.names} for kind, schema in SCHEMAS.items()}
+        self.nb_rounds = 0
+        return batches
+
+    def close(self) -> None:
+        self.engine.unsubscribe(self)
+
+
+def _write_stream(sink, batch: pa.RecordBatch) -> None:
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+
+
+def send_batches(queue: Queue, batches: dict[str, pa.RecordBatch]) -> None:
+    """
+    Write record batches as Arrow IPC streams in a new block of shared memory, and send its location
+    The block is released by the receiver
+    """
+    # The size of the streams is measured first, so that they are written once, directly in the shared memory
+    sizes = {}
+    for kind, batch in batches.items():
+        mock_sink = pa.MockOutputStream()
+        _write_stream(mock_sink, batch)
+        sizes[kind] = mock_sink.size()
+    block = shared_memory.SharedMemory(create=True, size=max(1, sum(sizes.values())))
+    locations = {}
+    offset = 0
+    for kind, batch in batches.items():
+        _write_stream(pa.FixedSizeBufferWriter(pa.py_buffer(block.buf[offset:offset + sizes[kind]])), batch)
+        locations[kind] = (offset, sizes[kind])
+        offset += sizes[kind]
+    # The block is handed over to the receiver, it must outlive the worker
+    resource_tracker.unregister(block._name, "shared_memory")
+    queue.put((block.name, locations))
+    block.close()
+
+
+def run_worker(queue: Queue, seed: int, start: int, stop: int, batch_rounds: int) -> None:
+    """
+    Play one round between robots on each deal of a range, and send them by batches of rounds
+    :param queue: the queue of the locations of the batches, closed by a DONE_MESSAGE
+    :param seed: the seed of the campaign of deals
+    :param start: the index of the first deal
+    :param stop: the index after the last deal
+    :param batch_rounds: the number of rounds of a batch
+    """
+    engine = make_range_engine(seed, start, stop)
+    # The identifier of a round is the index of its deal in the campaign
+    builder = RoundBatchBuilder(engine, start)
+    for _ in range(start, stop):
+        play_round(engine)
+        if builder.nb_rounds >= batch_rounds:
+            send_batches(queue, builder.pop_batches())
+    if builder.nb_rounds:
+        send_batches(queue, builder.pop_batches())
+    builder.close()
+    queue.put(DONE_MESSAGE)
+
+
+class BatchCollector:
+    def __init__(self, output_dir: str | None = None, flush_rounds: int | None = None):
+        """
+        Receiver of the batches sent by the workers, read in place from the shared memory
+        :param output_dir: the folder where the rounds are persisted in Parquet files, they are only kept if None
+        :param flush_rounds: the number of received rounds from which they are persisted, only at the end if None
+        """
+        self.output_dir = output_dir
+        self.flush_rounds = flush_rounds
+        self.batches = {kind: [] for kind in SCHEMAS}
+        # The blocks of shared memory referenced by the received batches
+        self.blocks = []
+        self.nb_rounds = 0
+        self.nb_files = 0
+
+    def receive(self, message: tuple[str, dict[str, tuple[int, int]]]) -> None:
+        name, locations = message
+        block = shared_memory.SharedMemory(name=name)
+        # The block is only removed once it is not mapped by the receiver anymore
+        block.unlink()
+        for kind, (offset, size) in locations.items():
+            self.batches[kind].extend(pa.ipc.open_stream(pa.py_buffer(block.buf[offset:offset + size])))
+        self.blocks.append(block)
+        self.nb_rounds += self.batches["result"][-1].num_rows // 2
+        if self.flush_rounds is not None and self.output_dir is not None and self.nb_rounds >= self.flush_rounds:
+            self.flush()
+
+    def get_tables(self) -> dict[str, pa.Table]:
+        """
+        Get the rounds received since the last flush, read in place from the shared memory
+        The tables have to be released before the next flush
+        """
+        return {kind: pa.Table.from_batches(self.batches[kind], SCHEMAS[kind]) for kind in SCHEMAS}
+
+    def flush(self) -> None:
+        """
+        Persist the received rounds in one Parquet file by table if there is an output folder,
+        and release their shared memory
+        """
+        if self.output_dir is not None and self.nb_rounds:
+            os.makedirs(self.output_dir, exist_ok=True)
+            for kind in SCHEMAS:
+                pq.write_table(
+                    pa.Table.from_batches(self.batches[kind], SCHEMAS[kind]),
+                    os.path.join(self.output_dir, f"{kind}_{self.nb_files:06d}.parquet")
+                )
+            self.nb_files += 1
+        self.batches = {kind: [] for kind in SCHEMAS}
+        for block in self.blocks:
+            block.close()
+        self.blocks = []
+        self.nb_rounds = 0
+
+
+def simulate_rounds(
+    nb_deals: int,
+    nb_workers: int,
+    collector: BatchCollector,
+    seed: int = 0,
+    batch_rounds: int = DEFAULT_BATCH_ROUNDS
+) -> None:
+    """
+    Play one round on each deal of a campaign in parallel, the rounds being received by a collector
+    :param nb_deals: the number of deals of the campaign
+    :param nb_workers: the number of processes playing the rounds
+    :param collector: the collector of the rounds
+    :param seed: the seed of the campaign of deals
+    :param batch_rounds: the number of rounds sent at once by a worker
+    """
+    queue = Queue()
+    bounds = [nb_deals * worker_index // nb_workers for worker_index in range(nb_workers + 1)]
+    workers = [
+        Process(target=run_worker, args=(queue, seed, bounds[worker_index], bounds[worker_index + 1], batch_rounds))
+        for worker_index in range(nb_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    nb_running_workers = nb_workers
+    while nb_running_workers:
+        try:
+            message = queue.get(timeout=1)
+        except Empty:
+            if any(worker.exitcode for worker in workers):
+                raise RuntimeError("A worker stopped before sending all its rounds")
+            continue
+        if message is DONE_MESSAGE:
+            nb_running_workers -= 1
+        else:
+            collector.receive(message)
+    for worker in workers:
+        worker.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play rounds between robots in parallel and persist them")
+    parser.add_argument("output_dir", help="folder of the Parquet files of the rounds")
+    parser.add_argument("--nb-deals", type=int, required=True)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-rounds", type=int, default=DEFAULT_BATCH_ROUNDS)
+    parser.add_argument("--flush-rounds", type=int, default=100_000)
+    args = parser.parse_args()
+    collector = BatchCollector(args.output_dir, args.flush_rounds)
+    simulate_rounds(args.nb_deals, args.workers, collector, args.seed, args.batch_rounds)
+    collector.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -22,7 +22,7 @@ if __name__ == "__main__":
         version=version,
         description=project_description,
         python_requires=">=3.11",
-        packages=find_packages(exclude=["tests"]),
+        packages=find_packages(exclude=["tests", "benchmarks"]),
         install_requires=install_requires,
         extras_require={"dev": extra_requires_dev},
         include_package_data=True,
@@ -0,0 +1,34 @@
+import pytest
+
+from robolot.engine import CoincheEngine
+from robolot.simulation import play_round
+
+
+@pytest.fixture(scope="session")
+def robot_engine():
+    """
+    Factory of engines with four robots, seeded with 0 like the generators of the robots
+    The game never ends unless another target score is given
+    """
+    def _make_engine(memory_dir: str | None = None, **kwargs) -> CoincheEngine:
+        kwargs.setdefault("target_score", 10 ** 9)
+        return CoincheEngine(nb_robots=4, memory_dir=memory_dir, seed=0, robot_seed=0, **kwargs)
+
+    return _make_engine
+
+
+@pytest.fixture(scope="session")
+def export_rounds(robot_engine):
+    """
+    Factory playing rounds between robots, exported in a folder
+    :return: the rounds loaded by robolot.analysis.load_rounds
+    """
+    from robolot.analysis import load_rounds
+
+    def _export_rounds(memory_dir, nb_rounds: int) -> list[dict]:
+        engine = robot_engine(str(memory_dir))
+        for _ in range(nb_rounds):
+            play_round(engine)
+        return load_rounds(str(memory_dir))
+
+    return _export_rounds
@@ -0,0 +1,58 @@
+import json
+
+from robolot.analysis import (
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_MAX_EXACT_TRICKS,
+    _init_worker,
+    analyze_rounds,
+    evaluate_decision,
+    write_report
+)
+from robolot.rules import get_trump_index
+
+
+def test_analysis__rounds(tmp_path, export_rounds):
+    memory_dir = tmp_path / "v1"
+    memory_dir.mkdir()
+    rounds = export_rounds(memory_dir, 6)
+    # The rounds where everyone passed have no cards to analyze
+    assert 0 < len(rounds) <= 6
+    assert all(len(round_["plays"]) == 32 for round_ in rounds)
+    assert rounds[0]["policy_version"] == "v1"
+
+    decisions = analyze_rounds(rounds, nb_workers=1, nb_rollouts=8)
+    assert (decisions["point_loss"] >= 0).all()
+    assert (decisions["nb_legal_cards"] > 1).all()
+    assert set(decisions["method"]) == {"exact", "sampled"}
+    # The last tricks are solved with every hand known
+    exact = decisions[decisions["method"] == "exact"]
+    assert (exact["trick_index"] >= 4).all()
+    assert (exact["best_value"] <= 152).all()
+
+    # The work spread over processes gives the same report
+    parallel_decisions = analyze_rounds(rounds, nb_workers=2, nb_rollouts=8)
+    assert parallel_decisions.equals(decisions)
+
+    summary = write_report(decisions, str(tmp_path / "report"))
+    assert summary["decisions"] == len(decisions)
+    assert sum(row["decisions"] for row in summary["by_player"]) == len(decisions)
+    with open(tmp_path / "report" / "summary.json") as fp:
+        assert json.load(fp)["by_policy"][0]["policy_version"] == "v1"
+    assert (tmp_path / "report" / "decisions.parquet").exists()
+
+
+def test_evaluate_decision__independent_of_previous_positions(tmp_path, export_rounds):
+    rounds = export_rounds(tmp_path, 6)
+    positions = []
+    for round_ in rounds[:2]:
+        hands = [0, 0, 0, 0]
+        for player_index, card in round_["plays"]:
+            hands[player_index] |= 1 << card
+        positions.append((hands, round_["plays"][0][0], [], get_trump_index(round_["bid_color"])))
+    _init_worker(DEFAULT_MAX_EXACT_TRICKS, 8, DEFAULT_CACHE_SIZE)
+    values = evaluate_decision(*positions[1])
+    # The rollouts of a position are the same after other positions, and once it is cached
+    _init_worker(DEFAULT_MAX_EXACT_TRICKS, 8, DEFAULT_CACHE_SIZE)
+    evaluate_decision(*positions[0])
+    assert evaluate_decision(*positions[1]) == values
+    assert evaluate_decision(*positions[1]) == values
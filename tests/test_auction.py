@@ -0,0 +1,104 @@
+import random
+
+import numpy as np
+
+from robolot.auction import (
+    NB_ACTIONS,
+    NB_HOLDING_CLASSES,
+    NB_POSITIONS,
+    AuctionModel,
+    AuctionSampler,
+    get_bid_keys,
+    get_holding_class
+)
+from robolot.engine import GameState
+from robolot.information import InformationSet
+from robolot.ismcts import ISMCTS
+from robolot.models import BID_COLORS, BID_VALUES
+from robolot.rng import CounterRng
+from robolot.rules import ALL_TRUMP_INDEX, NO_TRUMP_INDEX
+
+BIDS = [
+    (0, 0, 120, "hearts", 0, 0),
+    (1, 1, None, None, 0, 0),
+    (2, 0, None, None, 0, 0),
+    (3, 1, None, None, 0, 0)
+]
+
+
+def _strong_hearts_model() -> AuctionModel:
+    """
+    A model where the bid of 120 hearts by the first player is only made with at least five hearts
+    """
+    rng = random.Random(0)
+    hand_counts = np.zeros((len(BID_COLORS), NB_HOLDING_CLASSES), dtype=np.int64)
+    for _ in range(2000):
+        hand = sum(1 << card for card in rng.sample(range(32), 8))
+        for trump_index in range(len(BID_COLORS)):
+            hand_counts[trump_index, get_holding_class(hand, trump_index)] += 1
+    bid_counts = np.zeros((NB_ACTIONS, NB_POSITIONS, len(BID_COLORS), NB_HOLDING_CLASSES), dtype=np.int64)
+    bid_counts[1 + BID_VALUES.index(120), 0, 0, 5 * 4:] = 1000
+    return AuctionModel(bid_counts, hand_counts)
+
+
+def test_get_holding_class():
+    # The jack, nine and ace of hearts, and the ten of spades
+    hand = 1 << 3 | 1 << 2 | 1 << 7 | 1 << 14
+    assert get_holding_class(hand, 0) == 3 * 4 + 2 + 1
+    assert get_holding_class(hand, 1) == 1 * 4
+    assert get_holding_class(hand, NO_TRUMP_INDEX) == 1 * 5 + 1
+    assert get_holding_class(hand, ALL_TRUMP_INDEX) == 1 * 5 + 1
+    assert max(get_holding_class(0xFF << 8 * color, color) for color in range(4)) < NB_HOLDING_CLASSES
+
+
+def test_get_bid_keys():
+    assert get_bid_keys(BIDS, 0) == [(1 + BID_VALUES.index(120), 0, 0)]
+    # A pass tells about every color
+    assert get_bid_keys(BIDS, 2) == [(0, 2, trump_index) for trump_index in range(4)]
+    assert get_bid_keys(BIDS + [(1, 1, None, None, 1, 0)], 1) == [(0, 1, trump_index) for trump_index in range(4)]
+
+
+def test_auction_model__from_rounds(tmp_path, export_rounds):
+    rounds = export_rounds(tmp_path, 8)
+    model = AuctionModel.from_rounds(rounds)
+    assert (model.hand_counts.sum(axis=1) == 4 * len(rounds)).all()
+    assert model.bid_counts.sum() > 0
+    path = str(tmp_path / "auction.npz")
+    model.save(path)
+    loaded = AuctionModel.load(path)
+    assert (loaded.bid_counts == model.bid_counts).all()
+    # A bid never seen gives no information
+    unseen_model = AuctionModel(np.zeros_like(model.bid_counts), model.hand_counts)
+    assert np.allclose(unseen_model.get_ratios((NB_ACTIONS - 1, 3, ALL_TRUMP_INDEX)), 1)
+
+
+def test_auction_sampler__follows_the_bids():
+    model = _strong_hearts_model()
+    hand = sum(1 << card for card in random.Random(1).sample(range(8, 32), 8))
+    information_set = InformationSet(1, hand, 0, BIDS)
+    sampler = AuctionSampler(model, information_set)
+    rng = CounterRng(0)
+    uniform_hearts = []
+    weighted_hearts = []
+    for _ in range(300):
+        uniform_hearts.append(bin(information_set.sample(rng)[0] & 0xFF).count("1"))
+        hands = sampler.sample(rng)
+        assert all(hands[player] & ~information_set.possible[player] == 0 for player in range(4))
+        weighted_hearts.append(bin(hands[0] & 0xFF).count("1"))
+    assert np.mean(weighted_hearts) > np.mean(uniform_hearts) + 1
+    assert np.mean(np.array(weighted_hearts) >= 5) > 0.8
+
+
+def test_auction_sampler__ismcts_round(robot_engine):
+    ismcts = ISMCTS(time_budget=None, max_iterations=50, seed=0, auction_model=_strong_hearts_model())
+    engine = robot_engine(ismcts=ismcts, track_information=True)
+    engine.start_bidding()
+    engine.starting_player_index = engine.current_player_index = 0
+    for bid in BIDS:
+        engine.bid(*bid[2:])
+    engine.start_playing()
+    while engine.state == GameState.PLAYING:
+        player = engine.players[engine.current_player_index]
+        assert player.information_set.bids == engine.bid_memory.rows
+        assert engine.play(player.try_card(engine.pli, engine.play_memory, engine.bid_color)) is True
+    assert sum(team.points for team in engine.teams) == 152
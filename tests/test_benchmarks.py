@@ -0,0 +1,85 @@
+import pytest
+
+from benchmarks.__main__ import main
+from benchmarks.compare import compare, format_rows
+from benchmarks.soak import check_slopes, fit_slope, get_slopes, run_soak
+from benchmarks.suite import run_benchmark
+
+
+def _results(**medians):
+    return {"results": {name: {"median": median} for name, median in medians.items()}}
+
+
+@pytest.mark.parametrize(
+    ("current", "thresholds", "regressed", "missing"),
+    [
+        (_results(full_round=1.1, get_pli_info=1.0), {}, [], []),
+        (_results(full_round=1.3, get_pli_info=1.0), {}, ["full_round"], []),
+        (_results(full_round=1.3, get_pli_info=1.0), {"full_round": 0.5}, [], []),
+        (
+            _results(full_round=1.0, memory_export=10.0),
+            {},
+            [],
+            [("memory_export", "baseline"), ("get_pli_info", "current")]
+        ),
+    ]
+)
+def test_compare(current, thresholds, regressed, missing):
+    baseline = _results(full_round=1.0, get_pli_info=1.0)
+    rows = compare(baseline, current, threshold=0.2, thresholds=thresholds)
+    assert [row["name"] for row in rows if row["regressed"]] == regressed
+    assert [(row["name"], row["missing"]) for row in rows if row["missing"]] == missing
+    assert ("MISSING IN" in format_rows(rows)) == bool(missing)
+
+
+def test_run_benchmark():
+    result = run_benchmark("get_pli_info", repeat=2, number=3)
+    assert result["number"] == 3
+    assert 0 < result["min"] <= result["median"]
+
+
+def test_main__compare_fails_on_regression(tmp_path):
+    (tmp_path / "baseline.json").write_text('{"results": {"full_round": {"median": 1.0}}}')
+    (tmp_path / "current.json").write_text('{"results": {"full_round": {"median": 2.0}}}')
+    assert main(["compare", str(tmp_path / "baseline.json"), str(tmp_path / "current.json")]) == 1
+    assert main(["compare", str(tmp_path / "baseline.json"), str(tmp_path / "current.json"), "--threshold", "1.5"]) == 0
+    # A benchmark of the baseline missing from the run fails the comparison, a new one does not
+    (tmp_path / "current.json").write_text('{"results": {"full_round_v2": {"median": 1.0}}}')
+    assert main(["compare", str(tmp_path / "baseline.json"), str(tmp_path / "current.json")]) == 1
+    (tmp_path / "current.json").write_text('{"results": {"full_round": {"median": 1.0}, "deal": {"median": 1.0}}}')
+    assert main(["compare", str(tmp_path / "baseline.json"), str(tmp_path / "current.json")]) == 0
+
+
+def test_fit_slope():
+    assert fit_slope([0, 1, 2], [1, 3, 5]) == pytest.approx(2)
+    assert fit_slope([1, 1], [1, 2]) is None
+
+
+def test_check_slopes():
+    samples = [
+        {"elapsed": 1800 * index, "rounds": 10, "rss": (100 + 60 * index) * 2 ** 20, "traced": 2 ** 20, "p99": 0.01}
+        for index in range(4)
+    ]
+    slopes = get_slopes(samples, warmup_samples=0)
+    assert slopes["rss_mb"] == pytest.approx(120)
+    assert slopes["traced_mb"] == pytest.approx(0)
+    assert slopes["p99_ratio"] == pytest.approx(0)
+    assert len(check_slopes(slopes, {"rss_mb": 100, "traced_mb": 1})) == 1
+    assert check_slopes(slopes, {"rss_mb": 200}) == []
+    # Without the current RSS, its slope is not checked
+    for sample in samples:
+        sample["rss"] = None
+    assert get_slopes(samples, warmup_samples=0)["rss_mb"] is None
+
+
+def test_run_soak():
+    report = run_soak(1, interval=0.3, top_allocators=3, max_slopes={})
+    assert len(report["samples"]) >= 2
+    assert report["failures"] == []
+    for sample in report["samples"]:
+        assert sample["rounds"] > 0
+        assert sample["p50"] <= sample["p99"]
+        assert sample["rss"] is None or sample["rss"] > 0
+        assert sample["peak_rss"] > 0
+        assert len(sample["top_allocators"]) <= 3
+    assert report["samples"][-1]["total_rounds"] == sum(sample["rounds"] for sample in report["samples"])
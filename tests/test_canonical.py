@@ -0,0 +1,80 @@
+import random
+from itertools import permutations
+
+import pytest
+
+from robolot.canonical import (
+    canonicalize_hand,
+    canonicalize_position,
+    get_position_key,
+    invert_permutation,
+    permute_card,
+    permute_color,
+    permute_mask
+)
+from robolot.endgame import EndgameSolver
+from robolot.models import Color
+from robolot.rules import get_trump_index
+
+
+def _random_position(rng: random.Random, nb_cards: int) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    cards = rng.sample(range(32), 4 * nb_cards)
+    hands = tuple(sum(1 << card for card in cards[i * nb_cards:(i + 1) * nb_cards]) for i in range(4))
+    return hands, tuple(cards[:2])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_canonicalize_position__same_for_every_change_of_colors(seed):
+    rng = random.Random(seed)
+    hands, trick = _random_position(rng, 4)
+    trump_index = seed % 4 if seed < 4 else None
+    hands = tuple(hand & ~sum(1 << card for card in trick) for hand in hands)
+    expected = canonicalize_position(hands, trick, trump_index)[:3]
+    expected_key = get_position_key(hands, trump_index)
+    for permutation in permutations(range(4)):
+        # The trump color is only exchanged with itself
+        if trump_index is not None and permutation[trump_index] != trump_index:
+            continue
+        permuted_hands = tuple(permute_mask(hand, permutation) for hand in hands)
+        permuted_trick = tuple(permute_card(card, permutation) for card in trick)
+        assert canonicalize_position(permuted_hands, permuted_trick, trump_index)[:3] == expected
+        assert get_position_key(permuted_hands, trump_index) == expected_key
+
+
+def test_canonicalize_position__inverse():
+    hands, trick = _random_position(random.Random(0), 8)
+    canonical_hands, canonical_trick, canonical_trump_index, permutation = canonicalize_position(hands, trick, 2)
+    assert canonical_trump_index == 0
+    inverse = invert_permutation(permutation)
+    assert tuple(permute_mask(hand, inverse) for hand in canonical_hands) == hands
+    assert tuple(permute_card(card, inverse) for card in canonical_trick) == trick
+    assert permute_color(permute_color(Color.CLUBS, permutation), inverse) == Color.CLUBS
+    assert permute_color("clubs", permutation) == Color.HEARTS
+
+
+def test_canonicalize_hand():
+    # The hearts and the clubs are exchanged, the trump spades first
+    hand = 0b11 | 0b111 << 8 | 0b1 << 16
+    canonical_hand, permutation = canonicalize_hand(hand, trump_index=1)
+    assert permutation == (1, 0, 2, 3)
+    assert canonical_hand == 0b111 | 0b11 << 8 | 0b1 << 16
+    assert canonicalize_hand(permute_mask(hand, (2, 1, 0, 3)), trump_index=1)[0] == canonical_hand
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_evaluate__same_for_every_change_of_colors(seed):
+    hands, _ = _random_position(random.Random(seed), 3)
+    solver = EndgameSolver()
+    values = solver.evaluate(list(hands), 0, [], seed)
+    permutation = tuple(random.Random(seed).sample(range(4), 4))
+    permuted_values = solver.evaluate([permute_mask(hand, permutation) for hand in hands], 0, [], permutation[seed])
+    assert permuted_values == {permute_card(card, permutation): value for card, value in values.items()}
+
+
+def test_get_position_key__contracts_without_trump_color():
+    hands = (0x0F, 0xF0, 0x0F00, 0xF000)
+    no_trump_key = get_position_key(hands, get_trump_index("no_trump"))
+    # The same hands have different values in the contracts without a trump color
+    assert no_trump_key != get_position_key(hands, get_trump_index("all_trump"))
+    permuted_hands = tuple(permute_mask(hand, (2, 3, 0, 1)) for hand in hands)
+    assert get_position_key(permuted_hands, get_trump_index("no_trump")) == no_trump_key
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from robolot.canonical import permute_mask
+from robolot.contracts import (
+    NB_HAND_CLASSES,
+    ContractTable,
+    build_contract_table,
+    get_hand_class,
+    simulate_deals
+)
+from robolot.engine import CoincheEngine
+from robolot.memory import BID_MEMORY_COLUMNS, Memory
+from robolot.models import BID_VALUES, Card
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_get_hand_class__same_for_every_change_of_colors(seed):
+    rng = random.Random(seed)
+    hand = sum(1 << card for card in rng.sample(range(32), 8))
+    trump_index = seed % 4
+    hand_class = get_hand_class(hand, trump_index)
+    assert 0 <= hand_class < NB_HAND_CLASSES
+    permutation = tuple(rng.sample(range(4), 4))
+    assert get_hand_class(permute_mask(hand, permutation), permutation[trump_index]) == hand_class
+
+
+def test_build_contract_table__resumed(tmp_path):
+    path = tmp_path / "table.bin"
+    build_contract_table(path, nb_deals=4, seed=0, nb_workers=2, chunk_size=2)
+    resumed_path = tmp_path / "resumed.bin"
+    build_contract_table(resumed_path, nb_deals=2, seed=0, nb_workers=1, chunk_size=2)
+    build_contract_table(resumed_path, nb_deals=4, seed=0, nb_workers=1, chunk_size=2)
+    assert path.read_bytes() == resumed_path.read_bytes()
+    with pytest.raises(ValueError):
+        build_contract_table(resumed_path, nb_deals=4, seed=1, nb_workers=1, chunk_size=2)
+    # Each deal is played once for each trump color
+    counts = simulate_deals(0, 0, 4)
+    assert sum(counts[::len(BID_VALUES) + 1]) == 16
+    table = ContractTable(path)
+    assert table.nb_deals == 4
+
+
+def test_contract_table__robot_bid(tmp_path):
+    path = tmp_path / "table.bin"
+    build_contract_table(path, nb_deals=20, seed=0, nb_workers=2, chunk_size=10)
+    table = ContractTable(path)
+    engine = CoincheEngine(nb_robots=4, memory_dir=None, seed=0, contract_table=table)
+    robot = engine.players[0]
+    hand = robot.get_hand_mask()
+    for trump_index in range(4):
+        probability = table.get_success_probability(hand, trump_index, 80)
+        assert probability is None or 0 <= probability <= 1
+    bid_value, bid_color, has_coinched, has_surcoinched = robot.bid(Memory(BID_MEMORY_COLUMNS))
+    assert engine._check_bid_validity(Memory(BID_MEMORY_COLUMNS), bid_value, bid_color, has_coinched, has_surcoinched)
+    # Nothing is bid above the highest contract
+    assert robot.bid(Memory(BID_MEMORY_COLUMNS, [(1, 1, 500, "hearts", 0, 0)])) == (None, None, 0, 0)
+
+
+def test_belotte_points():
+    engine = CoincheEngine(nb_robots=4, memory_dir=None, seed=0)
+    engine.start_bidding()
+    engine.players[0].hand[0] = Card("hearts", "K")
+    engine.players[0].hand[1] = Card("hearts", "Q")
+    engine.bid(80, "hearts", 0, 0)
+    for _ in range(3):
+        engine.bid(None, None, 0, 0)
+    assert engine.belotte_points == 20
@@ -0,0 +1,61 @@
+from itertools import islice
+
+import pytest
+
+from robolot.dealing import NB_DEALS, partition, rank_deal, sampled_deal_ids, unrank_deal
+from robolot.engine import CoincheEngine
+from robolot.models import CARD_IDS
+
+
+def _hands(engine: CoincheEngine) -> list[list[int]]:
+    return [sorted(CARD_IDS[(card.color, card.value)] for card in player.hand) for player in engine.players]
+
+
+def test_nb_deals():
+    assert NB_DEALS == 99561092450391000
+
+
+@pytest.mark.parametrize("deal_id", [0, 1, 123456789, NB_DEALS // 3, NB_DEALS - 1])
+def test_rank_unrank_deal(deal_id):
+    hands = unrank_deal(deal_id)
+    assert sorted(card_id for hand in hands for card_id in hand) == list(range(32))
+    assert all(len(hand) == 8 for hand in hands)
+    assert rank_deal(hands) == deal_id
+
+
+def test_unrank_deal__out_of_range():
+    with pytest.raises(ValueError):
+        unrank_deal(NB_DEALS)
+
+
+def test_sampled_deal_ids__partitions_do_not_overlap():
+    shares = [partition(1000, 3, worker_index) for worker_index in range(3)]
+    assert [len(share) for share in shares] == [334, 333, 333]
+    deal_ids = [
+        deal_id
+        for share in shares
+        for deal_id in sampled_deal_ids(7, share.start, share.stop)
+    ]
+    assert len(set(deal_ids)) == 1000
+    assert deal_ids[:5] == list(islice(sampled_deal_ids(7), 5))
+
+
+def test_engine__deal_ids():
+    engine = CoincheEngine(nb_robots=4, memory_dir=None, deal_ids=[42, NB_DEALS - 1])
+    assert _hands(engine) == unrank_deal(42)
+    assert engine.get_deal_id() == 42
+    assert engine.deck.cards == []
+    for player in engine.players:
+        engine.piles[1].add(player.hand)
+        player.hand = [None] * 8
+        player.top_hand_index = 7
+    engine.between_rounds()
+    assert _hands(engine) == unrank_deal(NB_DEALS - 1)
+
+
+def test_engine__seeded_shuffle():
+    engines = [CoincheEngine(nb_robots=4, memory_dir=None, seed=3) for _ in range(2)]
+    assert _hands(engines[0]) == _hands(engines[1])
+    # The deal can be replayed from its identifier
+    replayed = CoincheEngine(nb_robots=4, memory_dir=None, deal_ids=[engines[0].get_deal_id()])
+    assert _hands(replayed) == _hands(engines[0])
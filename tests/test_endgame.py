@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from robolot.endgame import EndgameSolver
+from robolot.engine import GameState
+from robolot.rules import get_legal_cards, get_trick_points, get_trick_winner, iter_cards
+
+
+def _minimax(hands, leader, trick, trump_index):
+    """
+    Points won by the team of the player to move, without any pruning nor cache
+    """
+    player = (leader + len(trick)) % 4
+    if not trick and not hands[player]:
+        return 0
+    best = None
+    for card in iter_cards(get_legal_cards(hands[player], trick, trump_index)):
+        new_hands = list(hands)
+        new_hands[player] &= ~(1 << card)
+        new_trick = trick + [card]
+        if len(new_trick) == 4:
+            winner = (leader + get_trick_winner(new_trick, trump_index)) % 4
+            value = _minimax(new_hands, winner, [], trump_index)
+            if winner % 2 != player % 2:
+                value = sum(_points(new_hands, trump_index)) - value
+            else:
+                value += get_trick_points(new_trick, trump_index)
+        else:
+            next_value = _minimax(new_hands, leader, new_trick, trump_index)
+            value = sum(_points(new_hands, trump_index)) + get_trick_points(new_trick, trump_index) - next_value
+        best = value if best is None else max(best, value)
+    return best
+
+
+def _points(hands, trump_index):
+    return [get_trick_points(list(iter_cards(hand)), trump_index) for hand in hands]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_evaluate__same_as_minimax(seed):
+    rng = random.Random(seed)
+    cards = rng.sample(range(32), 12)
+    hands = [sum(1 << card for card in cards[i * 3:(i + 1) * 3]) for i in range(4)]
+    trump_index = seed % 4
+    solver = EndgameSolver()
+    values = solver.evaluate(hands, 0, [], trump_index)
+    assert max(values.values()) == _minimax(hands, 0, [], trump_index)
+    for card, value in values.items():
+        new_hands = list(hands)
+        new_hands[0] &= ~(1 << card)
+        opponent_value = _minimax(new_hands, 0, [card], trump_index)
+        assert value == sum(_points(hands, trump_index)) - opponent_value
+
+
+def test_choose_card__bot_round(tmp_path, robot_engine):
+    solver = EndgameSolver(max_tricks=3, seed=0)
+    engine = robot_engine(endgame_solver=solver)
+    engine.start_bidding()
+    engine.bid(80, "spades", 0, 0)
+    for _ in range(3):
+        engine.bid(None, None, 0, 0)
+    engine.start_playing()
+    while engine.state == GameState.PLAYING:
+        player = engine.players[engine.current_player_index]
+        card_index = player.try_card(engine.pli, engine.play_memory, engine.bid_color)
+        # The solver only plays valid cards
+        if engine.pli_counter >= 5:
+            assert engine.play(card_index) is True
+        else:
+            engine.play(card_index)
+    assert len(solver.cache) > 0
+    solver.save_cache(tmp_path / "cache.pkl")
+    assert EndgameSolver(cache_path=tmp_path / "cache.pkl").cache == solver.cache
+    # Closing the engine saves the cache of a solver which has a file
+    solver.cache_path = tmp_path / "closed.pkl"
+    engine.close()
+    assert EndgameSolver(cache_path=tmp_path / "closed.pkl").cache == solver.cache
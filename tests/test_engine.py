@@ -1,7 +1,14 @@
+import inspect
+import pickle
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import pytest
 
 from robolot.engine import CoincheEngine
+from robolot.simulation import play_round
 
 @pytest.mark.parametrize(
     ("memory", "bid_value", "bid_color", "has_coinched", "has_surcoinched", "result"),
@@ -50,6 +57,51 @@ from robolot.engine import CoincheEngine
             0,
             0,
             False
+         ),
+         (
+            pd.DataFrame({
+                "player_index": [0, 1],
+                "team_index": [0, 1],
+                "bid_value": [80, 100],
+                "bid_color": ["spades", "hearts"],
+                "has_coinched": [0, 0],
+                "has_surcoinched": [0, 0]
+            }),
+            110,
+            "no_trump",
+            0,
+            0,
+            True
+         ),
+         (
+            pd.DataFrame({
+                "player_index": [0, 1],
+                "team_index": [0, 1],
+                "bid_value": [80, 100],
+                "bid_color": ["all_trump", "hearts"],
+                "has_coinched": [0, 0],
+                "has_surcoinched": [0, 0]
+            }),
+            110,
+            "all_trump",
+            0,
+            0,
+            True
+         ),
+         (
+            pd.DataFrame({
+                "player_index": [0, 1],
+                "team_index": [0, 1],
+                "bid_value": [80, 100],
+                "bid_color": ["spades", "hearts"],
+                "has_coinched": [0, 0],
+                "has_surcoinched": [0, 0]
+            }),
+            110,
+            "green",
+            0,
+            0,
+            False
          )
     ]
 )
@@ -186,4 +238,69 @@ def test_check_bid_validity__surcoinche_without_previous_bid(
         player_bid_color=bid_color,
         has_coinched=has_coinched,
         has_surcoinched=has_surcoinched
-    ) is result
\ No newline at end of file
+    ) is result
+
+
+def _play_table(robot_seed: int) -> list[tuple]:
+    engine = CoincheEngine(nb_robots=4, memory_dir=None, target_score=float("inf"), seed=0, robot_seed=robot_seed)
+    rounds = []
+    for _ in range(20):
+        play_round(engine)
+        rounds.append((tuple(engine.bid_memory.rows), tuple(engine.pli_winners_memory)))
+    return rounds
+
+
+def test_robot_seed__tables_on_threads():
+    random.seed(0)
+    state = random.getstate()
+    expected = [_play_table(robot_seed) for robot_seed in range(8)]
+    # The robots never draw from the global generator
+    assert random.getstate() == state
+    assert expected[0] != expected[1]
+    with ThreadPoolExecutor(4) as executor:
+        assert list(executor.map(_play_table, range(8))) == expected
+
+
+def test_robot_seed__table_in_subinterpreter():
+    interpreters = pytest.importorskip("_xxsubinterpreters")
+    channel_id = interpreters.channel_create()
+    interpreter_id = interpreters.create()
+    # The test module imports NumPy, which can only be loaded in one interpreter, so only the table is run
+    script = "\n".join([
+        "import pickle",
+        "import sys",
+        "import _xxsubinterpreters as interpreters",
+        f"sys.path[:] = {sys.path!r}",
+        "from robolot.engine import CoincheEngine",
+        "from robolot.simulation import play_round",
+        inspect.getsource(_play_table),
+        "interpreters.channel_send(channel_id, pickle.dumps(_play_table(3)))"
+    ])
+    try:
+        interpreters.run_string(interpreter_id, script, shared={"channel_id": channel_id})
+        assert pickle.loads(interpreters.channel_recv(channel_id)) == _play_table(3)
+    finally:
+        interpreters.destroy(interpreter_id)
+
+
+def _get_robot_seats(seed: int) -> list[bool]:
+    engine = CoincheEngine(nb_robots=2, memory_dir=None, seed=seed)
+    return [not player.is_human for player in engine.players]
+
+
+def test_robot_seed__from_engine_seed():
+    random.seed(0)
+    state = random.getstate()
+    seats = [_get_robot_seats(seed) for seed in range(8)]
+    engines = [CoincheEngine(nb_robots=4, memory_dir=None, seed=seed) for seed in (0, 0, 1)]
+    bids = [[] for _ in engines]
+    for _ in range(5):
+        for engine, engine_bids in zip(engines, bids):
+            play_round(engine)
+            engine_bids.append(tuple(engine.bid_memory.rows))
+    # Without a robot seed, the seats and the draws of the robots only depend on the seed of the engine
+    assert random.getstate() == state
+    assert seats == [_get_robot_seats(seed) for seed in range(8)]
+    assert len(set(map(tuple, seats))) > 1
+    assert bids[0] == bids[1]
+    assert bids[0] != bids[2]
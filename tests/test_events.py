@@ -0,0 +1,74 @@
+from robolot.engine import CoincheEngine
+from robolot.events import (
+    ActionRejected,
+    BiddingStarted,
+    BidPlaced,
+    CardPlayed,
+    ContractSet,
+    MessageLog,
+    PlayerToAct,
+    RoundScored,
+    TrickWon
+)
+from robolot.simulation import play_round
+
+
+def _play_until_scored(engine: CoincheEngine) -> None:
+    play_round(engine)
+    # The rounds where everyone passed have no contract
+    while engine.bid_value is None:
+        play_round(engine)
+
+
+def test_events__round(robot_engine):
+    engine = robot_engine()
+    events = []
+    engine.subscribe(events.append)
+    _play_until_scored(engine)
+    # We only look at the last round, which has been played until the end
+    events = events[max(i for i, event in enumerate(events) if isinstance(event, BiddingStarted)):]
+    assert isinstance(events[1], PlayerToAct) and events[1].action == "bid"
+    assert sum(isinstance(event, ContractSet) for event in events) == 1
+    assert sum(isinstance(event, CardPlayed) for event in events) == 32
+    tricks = [event for event in events if isinstance(event, TrickWon)]
+    assert len(tricks) == 8
+    assert sum(trick.points for trick in tricks) == 152
+    assert isinstance(events[-1], RoundScored)
+
+
+def test_events__filtered_subscriber(robot_engine):
+    engine = robot_engine()
+    bids = []
+    engine.subscribe(bids.append, (BidPlaced,))
+    play_round(engine)
+    assert bids and all(isinstance(event, BidPlaced) for event in bids)
+    engine.unsubscribe(bids.append)
+    assert engine.subscribers == []
+
+
+def test_events__rejected_bid_message():
+    engine = CoincheEngine(nb_robots=4, memory_dir=None)
+    message_log = MessageLog([player.name for player in engine.players])
+    engine.subscribe(message_log)
+    engine.start_bidding()
+    assert message_log.pop_messages() == ["Starting bidding phase:", "player1 has to bid"]
+    assert engine.bid(115, "clubs", 0, 0) is False
+    assert isinstance(message_log.events[0], ActionRejected)
+    assert message_log.pop_messages() == ["Your bid is unvalid, please try again", "The bid has to be a valid value"]
+    assert engine.bid(90, "clubs", 0, 0) is True
+    assert message_log.pop_messages() == ["player1 bid: 90 of clubs", "player2 has to bid"]
+    assert message_log.pop_messages() is None
+
+
+def test_message_log__max_events():
+    engine = CoincheEngine(nb_robots=4, memory_dir=None)
+    message_log = MessageLog([player.name for player in engine.players])
+    engine.subscribe(message_log)
+    engine.start_bidding()
+    engine.bid(90, "clubs", 0, 0)
+    assert len(message_log.events) == 4
+    assert message_log.pop_messages(1) == ["player2 has to bid"]
+    engine.bid(100, "clubs", 0, 0)
+    assert message_log.pop_messages(0) == []
+    engine.bid(110, "clubs", 0, 0)
+    assert message_log.pop_messages(5) == ["player3 bid: 110 of clubs", "player4 has to bid"]
@@ -0,0 +1,44 @@
+import pytest
+
+from robolot.fuzzing import FuzzCase, MaskRules, find_mismatch, fuzz, generate_case, shrink_case
+from robolot.rules import COLOR_MASKS
+
+
+class NoOvertrumpRules(MaskRules):
+    """
+    Rules forgetting that a trump card must be higher than the previous ones
+    """
+    def get_legal_cards(self, hand, trick, trump_index):
+        legal_cards = super().get_legal_cards(hand, trick, trump_index)
+        if trick and trump_index < 4 and legal_cards & COLOR_MASKS[trump_index]:
+            return legal_cards | hand & COLOR_MASKS[trump_index]
+        return legal_cards
+
+
+def test_generate_case():
+    assert generate_case(0, 3) == generate_case(0, 3)
+    assert generate_case(0, 3) != generate_case(0, 4)
+    assert len(generate_case(1, 0).choices) == 32
+
+
+def test_fuzz__mask_rules_agree_with_engine():
+    assert fuzz(300, nb_workers=1) == []
+    assert fuzz(40, seed=1, nb_workers=2) == []
+
+
+def test_fuzz__shrinks_mismatch():
+    failures = fuzz(100, "tests.test_fuzzing:NoOvertrumpRules", nb_workers=2)
+    assert failures
+    for failure in failures:
+        case = FuzzCase.from_dict(failure["case"])
+        shrunk_case = FuzzCase.from_dict(failure["shrunk_case"])
+        assert failure["mismatch"].startswith("legal cards")
+        assert find_mismatch(shrunk_case, NoOvertrumpRules()) == failure["mismatch"]
+        assert find_mismatch(shrunk_case, MaskRules()) is None
+        assert len(shrunk_case.bids) <= len(case.bids)
+        assert sum(shrunk_case.choices) <= sum(case.choices)
+
+
+def test_shrink_case__fails_without_mismatch():
+    with pytest.raises(ValueError):
+        shrink_case(generate_case(0, 0), MaskRules())
@@ -0,0 +1,99 @@
+import random
+from collections import Counter
+from itertools import combinations
+
+import pytest
+
+from robolot.engine import CoincheEngine, GameState
+from robolot.information import InformationSet
+from robolot.models import CARD_IDS
+from robolot.rng import CounterRng
+from robolot.rules import iter_cards
+
+
+def _hand_mask(hand) -> int:
+    return sum(1 << CARD_IDS[(card.color, card.value)] for card in hand if card is not None)
+
+
+def _brute_force_distributions(information_set: InformationSet) -> list[tuple[int, ...]]:
+    """
+    Every distribution of the hidden cards allowed by the possible cards of each player
+    """
+    seat = information_set.seat
+    others = [player for player in range(4) if player != seat]
+    hidden = list(iter_cards(information_set.get_remaining_cards() & ~information_set.possible[seat]))
+    distributions = []
+    first, second, third = others
+    for first_hand in combinations(hidden, information_set.hand_sizes[first]):
+        rest = [card for card in hidden if card not in first_hand]
+        for second_hand in combinations(rest, information_set.hand_sizes[second]):
+            hands = [0] * 4
+            hands[seat] = information_set.possible[seat]
+            hands[first] = sum(1 << card for card in first_hand)
+            hands[second] = sum(1 << card for card in second_hand)
+            hands[third] = sum(1 << card for card in rest if card not in second_hand)
+            if all(hands[player] & ~information_set.possible[player] == 0 for player in others):
+                distributions.append(tuple(hands))
+    return distributions
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_information_set__consistent_with_hands(seed):
+    random.seed(seed)
+    engine = CoincheEngine(nb_robots=4, memory_dir=None, seed=seed, track_information=True)
+    engine.start_bidding()
+    engine.bid(80, ["hearts", "spades", "clubs", "diamonds"][seed % 4], 0, 0)
+    for _ in range(3):
+        engine.bid(None, None, 0, 0)
+    engine.start_playing()
+    while engine.state == GameState.PLAYING:
+        hands = [_hand_mask(player.hand) for player in engine.players]
+        for information_set in engine.information_sets:
+            # The real hands are always among the possible ones
+            for player in range(4):
+                assert hands[player] & ~information_set.get_possible_cards(player) == 0
+            assert information_set.hand_sizes == [bin(hand).count("1") for hand in hands]
+        player = engine.players[engine.current_player_index]
+        engine.play(player.try_card(engine.pli, engine.play_memory, engine.bid_color))
+    # Every card has been seen by every player at the end of the round
+    for information_set in engine.information_sets:
+        assert information_set.played == (1 << 32) - 1
+
+
+def test_information_set__void_inference():
+    # Player 0 holds the hearts from 7 to K, player 1 does not follow on the first trick
+    information_set = InformationSet(0, 0b00111111 | (0b11 << 8), trump_index=1)
+    information_set.observe(0, 0)
+    information_set.observe(1, 16)
+    assert information_set.is_void(1, 0)
+    # Without the asked color and without cutting while the opponent wins, no trump either
+    assert information_set.is_void(1, 1)
+    assert not information_set.is_void(2, 1)
+    assert information_set.get_possible_holders(6) == [2, 3]
+    assert information_set.get_possible_holders(1) == [0]
+
+
+def test_information_set__counts_and_sampling():
+    rng = random.Random(0)
+    engine = CoincheEngine(nb_robots=4, memory_dir=None, seed=1, track_information=True)
+    engine.start_bidding()
+    engine.bid(80, "clubs", 0, 0)
+    for _ in range(3):
+        engine.bid(None, None, 0, 0)
+    engine.start_playing()
+    # We play until few enough cards remain to enumerate the distributions
+    while engine.pli_counter < 6 or engine.pli.cards:
+        hand = engine.players[engine.current_player_index].hand
+        engine.play(rng.choice([
+            index for index, card in enumerate(hand) if card is not None and engine._check_card_validity(hand, card)
+        ]))
+    information_set = engine.information_sets[engine.current_player_index]
+    expected = _brute_force_distributions(information_set)
+    assert information_set.count_distributions() == len(expected)
+    assert sorted(tuple(hands) for hands in information_set.iter_distributions()) == sorted(expected)
+    # Each distribution is drawn with the same probability
+    counter_rng = CounterRng(0)
+    nb_samples = 100 * len(expected)
+    counts = Counter(tuple(information_set.sample(counter_rng)) for _ in range(nb_samples))
+    assert set(counts) <= set(expected)
+    assert all(abs(counts[hands] - 100) < 50 for hands in expected)
@@ -0,0 +1,48 @@
+import json
+from urllib.request import urlopen
+
+from robolot.engine import CoincheEngine
+from robolot.instrumentation import EngineStats, serve_metrics
+
+
+def test_instrumentation__disabled_by_default(monkeypatch):
+    monkeypatch.delenv("ROBOLOT_INSTRUMENT", raising=False)
+    engine = CoincheEngine(nb_robots=4, memory_dir=None)
+    assert engine.stats is None
+    # The methods are not wrapped when the instrumentation is disabled
+    assert "bid" not in vars(engine)
+
+
+def test_instrumentation__enabled_by_environment(monkeypatch):
+    monkeypatch.setenv("ROBOLOT_INSTRUMENT", "1")
+    engine = CoincheEngine(nb_robots=4, memory_dir=None)
+    assert engine.stats is not None
+    assert engine.stats.snapshot()["phases"]["deal"]["calls"] == 1
+
+
+def test_instrumentation__rejected_bids():
+    engine = CoincheEngine(instrument=True, nb_robots=4, memory_dir=None)
+    engine.start_bidding()
+    engine.bid(115, "clubs", 0, 0)
+    engine.bid(None, None, 0, 0)
+    snapshot = engine.stats.snapshot()
+    assert snapshot["phases"]["bid"]["calls"] == 2
+    assert snapshot["phases"]["check_bid_validity"]["calls"] == 2
+    assert snapshot["rejected_bids"] == 1
+    assert snapshot["rejected_cards"] == 0
+    assert json.loads(engine.stats.to_json()) == snapshot
+
+
+def test_serve_metrics():
+    stats = EngineStats()
+    stats.record("play", 2_000_000)
+    stats.record_rejection("check_card_validity")
+    server = serve_metrics(stats, port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        page = urlopen(f"{url}/metrics").read().decode()
+        assert 'robolot_engine_calls_total{phase="play"} 1' in page
+        assert "robolot_engine_rejected_cards_total 1" in page
+        assert json.loads(urlopen(f"{url}/stats.json").read())["phases"]["play"]["max_s"] == 0.002
+    finally:
+        server.shutdown()
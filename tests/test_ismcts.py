@@ -0,0 +1,67 @@
+from robolot.engine import GameState
+from robolot.ismcts import ISMCTS, PASS_ACTION, SearchTree
+from robolot.memory import BID_MEMORY_COLUMNS, Memory
+
+
+def test_search_tree__budget():
+    tree = SearchTree(max_nodes=4)
+    root = tree.clear()
+    assert tree.expand(root, 0, [3, 5, 7])
+    assert tree.find_child(root, 5) == 2
+    assert tree.find_child(root, 4) is None
+    # There is no space left for the children of a child
+    assert not tree.expand(1, 1, [1, 2])
+    assert tree.nb_nodes == 4
+
+
+def test_ismcts__bot_round(robot_engine):
+    ismcts = ISMCTS(time_budget=None, max_iterations=100, seed=0)
+    engine = robot_engine(ismcts=ismcts)
+    engine.start_bidding()
+    engine.bid(80, "spades", 0, 0)
+    for _ in range(3):
+        engine.bid(None, None, 0, 0)
+    engine.start_playing()
+    reused_roots = 0
+    while engine.state == GameState.PLAYING:
+        player = engine.players[engine.current_player_index]
+        # The search only plays valid cards
+        assert engine.play(player.try_card(engine.pli, engine.play_memory, engine.bid_color)) is True
+        # A single playable card is played without searching
+        if player.index in ismcts.trees:
+            reused_roots += ismcts.trees[player.index][1] != 0
+    # The tree of the previous decision is kept when the cards played since are in it
+    assert reused_roots > 0
+    assert sum(team.points for team in engine.teams) == 152
+
+
+def test_ismcts__bid(robot_engine):
+    ismcts = ISMCTS(time_budget=None, max_iterations=200, seed=0)
+    engine = robot_engine(ismcts=ismcts)
+    engine.start_bidding()
+    bid_memory = Memory(BID_MEMORY_COLUMNS, [(1, 1, 160, "hearts", 0, 0)])
+    bid = engine.players[2].bid(bid_memory)
+    assert engine._check_bid_validity(bid_memory, *bid)
+    # Nothing can be bid above the highest contract
+    assert ismcts.choose_bid(2, engine.players[2].hand, Memory(BID_MEMORY_COLUMNS, [(1, 1, 500, "hearts", 0, 0)])) == (
+        None, None, 0, 0
+    )
+    assert PASS_ACTION in ismcts.trees[2][0].get_root_statistics(0)
+
+
+def test_ismcts__root_parallel(robot_engine):
+    ismcts = ISMCTS(time_budget=None, max_iterations=50, nb_workers=2, seed=0)
+    engine = robot_engine(ismcts=ismcts)
+    engine.start_bidding()
+    engine.bid(90, "hearts", 0, 0)
+    for _ in range(3):
+        engine.bid(None, None, 0, 0)
+    engine.start_playing()
+    player = engine.players[engine.current_player_index]
+    try:
+        assert engine.play(player.try_card(engine.pli, engine.play_memory, engine.bid_color)) is True
+        assert ismcts.pool is not None
+    finally:
+        # The engine releases the processes of the search it was given
+        engine.close()
+    assert ismcts.pool is None
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+
+from robolot.engine import CoincheEngine, GameState
+from robolot.main import fast_forward, is_robot_turn
+
+
+@pytest.fixture(autouse=True)
+def _pygame():
+    pygame.init()
+    yield
+    pygame.quit()
+
+
+def test_fast_forward__plays_robot_game(robot_engine):
+    engine = robot_engine(target_score=300)
+    nb_frames = 0
+    while is_robot_turn(engine):
+        assert fast_forward(engine, budget_ms=5) > 0
+        nb_frames += 1
+    assert engine.state == GameState.ENDED
+    assert nb_frames < 1000
+
+
+def test_fast_forward__stops_on_human_turn():
+    engine = CoincheEngine(nb_robots=3, memory_dir=None, seed=0)
+    human_index = next(player.index for player in engine.players if player.is_human)
+    fast_forward(engine, budget_ms=1000)
+    assert engine.state in (GameState.BIDDING, GameState.PLAYING)
+    assert engine.current_player_index == human_index
+    assert not is_robot_turn(engine)
+    assert fast_forward(engine) == 0
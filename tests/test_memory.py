@@ -0,0 +1,28 @@
+import subprocess
+import sys
+
+from robolot.memory import Memory, column_max
+
+
+def test_memory():
+    memory = Memory(["player_index", "bid_value"])
+    memory.append(0, None)
+    memory.append(1, 90)
+    memory.append(2, None)
+    assert memory.shape == (3, 2)
+    assert memory["bid_value"] == [None, 90, None]
+    assert column_max(memory["bid_value"]) == 90
+    assert column_max(memory["bid_value"][:1]) is None
+    dataframe = memory.to_dataframe()
+    assert list(dataframe.columns) == ["player_index", "bid_value"]
+    assert dataframe["bid_value"].max() == 90
+
+
+def test_core_import_without_pandas_and_pygame():
+    # The rules of the game must be usable by workers that never render nor export
+    code = (
+        "import sys, robolot.engine, robolot.simulation; "
+        "print(' '.join(m for m in ('pandas', 'pygame', 'pyarrow', 'http.server') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
@@ -0,0 +1,74 @@
+import random
+
+import numpy as np
+import pytest
+
+from robolot.canonical import permute_card, permute_mask
+from robolot.positions import (
+    RECORD_DTYPE,
+    PositionIndex,
+    build_position_index,
+    get_decision_key,
+    index_rounds,
+    reduce_records
+)
+
+
+@pytest.fixture(scope="module")
+def rounds(tmp_path_factory, export_rounds):
+    return export_rounds(tmp_path_factory.mktemp("memory"), 12)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_get_decision_key__same_for_every_change_of_colors(seed):
+    rng = random.Random(seed)
+    cards = rng.sample(range(32), 14)
+    hand = sum(1 << card for card in cards[:6])
+    seen = sum(1 << card for card in cards[6:12])
+    trick = cards[12:]
+    trump_index = seed % 4
+    key = get_decision_key(hand, seen, trick, trump_index, True)
+    permutation = tuple(rng.sample(range(4), 4))
+    assert get_decision_key(
+        permute_mask(hand, permutation),
+        permute_mask(seen, permutation),
+        [permute_card(card, permutation) for card in trick],
+        permutation[trump_index],
+        True
+    ) == key
+    assert get_decision_key(hand, seen, trick, trump_index, False) != key
+    assert get_decision_key(hand, seen, trick[:1], trump_index, True) != key
+
+
+def test_reduce_records():
+    records = np.array([(3, 1, 1, 10), (1, 1, 0, 20), (3, 2, 0, 5)], dtype=RECORD_DTYPE)
+    reduced = reduce_records(records)
+    assert reduced["key"].tolist() == [1, 3]
+    assert reduced["count"].tolist() == [1, 3]
+    assert reduced["wins"].tolist() == [0, 1]
+    assert reduced["points"].tolist() == [20, 15]
+
+
+def test_build_position_index(tmp_path, rounds):
+    records = index_rounds(rounds)
+    assert records["count"].sum() == 32 * len(rounds)
+    path = str(tmp_path / "positions.bin")
+    assert build_position_index(path, rounds, nb_workers=2, chunk_size=5) == len(records)
+    index = PositionIndex(path)
+    assert len(index) == len(records)
+    for key, count, wins, points in records.tolist():
+        assert index.get_count(key) == count
+        assert index.get_stats(key) == (count, wins / count, points / count)
+    assert index.get_count(0) == 0
+    assert index.get_stats(12345) is None
+    index.close()
+
+
+def test_build_position_index__merged(tmp_path, rounds):
+    path = str(tmp_path / "positions.bin")
+    build_position_index(path, rounds[:5], nb_workers=1)
+    build_position_index(path, rounds[5:], merged_paths=[path], nb_workers=1)
+    merged_path = str(tmp_path / "merged.bin")
+    build_position_index(merged_path, rounds, nb_workers=1)
+    with open(path, "rb") as fp, open(merged_path, "rb") as merged_fp:
+        assert fp.read() == merged_fp.read()
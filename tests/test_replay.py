@@ -0,0 +1,74 @@
+import os
+import random
+
+from robolot.replay import Replay, ReplayRecorder
+from robolot.simulation import play_round
+
+
+def _record_game(engine, path: str, nb_rounds: int) -> None:
+    recorder = ReplayRecorder(engine, path)
+    for _ in range(nb_rounds):
+        play_round(engine)
+    recorder.close()
+
+
+def _get_snapshot(replay: Replay) -> tuple:
+    return replay.position, replay.state.to_keyframe()
+
+
+def test_replay__seek(tmp_path, robot_engine):
+    path = str(tmp_path / "game.jsonl")
+    _record_game(robot_engine(), path, 6)
+    replay = Replay(path, keyframe_interval=16)
+    snapshots = [_get_snapshot(replay)]
+    while replay.position < replay.nb_records:
+        replay.step()
+        snapshots.append(_get_snapshot(replay))
+    # Seeking gives the same state as playing the replay from the start, in any order
+    positions = list(range(replay.nb_records + 1))
+    random.Random(0).shuffle(positions)
+    for position in positions:
+        replay.seek(position)
+        assert _get_snapshot(replay) == snapshots[position]
+    replay.close()
+
+
+def test_replay__seek_trick(tmp_path, robot_engine):
+    path = str(tmp_path / "game.jsonl")
+    _record_game(robot_engine(), path, 6)
+    replay = Replay(path)
+    assert replay.nb_rounds == 6
+    for round_index in range(replay.nb_rounds):
+        replay.seek_round(round_index)
+        assert replay.state.round_index == round_index
+        if len(replay.index["rounds"][round_index]) == 1:
+            # The rounds where everyone passed have no trick
+            continue
+        for trick_index in range(8):
+            replay.seek_trick(round_index, trick_index)
+            assert replay.state.trick_index == trick_index
+            assert replay.state.pli.cards == []
+            assert sum(card is not None for card in replay.state.players[0].hand) == 8 - trick_index
+    replay.seek(0)
+    replay.seek_next_stop()
+    replay.seek_next_stop()
+    assert replay.position == replay.stops[1]
+    replay.seek_previous_stop()
+    assert replay.position == replay.stops[0]
+    replay.close()
+
+
+def test_replay__index(tmp_path, robot_engine):
+    path = str(tmp_path / "game.jsonl")
+    _record_game(robot_engine(), path, 2)
+    replay = Replay(path)
+    replay.close()
+    # The index is reused while the file is unchanged
+    modified_time = os.path.getmtime(f"{path}.idx")
+    Replay(path).close()
+    assert os.path.getmtime(f"{path}.idx") == modified_time
+    # Rounds appended to the file are indexed again
+    _record_game(robot_engine(), path, 1)
+    replay = Replay(path)
+    assert replay.nb_rounds == 3
+    replay.close()
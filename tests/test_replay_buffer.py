@@ -0,0 +1,144 @@
+from multiprocessing import Process
+
+import numpy as np
+import pytest
+
+from robolot.replay_buffer import TRANSITION_DTYPE, SharedReplayBuffer, TransitionRecorder, run_writer
+from robolot.simulation import play_round
+
+
+def _make_transitions(actions: list[int]) -> np.ndarray:
+    transitions = np.zeros(len(actions), dtype=TRANSITION_DTYPE)
+    transitions["action"] = actions
+    return transitions
+
+
+def test_transition_recorder(robot_engine):
+    engine = robot_engine()
+    recorder = TransitionRecorder(engine)
+    nb_scored_rounds = 0
+    for _ in range(5):
+        play_round(engine)
+        nb_scored_rounds += engine.bid_value is not None
+    transitions = recorder.pop()
+    assert len(transitions) == 32 * nb_scored_rounds
+    # The card played was in the hand of the player, and had not been played before
+    assert ((transitions["hand"] >> transitions["action"].astype(np.uint32)) & 1).all()
+    assert not ((transitions["played"] >> transitions["action"].astype(np.uint32)) & 1).any()
+    assert transitions["done"].sum() == 4 * nb_scored_rounds
+    assert ((transitions["reward"] >= 0) & (transitions["reward"] <= 1)).all()
+    assert len(recorder.pop()) == 0
+
+
+def test_shared_replay_buffer__ring():
+    buffer = SharedReplayBuffer(8, nb_writers=2)
+    try:
+        with pytest.raises(ValueError):
+            buffer.sample(4, np.random.default_rng(0))
+        buffer.push(0, _make_transitions([1, 2, 3]))
+        buffer.push(1, _make_transitions([10]))
+        assert len(buffer) == 4
+        # The oldest transitions of a segment are replaced once it is full
+        buffer.push(0, _make_transitions([4, 5, 6]))
+        assert len(buffer) == 5
+        assert sorted(buffer.transitions["action"][:4]) == [3, 4, 5, 6]
+        out = np.empty(16, dtype=TRANSITION_DTYPE)
+        slots, batch = buffer.sample(16, np.random.default_rng(0), out=out)
+        assert np.shares_memory(batch, out)
+        assert set(batch["action"]) <= {3, 4, 5, 6, 10}
+        # Only the transitions with a priority are drawn by the prioritized sampling
+        buffer.update_priorities(np.arange(8), 0)
+        buffer.update_priorities(slots[batch["action"] == 10][:1], 1)
+        _, batch = buffer.sample(16, np.random.default_rng(0), is_prioritized=True)
+        assert (batch["action"] == 10).all()
+    finally:
+        buffer.close()
+
+
+def test_shared_replay_buffer__uniform_sampling_ignores_priorities(tmp_path):
+    buffer = SharedReplayBuffer(4)
+    try:
+        buffer.push(0, _make_transitions([1, 2]))
+        buffer.update_priorities(np.arange(2), 0)
+        assert len(buffer) == 2
+        _, batch = buffer.sample(16, np.random.default_rng(0))
+        assert set(batch["action"]) == {1, 2}
+        with pytest.raises(ValueError):
+            buffer.sample(16, np.random.default_rng(0), is_prioritized=True)
+        buffer.save_snapshot(str(tmp_path / "buffer.npz"))
+        snapshot_buffer = SharedReplayBuffer.load_snapshot(str(tmp_path / "buffer.npz"), nb_writers=2)
+        try:
+            assert len(snapshot_buffer) == 2
+            _, batch = snapshot_buffer.sample(16, np.random.default_rng(0))
+            assert set(batch["action"]) == {1, 2}
+        finally:
+            snapshot_buffer.close()
+    finally:
+        buffer.close()
+
+
+def test_shared_replay_buffer__writers(tmp_path):
+    buffer = SharedReplayBuffer(2000, nb_writers=2)
+    try:
+        processes = [Process(target=run_writer, args=(buffer, i, 0, 10 * i, 10 * (i + 1))) for i in range(2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        assert [process.exitcode for process in processes] == [0, 0]
+        assert len(buffer) > 0 and len(buffer) % 32 == 0
+        buffer.save_snapshot(str(tmp_path / "buffer.npz"))
+        snapshot_buffer = SharedReplayBuffer.load_snapshot(str(tmp_path / "buffer.npz"), nb_writers=4)
+        try:
+            assert len(snapshot_buffer) == len(buffer)
+            assert sorted(snapshot_buffer.transitions["action"][snapshot_buffer.written]) == sorted(
+                buffer.transitions["action"][buffer.written]
+            )
+        finally:
+            snapshot_buffer.close()
+    finally:
+        buffer.close()
+
+
+def test_shared_replay_buffer__prioritized_sampling():
+    buffer = SharedReplayBuffer(10, nb_writers=2)
+    try:
+        buffer.push(0, _make_transitions([1, 2, 3]), np.array([1, 0, 3], dtype=np.float32))
+        buffer.push(1, _make_transitions([4]), 4)
+        # The sums of the trees follow the writes and the updates of the priorities
+        assert buffer.sum_trees[:, 1].tolist() == [4, 4]
+        slots, batch = buffer.sample(20000, np.random.default_rng(0), is_prioritized=True)
+        assert (buffer.transitions[slots] == batch).all()
+        frequencies = np.bincount(batch["action"], minlength=5)[1:] / len(batch)
+        assert np.allclose(frequencies, [1 / 8, 0, 3 / 8, 4 / 8], atol=0.02)
+        buffer.update_priorities(slots[batch["action"] == 4][:1], 0)
+        assert buffer.sum_trees[:, 1].tolist() == [4, 0]
+        _, batch = buffer.sample(1000, np.random.default_rng(0), is_prioritized=True)
+        assert set(batch["action"]) == {1, 3}
+    finally:
+        buffer.close()
+
+
+def test_shared_replay_buffer__snapshot_too_large(tmp_path):
+    buffer = SharedReplayBuffer(12, nb_writers=2)
+    try:
+        for writer_index in range(2):
+            buffer.push(writer_index, _make_transitions(list(range(6 * writer_index, 6 * writer_index + 6))))
+        buffer.save_snapshot(str(tmp_path / "buffer.npz"))
+    finally:
+        buffer.close()
+    snapshot_buffer = SharedReplayBuffer.load_snapshot(str(tmp_path / "buffer.npz"))
+    try:
+        assert snapshot_buffer.sum_trees[:, 1].tolist() == [6, 6]
+    finally:
+        snapshot_buffer.close()
+    # The 12 transitions fit in the segments of 3 writers, but not in the 10 slots of the segments of 5 writers
+    snapshot_buffer = SharedReplayBuffer.load_snapshot(str(tmp_path / "buffer.npz"), nb_writers=3)
+    try:
+        assert len(snapshot_buffer) == 12
+        assert sorted(snapshot_buffer.transitions["action"]) == list(range(12))
+        assert snapshot_buffer.sum_trees[:, 1].tolist() == [4, 4, 4]
+    finally:
+        snapshot_buffer.close()
+    with pytest.raises(ValueError):
+        SharedReplayBuffer.load_snapshot(str(tmp_path / "buffer.npz"), nb_writers=5)
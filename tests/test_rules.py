@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+from robolot.engine import CoincheEngine, GameState
+from robolot.memory import BID_MEMORY_COLUMNS, Memory
+from robolot.models import BID_COLORS, CARD_IDS
+from robolot.rules import (
+    CARD_POINTS_BY_TRUMP,
+    get_legal_cards,
+    get_trick_points,
+    get_trick_winner,
+    get_trump_index,
+    is_bid_legal
+)
+
+
+def _card_id(card) -> int:
+    return CARD_IDS[(card.color, card.value)]
+
+
+def _check_same_as_engine(seed: int, bid_color: str) -> None:
+    random.seed(seed)
+    engine = CoincheEngine(nb_robots=4, memory_dir=None, seed=seed)
+    engine.start_bidding()
+    engine.bid(80, bid_color, 0, 0)
+    for _ in range(3):
+        engine.bid(None, None, 0, 0)
+    engine.start_playing()
+    trump_index = get_trump_index(engine.bid_color)
+    while engine.state == GameState.PLAYING:
+        hand = engine.players[engine.current_player_index].hand
+        trick = [_card_id(card) for card in reversed(engine.pli.cards)]
+        hand_mask = sum(1 << _card_id(card) for card in hand if card is not None)
+        # The engine and the rules must agree on the playable cards
+        valid_cards = [index for index, card in enumerate(hand) if card is not None and engine._check_card_validity(hand, card)]
+        assert sum(1 << _card_id(hand[index]) for index in valid_cards) == get_legal_cards(hand_mask, trick, trump_index)
+        card_index = random.choice(valid_cards)
+        leader = (engine.current_player_index - len(trick)) % 4
+        trick.append(_card_id(hand[card_index]))
+        points = [team.points for team in engine.teams]
+        engine.play(card_index)
+        # And on the winner and the points of each pli
+        if len(trick) == 4 and engine.state == GameState.PLAYING:
+            winner = (leader + get_trick_winner(trick, trump_index)) % 4
+            assert engine.pli_winners_memory[-1] == winner
+            assert engine.teams[winner % 2].points - points[winner % 2] == get_trick_points(trick, trump_index)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rules__same_as_engine(seed):
+    _check_same_as_engine(seed, ["hearts", "spades", "clubs", "diamonds"][seed % 4])
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("bid_color", ["no_trump", "all_trump"])
+def test_rules__same_as_engine_without_trump_color(seed, bid_color):
+    _check_same_as_engine(seed, bid_color)
+
+
+@pytest.mark.parametrize("bid_color", BID_COLORS)
+def test_card_points__total(bid_color):
+    assert sum(CARD_POINTS_BY_TRUMP[get_trump_index(bid_color)]) == 152
+
+
+def test_get_trick_winner__cut_then_higher_asked_card():
+    # Hearts are trump: the 8 of hearts cuts the 7 of spades, the king of spades does not win
+    trump_index = get_trump_index("hearts")
+    trick = [CARD_IDS[("spades", "7")], CARD_IDS[("hearts", "8")], CARD_IDS[("spades", "K")]]
+    assert get_trick_winner(trick, trump_index) == 1
+
+
+def test_get_trick_winner__all_trump():
+    # Every color is ordered like the trump color, the jack of spades does not win a trick of hearts
+    trump_index = get_trump_index("all_trump")
+    trick = [CARD_IDS[("hearts", "A")], CARD_IDS[("hearts", "9")], CARD_IDS[("spades", "J")]]
+    assert get_trick_winner(trick, trump_index) == 1
+
+
+def test_get_legal_cards__all_trump():
+    trump_index = get_trump_index("all_trump")
+    trick = [CARD_IDS[("hearts", "9")]]
+    hand = 1 << CARD_IDS[("hearts", "A")] | 1 << CARD_IDS[("hearts", "J")] | 1 << CARD_IDS[("spades", "J")]
+    # The asked color must be played higher if possible
+    assert get_legal_cards(hand, trick, trump_index) == 1 << CARD_IDS[("hearts", "J")]
+    # Without the asked color, any card can be played
+    assert get_legal_cards(1 << CARD_IDS[("spades", "J")] | 1 << CARD_IDS[("clubs", "7")], trick, trump_index) == (
+        1 << CARD_IDS[("spades", "J")] | 1 << CARD_IDS[("clubs", "7")]
+    )
+
+
+def test_get_legal_cards__no_trump():
+    trump_index = get_trump_index("no_trump")
+    trick = [CARD_IDS[("hearts", "A")], CARD_IDS[("spades", "7")]]
+    hand = 1 << CARD_IDS[("hearts", "7")] | 1 << CARD_IDS[("clubs", "A")]
+    # The asked color must be played, without having to play higher
+    assert get_legal_cards(hand, trick, trump_index) == 1 << CARD_IDS[("hearts", "7")]
+    assert get_trick_points(trick, trump_index) == 19
+
+
+@pytest.mark.parametrize(
+    ("bids", "bid", "is_legal"),
+    [
+        ([], (None, None, 0, 0), True),
+        ([], (80, "hearts", 0, 0), True),
+        ([], (85, "hearts", 0, 0), False),
+        ([], (None, None, 1, 0), False),
+        ([(0, 0, 100, "hearts", 0, 0)], (90, "spades", 0, 0), False),
+        ([(0, 0, 100, "hearts", 0, 0)], (None, None, 1, 0), True),
+        ([(0, 0, 100, "hearts", 0, 0), (1, 1, None, None, 0, 0)], (None, None, 1, 0), False),
+        ([(0, 0, 100, "hearts", 0, 0), (1, 1, None, None, 1, 0)], (None, None, 0, 1), True),
+        ([(0, 0, 100, "hearts", 0, 0), (1, 1, None, None, 1, 0), (2, 0, None, None, 0, 0)], (None, None, 0, 1), False),
+    ]
+)
+def test_is_bid_legal(bids, bid, is_legal):
+    assert is_bid_legal(bids, *bid) == is_legal
+    assert CoincheEngine._check_bid_validity(Memory(BID_MEMORY_COLUMNS, bids), *bid) == is_legal
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from robolot.analysis import load_rounds
+from robolot.dealing import rank_deal
+from robolot.engine import CoincheEngine, GameState
+from robolot.models import CARD_IDS, NO_TRUMP
+from robolot.scoring import SCORING_POINTS_PLUS_CONTRACT, RoundArrays, RuleSet, score_rounds
+
+
+def test_score_rounds__same_as_engine(tmp_path, export_rounds):
+    rounds = export_rounds(tmp_path, 30)
+    results = score_rounds(RoundArrays.from_rounds(rounds))
+    assert (results["team_points"].sum(axis=1) == 152).all()
+    for round_, scores in zip(rounds, results["scores"]):
+        # The engine exports the contract, positive for the team which scored it
+        engine_scores = pd.read_parquet(tmp_path / f"result_{round_['round_id']}.parquet")["points"].clip(lower=0)
+        assert list(scores) == list(engine_scores)
+
+
+def test_score_rounds__capot_lost_on_a_trick_without_points(tmp_path):
+    # The challengers win the first trick with the 9, 7 and 8 of the no trump contract, worth no points,
+    # then player 0 wins every other trick
+    hands = [
+        [1, 2, 3, 4, 5, 6, 7, 31],
+        [0, 18, 24, 25, 26, 27, 28, 29],
+        list(range(8, 16)),
+        [16, 17, 19, 20, 21, 22, 23, 30]
+    ]
+    plays = [
+        18, 8, 16, 1, 24, 9, 30, 31, 7, 0, 10, 17, 6, 25, 11, 19,
+        5, 26, 12, 20, 4, 27, 13, 21, 3, 28, 14, 22, 2, 29, 15, 23
+    ]
+    engine = CoincheEngine(
+        nb_robots=0, memory_dir=str(tmp_path), target_score=10 ** 9, seed=0, deal_ids=[rank_deal(hands)]
+    )
+    engine.starting_player_index = 1
+    engine.start_bidding()
+    for bid in [(None, None, 0, 0)] * 3 + [(250, NO_TRUMP, 0, 0)] + [(None, None, 0, 0)] * 3:
+        engine.bid(*bid)
+    engine.start_playing()
+    for card in plays:
+        hand = engine.players[engine.current_player_index].hand
+        position = next(
+            position for position, hand_card in enumerate(hand)
+            if hand_card is not None and CARD_IDS[(hand_card.color, hand_card.value)] == card
+        )
+        assert engine.play(position) is True
+    assert engine.state != GameState.PLAYING
+    assert engine.challenger_team.points == 0
+    assert engine.pli_winners_memory[0] == 1
+    assert not engine._is_contract_fulfilled()
+    rounds = load_rounds(str(tmp_path))
+    results = score_rounds(RoundArrays.from_rounds(rounds))
+    assert list(results["team_points"][0]) == [152, 0]
+    assert not results["is_fulfilled"][0]
+    assert list(results["scores"][0]) == [0, 250]
+
+
+def test_score_rounds__rule_set(tmp_path, export_rounds):
+    rounds = RoundArrays.from_rounds(export_rounds(tmp_path, 30))
+    contract_results = score_rounds(rounds)
+    results = score_rounds(rounds, RuleSet(scoring=SCORING_POINTS_PLUS_CONTRACT, last_trick_bonus=10))
+    assert (results["team_points"].sum(axis=1) == 162).all()
+    # Every point of the cards is scored, on top of the contract and the belote
+    assert (results["scores"].sum(axis=1) == 162 + rounds.bid_values + results["belote_points"].sum(axis=1)).all()
+    # The belote is not counted anymore
+    no_belote_results = score_rounds(rounds, RuleSet(belote_points=0))
+    assert (no_belote_results["belote_points"] == 0).all()
+    assert no_belote_results["is_fulfilled"].sum() <= contract_results["is_fulfilled"].sum()
+
+
+def test_round_arrays__save(tmp_path, export_rounds):
+    rounds = RoundArrays.from_rounds(export_rounds(tmp_path, 10))
+    rounds.save(str(tmp_path / "rounds.npz"))
+    loaded_rounds = RoundArrays.load(str(tmp_path / "rounds.npz"))
+    assert len(loaded_rounds) == len(rounds)
+    assert np.array_equal(loaded_rounds.cards, rounds.cards)
+    assert np.array_equal(score_rounds(loaded_rounds)["scores"], score_rounds(rounds)["scores"])
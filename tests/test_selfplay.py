@@ -0,0 +1,78 @@
+import json
+import socket
+import time
+
+import pytest
+
+from robolot.selfplay import Coordinator, play_shard, run_local_campaign, run_threaded_campaign
+
+
+def test_run_local_campaign__same_as_sequential():
+    coordinator = Coordinator(nb_deals=6, shard_size=2, seed=0)
+    stats = run_local_campaign(coordinator, nb_workers=2, timeout=60)
+    assert coordinator.done.is_set()
+    assert stats["rounds"] == 6
+    expected = [play_shard(0, start, start + 2, {"version": 0}) for start in (0, 2, 4)]
+    assert stats["contracts"] == sum(shard_stats["contracts"] for shard_stats in expected)
+    assert stats["points"] == [sum(shard_stats["points"][i] for shard_stats in expected) for i in range(2)]
+
+
+def test_run_local_campaign__timeout():
+    coordinator = Coordinator(nb_deals=4, shard_size=2, seed=0)
+    # Without workers, the campaign cannot be over in time
+    with pytest.raises(TimeoutError):
+        run_local_campaign(coordinator, nb_workers=0, timeout=0.1)
+    assert not coordinator.done.is_set()
+
+
+def test_coordinator__disconnected_worker():
+    coordinator = Coordinator(nb_deals=4, shard_size=2, seed=0)
+    server = coordinator.serve(port=0)
+    try:
+        with socket.create_connection(server.server_address) as connection, connection.makefile("rwb") as stream:
+            stream.write(json.dumps({"type": "lease"}).encode() + b"\n")
+            stream.flush()
+            assert json.loads(stream.readline())["shard"] == 0
+        # The shard of the worker is handed out again once it disconnected
+        for _ in range(100):
+            if list(coordinator.pending) == [0, 1]:
+                break
+            time.sleep(0.01)
+        assert list(coordinator.pending) == [0, 1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_coordinator__expired_lease():
+    coordinator = Coordinator(nb_deals=4, shard_size=2, seed=0, lease_timeout=0)
+    first_lease = coordinator.lease(1)
+    time.sleep(0.01)
+    second_lease = coordinator.lease(2)
+    assert second_lease["shard"] == first_lease["shard"]
+    # The results of the expired lease are ignored
+    stats = play_shard(0, first_lease["start"], first_lease["stop"], first_lease["policy"])
+    assert not coordinator.complete(first_lease["shard"], first_lease["lease"], stats, 0)
+    assert coordinator.complete(second_lease["shard"], second_lease["lease"], stats, 0)
+
+
+def test_coordinator__resumed(tmp_path):
+    path = tmp_path / "campaign.json"
+    coordinator = Coordinator(nb_deals=4, shard_size=2, seed=0, checkpoint_path=path)
+    lease = coordinator.lease(1)
+    stats = play_shard(0, lease["start"], lease["stop"], lease["policy"])
+    coordinator.complete(lease["shard"], lease["lease"], stats, lease["policy"]["version"])
+    coordinator.set_policy({"ismcts": None})
+    resumed = Coordinator(nb_deals=4, shard_size=2, seed=0, checkpoint_path=path)
+    assert list(resumed.pending) == [1]
+    assert resumed.get_stats() == stats
+    assert resumed.lease(1)["policy"] == {"ismcts": None, "version": 1}
+
+
+def test_run_threaded_campaign__same_for_any_number_of_threads():
+    stats = run_threaded_campaign(nb_deals=12, nb_threads=4, shard_size=3)
+    assert stats["rounds"] == 12
+    assert run_threaded_campaign(nb_deals=12, nb_threads=1, shard_size=3) == stats
+    expected = [play_shard(0, start, start + 3, {}) for start in range(0, 12, 3)]
+    assert stats["contracts"] == sum(shard_stats["contracts"] for shard_stats in expected)
+    assert stats["scores"] == [sum(shard_stats["scores"][i] for shard_stats in expected) for i in range(2)]
@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from robolot.simulation import play_round
+from robolot.spectator import SNAPSHOT_MESSAGE, SpectatorHub, SpectatorState, run_table
+
+
+def _follow(messages: list[bytes]) -> SpectatorState:
+    """
+    Rebuild the state of a table from the messages received by a spectator
+    """
+    state = None
+    for message in messages:
+        message = json.loads(message)
+        if message["type"] == SNAPSHOT_MESSAGE:
+            state = SpectatorState.from_snapshot(message)
+        else:
+            assert message["seq"] == state.seq + 1
+            state.apply(message)
+    return state
+
+
+def _drain(spectator) -> list[bytes]:
+    messages = []
+    while (message := spectator.get_nowait()) is not None:
+        messages.append(message)
+    return messages
+
+
+def test_spectator_hub__snapshot_and_deltas(robot_engine):
+    engine = robot_engine()
+    hub = SpectatorHub(engine, max_queue_size=64)
+    early_spectators = [hub.join() for _ in range(100)]
+    received = {spectator: _drain(spectator) for spectator in early_spectators}
+    slow_spectators = [hub.join() for _ in range(100)]
+    for spectator in slow_spectators:
+        spectator.get_nowait()
+    for _ in range(4):
+        play_round(engine)
+        # The spectators joining during the game start from the current state
+        late_spectator = hub.join()
+        received[late_spectator] = []
+        for spectator in received:
+            received[spectator] += _drain(spectator)
+    expected = hub.state.to_snapshot()
+    assert expected["round_index"] == 3
+    assert expected["scores"] == [team.score for team in engine.teams]
+    for spectator, messages in received.items():
+        assert _follow(messages).to_snapshot() == expected
+        assert spectator.nb_dropped == 0
+    # The spectators which stopped reading get the state once they read again
+    for spectator in slow_spectators:
+        assert spectator.nb_dropped > 0
+        assert len(spectator.queue) <= 64
+        assert _follow(_drain(spectator)).to_snapshot() == expected
+    # The snapshot is only encoded once until the next event
+    assert slow_spectators[0].get_nowait() is None
+    hub.close()
+
+
+def test_spectator_hub__serve(robot_engine):
+    async def _run() -> list[dict]:
+        engine = robot_engine(target_score=300)
+        hub = SpectatorHub(engine)
+        server = await hub.serve(port=0)
+        port = server.sockets[0].getsockname()[1]
+        connections = [await asyncio.open_connection("127.0.0.1", port) for _ in range(200)]
+        # Every spectator has joined once it got its snapshot
+        for reader, _ in connections:
+            assert json.loads(await reader.readline())["type"] == SNAPSHOT_MESSAGE
+        await run_table(engine, round_delay=0)
+        states = []
+        for reader, writer in connections:
+            state = SpectatorState()
+            while not state.is_game_ended:
+                state.apply(json.loads(await reader.readline()))
+            states.append(state.to_snapshot())
+            writer.close()
+        server.close()
+        await server.wait_closed()
+        assert all(state == hub.state.to_snapshot() for state in states)
+        return states
+
+    states = asyncio.run(_run())
+    assert len(states) == 200
+    assert max(states[0]["scores"]) >= 300
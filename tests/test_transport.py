@@ -0,0 +1,57 @@
+import glob
+import os
+from multiprocessing import Queue
+
+import pandas as pd
+
+from robolot.simulation import play_round
+from robolot.transport import SCHEMAS, BatchCollector, RoundBatchBuilder, send_batches, simulate_rounds
+
+
+def test_round_batch_builder__same_as_exported_memory(tmp_path, robot_engine):
+    engine = robot_engine(str(tmp_path))
+    builder = RoundBatchBuilder(engine, first_round_id=10)
+    for _ in range(3):
+        play_round(engine)
+    batches = builder.pop_batches()
+    assert sorted(set(batches["result"].column("round_id").to_pylist())) == [10, 11, 12]
+    for kind in SCHEMAS:
+        exported = [pd.read_parquet(path) for path in sorted(glob.glob(os.path.join(tmp_path, f"{kind}_*.parquet")))]
+        table = batches[kind].to_pandas()
+        for round_id, rows in enumerate(exported, 10):
+            built = table[table["round_id"] == round_id].drop(columns="round_id").reset_index(drop=True)
+            assert built.astype(object).where(built.notna(), None).values.tolist() == (
+                rows.astype(object).where(rows.notna(), None).values.tolist()
+            )
+    assert builder.pop_batches()["bid"].num_rows == 0
+
+
+def test_batch_collector__reads_shared_memory(tmp_path, robot_engine):
+    engine = robot_engine()
+    builder = RoundBatchBuilder(engine)
+    queue = Queue()
+    collector = BatchCollector(str(tmp_path), flush_rounds=4)
+    for _ in range(3):
+        for _ in range(2):
+            play_round(engine)
+        send_batches(queue, builder.pop_batches())
+        collector.receive(queue.get())
+    # The first four rounds are persisted together, the last two are kept until the next flush
+    assert collector.nb_files == 1
+    tables = collector.get_tables()
+    assert tables["result"].column("round_id").to_pylist() == [4, 4, 5, 5]
+    del tables
+    collector.flush()
+    results = pd.read_parquet(os.path.join(tmp_path, "result_000000.parquet"))
+    assert results["round_id"].tolist() == [0, 0, 1, 1, 2, 2, 3, 3]
+    assert collector.nb_files == 2
+
+
+def test_simulate_rounds(tmp_path):
+    collector = BatchCollector(str(tmp_path))
+    simulate_rounds(20, 2, collector, seed=0, batch_rounds=3)
+    collector.flush()
+    results = pd.read_parquet(os.path.join(tmp_path, "result_000000.parquet"))
+    assert sorted(set(results["round_id"])) == list(range(20))
+    plays = pd.read_parquet(os.path.join(tmp_path, "play_000000.parquet"))
+    assert plays.groupby("round_id").size().isin([32]).all()